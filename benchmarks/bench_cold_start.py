@@ -0,0 +1,179 @@
+# benchmarks/bench_cold_start.py
+# Cold start de la app: tiempo de `import main` (con desglose de `-X importtime`), tiempo
+# hasta que uvicorn responde la primera petición (/) y hasta que está lista (/ready, tras el
+# calentamiento del lifespan). Cada medición es un proceso nuevo.
+# Uso: python benchmarks/bench_cold_start.py [--runs 5] [--top 15] [--baseline results/cold-start-....json]
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Entorno mínimo para que Settings cargue sin .env (no se conecta a nada en el import)
+BENCH_ENV = {
+    "OPENROUTER_API_KEY": "bench",
+    "OPENROUTER_API_BASE": "http://127.0.0.1:9/",
+    "OPENROUTER_MODEL": "fake/model",
+    "JWT_SECRET": "bench-secret",
+    "JWT_ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "DB_ECHO": "false",
+    "LLM_WARMUP_CONNECTIONS": "0",  # sin upstream real: no calentar HTTP a OpenRouter
+    "MAX_UPLOAD_BYTES": "10485760",
+}
+
+
+def _env(tmp: Path) -> dict:
+    env = {**os.environ, **BENCH_ENV}
+    env.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tmp / 'bench.db'}")
+    env["STORAGE_DIR"] = str(tmp / "storage")
+    return env
+
+
+def measure_import(env: dict) -> tuple[float, dict[str, int]]:
+    """Wall time de `import main` en un proceso nuevo y tiempo acumulado (us) por paquete raíz."""
+    code = "import time; t=time.perf_counter(); import main; print(time.perf_counter()-t)"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    wall_s = float(proc.stdout.strip().splitlines()[-1])
+    # líneas: "import time: self [us] | cumulative | imported package"; el nivel lo da la sangría
+    by_package: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith(" ") and not name.startswith("  "):  # nivel superior
+            top = name.strip().split(".")[0]
+            by_package[top] = by_package.get(top, 0) + int(cumulative)
+    return wall_s, by_package
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_startup(env: dict, app: str, timeout_s: float = 60.0) -> tuple[float, float]:
+    """Segundos desde lanzar uvicorn hasta la primera respuesta de GET / y hasta /ready = 200."""
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    first_response = None
+    try:
+        while time.perf_counter() - started < timeout_s:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn terminó con código {proc.returncode}")
+            path = "/" if first_response is None else "/ready"
+            try:
+                # 503 (calentando) lanza HTTPError, que es OSError
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1):
+                    elapsed = time.perf_counter() - started
+                    if first_response is None:
+                        first_response = elapsed
+                        continue
+                    return first_response, elapsed
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"la app no estuvo lista en {timeout_s}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de cold start de CV Booster")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="paquetes más lentos a mostrar")
+    parser.add_argument("--app", default="benchmarks.load.bench_app:app",
+                        help="app ASGI para medir el arranque (por defecto la de benchmarks con SQLite)")
+    parser.add_argument("--skip-startup", action="store_true", help="medir solo el import")
+    parser.add_argument("--out", help="ruta del JSON de resultados")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--threshold-pct", type=float, default=10.0)
+    args = parser.parse_args()
+
+    env = _env(Path(tempfile.mkdtemp(prefix="cvcold-")))
+
+    import_times, packages = [], {}
+    for _ in range(args.runs):
+        wall_s, by_package = measure_import(env)
+        import_times.append(wall_s * 1000)
+        for pkg, us in by_package.items():
+            packages.setdefault(pkg, []).append(us)
+    package_ms = {pkg: round(statistics.median(v) / 1000, 1) for pkg, v in packages.items()}
+
+    startup_times, ready_times = [], []
+    if not args.skip_startup:
+        for _ in range(args.runs):
+            first_s, ready_s = measure_startup(env, args.app)
+            startup_times.append(first_s * 1000)
+            ready_times.append(ready_s * 1000)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_main_ms": {
+            "median": round(statistics.median(import_times), 1),
+            "min": round(min(import_times), 1),
+        },
+        "startup_ms": {
+            "median": round(statistics.median(startup_times), 1),
+            "min": round(min(startup_times), 1),
+        } if startup_times else None,
+        "ready_ms": {
+            "median": round(statistics.median(ready_times), 1),
+            "min": round(min(ready_times), 1),
+        } if ready_times else None,
+        "top_packages_ms": dict(sorted(package_ms.items(), key=lambda kv: -kv[1])[:args.top]),
+    }
+
+    print(f"import main:   mediana {report['import_main_ms']['median']:8.1f} ms  (mín {report['import_main_ms']['min']:.1f})")
+    if report["startup_ms"]:
+        print(f"arranque (/):  mediana {report['startup_ms']['median']:8.1f} ms  (mín {report['startup_ms']['min']:.1f})")
+        print(f"lista (/ready): mediana {report['ready_ms']['median']:7.1f} ms  (mín {report['ready_ms']['min']:.1f})")
+    print("\nPaquetes más lentos en el import (acumulado, mediana):")
+    for pkg, ms in report["top_packages_ms"].items():
+        print(f"  {pkg:<28} {ms:8.1f} ms")
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    out = Path(args.out) if args.out else RESULTS_DIR / f"cold-start-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nResultados guardados en {out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        print(f"\nComparación con baseline ({baseline.get('timestamp')}):")
+        regressed = False
+        for key in ("import_main_ms", "startup_ms", "ready_ms"):
+            cur, base = report.get(key), baseline.get(key)
+            if not cur or not base or not base["median"]:
+                continue
+            delta = 100 * (cur["median"] - base["median"]) / base["median"]
+            flag = " <-- REGRESIÓN" if delta > args.threshold_pct else ""
+            regressed |= bool(flag)
+            print(f"  {key:<16} {base['median']:8.1f} -> {cur['median']:8.1f} ms ({delta:+.1f}%){flag}")
+        sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_pii.py
+# Throughput del escáner de PII sobre CVs grandes.
+# Uso: python benchmarks/bench_pii.py [--mb 5] [--chunk 64]
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.safety import PIIScanner, obfuscate_personal_data, rehydrate_personal_data  # noqa: E402
+
+# Implementación anterior (una pasada de `sub` por tipo) como referencia
+LEGACY_EMAIL_RE = re.compile(r"([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)")
+LEGACY_PHONE_RE = re.compile(r"(\+?\d{7,15})")
+
+
+def legacy_obfuscate(text: str) -> str:
+    t = LEGACY_EMAIL_RE.sub("[EMAIL_REDACTED]", text)
+    return LEGACY_PHONE_RE.sub("[PHONE_REDACTED]", t)
+
+
+def synthetic_cv(target_bytes: int, seed: int = 7) -> str:
+    rnd = random.Random(seed)
+    lines = [
+        "Desarrollador backend con experiencia en Python, FastAPI y PostgreSQL.",
+        "Lideré la migración de servicios monolíticos a microservicios en Kubernetes.",
+        "Experiencia 2019 - 2022 en Acme Corp como ingeniero de software.",
+        "Automatización de pruebas y CI/CD con GitHub Actions y Docker.",
+    ]
+    contact = [
+        "Email: persona{n}@example.com | Tel: +57 300 {n:03d} 4567",
+        "LinkedIn: linkedin.com/in/persona{n} · https://github.com/persona{n}",
+        "Dirección: Calle {n} # 12-34, Bogotá",
+    ]
+    out = []
+    size = 0
+    n = 0
+    while size < target_bytes:
+        line = rnd.choice(contact).format(n=n) if rnd.random() < 0.1 else rnd.choice(lines)
+        out.append(line)
+        size += len(line) + 1
+        n += 1
+    return "\n".join(out)
+
+
+def bench(label: str, fn, text: str, repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - t0)
+    mb = len(text.encode("utf-8")) / 1e6
+    print(f"{label:<34} {best * 1000:9.1f} ms  {mb / best:8.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=float, default=5.0, help="tamaño del CV sintético en MB")
+    parser.add_argument("--chunk", type=int, default=64, help="tamaño de trozo para el modo streaming")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = synthetic_cv(int(args.mb * 1e6))
+    obf, mapping = obfuscate_personal_data(text)
+    assert rehydrate_personal_data(obf, mapping) == text, "la rehidratación no es reversible"
+
+    def streamed(t: str) -> str:
+        scanner = PIIScanner()
+        parts = [scanner.feed(t[i:i + args.chunk]) for i in range(0, len(t), args.chunk)]
+        parts.append(scanner.finish())
+        return "".join(parts)
+
+    assert streamed(text) == obf, "el modo streaming no coincide con el escaneo completo"
+
+    print(f"CV sintético: {len(text) / 1e6:.1f} MB, {len(mapping['placeholders'])} valores PII distintos")
+    bench("legacy (sub por tipo, 2 tipos)", legacy_obfuscate, text, args.repeat)
+    bench("single-pass (4 tipos)", lambda t: obfuscate_personal_data(t), text, args.repeat)
+    bench(f"single-pass streaming ({args.chunk} B)", streamed, text, args.repeat)
+    bench("rehidratación", lambda t: rehydrate_personal_data(t, mapping), obf, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
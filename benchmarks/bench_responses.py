@@ -0,0 +1,133 @@
+# benchmarks/bench_responses.py
+# Serialización JSON (stdlib como JSONResponse vs orjson) y bytes en la red (sin comprimir,
+# gzip y brotli) para las respuestas grandes: generate_cv/strict y usage_history completo.
+# Uso: python benchmarks/bench_responses.py [--history 100] [--cv-kb 12] [--repeat 50]
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SENTENCES = [
+    "Diseño y desarrollo de APIs REST con FastAPI y PostgreSQL para más de 20.000 usuarios.",
+    "Automatización de despliegues con Docker, GitHub Actions y CI/CD en AWS.",
+    "Liderazgo técnico de un equipo de 4 personas y mentoring de perfiles junior.",
+    "Optimización de consultas SQL y reducción de la latencia p95 en un 35%.",
+    "Integración de servicios de terceros (Stripe, SendGrid) y colas con RabbitMQ.",
+]
+
+
+def _markdown(kb: int, rnd: random.Random) -> str:
+    parts = ["# [EMAIL_1]\n\n## Perfil profesional\n"]
+    size = 0
+    section = 0
+    while size < kb * 1024:
+        if size // 2048 > section:
+            section += 1
+            parts.append(f"\n## Experiencia {section}\n### Empresa {section} (2019 - 2022)\n")
+        line = "- " + rnd.choice(SENTENCES) + "\n"
+        parts.append(line)
+        size += len(line.encode())
+    return "".join(parts)
+
+
+def generate_payload(cv_kb: int, rnd: random.Random) -> dict:
+    md = _markdown(cv_kb, rnd)
+    return {
+        "extractor_json": {
+            "rol_detectado": "Desarrollador Backend",
+            "keywords_ats": ["Python", "FastAPI", "PostgreSQL", "Docker", "CI/CD", "REST"],
+            "tecnologias": [{"name": n, "confidence": 0.8} for n in ("Python", "FastAPI", "PostgreSQL")],
+        },
+        "cv_markdown": md,
+        "postprocess_checks": {"suspect_lines": [], "new_numbers": ["35%"]},
+        "obfuscation_mapping": {"emails": {"[EMAIL_1]": "persona@example.com"}, "placeholders": {}},
+        "prompt_report": {"total_tokens": 5400, "static_prefix_tokens": 3100, "cacheable_ratio": 0.57},
+        "compaction": {"tokens_before": 6100, "tokens_after": 5200},
+        "ats_score": {"original": {"score": 41.5}, "adapted": {"score": 83.0}, "delta": 41.5},
+        "stage_timings": {"extract": 120, "obfuscate": 3, "llm": 8200, "adapt": 8240},
+    }
+
+
+def history_payload(n: int, cv_kb: int, rnd: random.Random) -> dict:
+    now = datetime.now(timezone.utc)
+    history = [
+        {
+            "id": i,
+            "request_id": f"{rnd.getrandbits(128):032x}",
+            "model": "openai/gpt-4o-mini",
+            "endpoint": "/cv-boost/generate_cv/strict",
+            "latency_ms": rnd.randint(3000, 15000),
+            "stage_timings": {"extract": rnd.randint(50, 400), "llm": rnd.randint(3000, 14000)},
+            "result": _markdown(cv_kb, rnd),
+            "created_at": (now - timedelta(hours=i)).isoformat(),
+        }
+        for i in range(n)
+    ]
+    return {"success": True, "data": {"history": history, "pagination": {"total_records": n}}}
+
+
+def stdlib_render(content) -> bytes:
+    # igual que starlette.responses.JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def best_of(fn, repeat: int) -> tuple[float, object]:
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, out
+
+
+def report(label: str, content, repeat: int) -> None:
+    print(f"\n{label}")
+    std_ms, body = best_of(lambda: stdlib_render(content), repeat)
+    print(f"  serialización json (stdlib)   {std_ms:8.3f} ms")
+    if orjson is not None:
+        orj_ms, orj_body = best_of(lambda: orjson.dumps(content), repeat)
+        print(f"  serialización orjson          {orj_ms:8.3f} ms   ({std_ms / orj_ms:.1f}x)")
+        body = orj_body
+    else:
+        print("  (orjson no instalado)")
+    print(f"  bytes sin comprimir           {len(body):10,d}")
+    for level in (1, 6):
+        ms, out = best_of(lambda: gzip.compress(body, compresslevel=level, mtime=0), max(1, repeat // 5))
+        print(f"  gzip -{level}                      {len(out):10,d}  ({100 * len(out) / len(body):5.1f}%)  {ms:7.2f} ms")
+    if brotli is not None:
+        for quality in (4, 11):
+            ms, out = best_of(lambda: brotli.compress(body, quality=quality), max(1, repeat // 5))
+            print(f"  brotli q{quality:<2}                   {len(out):10,d}  ({100 * len(out) / len(body):5.1f}%)  {ms:7.2f} ms")
+    else:
+        print("  (brotli no instalado)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cv-kb", type=int, default=12, help="tamaño del cv_markdown en KB")
+    parser.add_argument("--history", type=int, default=100, help="registros en usage_history")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    report(f"generate_cv/strict (cv_markdown {args.cv_kb} KB)", generate_payload(args.cv_kb, rnd), args.repeat)
+    report(
+        f"usage_history?include_full_result=true ({args.history} registros)",
+        history_payload(args.history, args.cv_kb // 2 or 1, rnd),
+        max(1, args.repeat // 5),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/load/bench_app.py
+# Punto de entrada de la app para pruebas de carga: importa main.app y, si DATABASE_URL
+# apunta a SQLite, adapta el esquema (INET, gen_random_uuid, schema "sys") y crea las tablas.
+# Con Postgres no toca nada: se asume una base ya inicializada.
+# Uso: uvicorn benchmarks.load.bench_app:app
+import uuid
+from contextlib import asynccontextmanager
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import INET
+from sqlalchemy.ext.compiler import compiles
+
+from config.settings import settings
+from config.database import Base, get_engine
+from main import app
+from models import user, session, llmUsage, emailConfirmation, rateLimitBucket  # noqa: F401 (registra tablas)
+
+IS_SQLITE = settings.DATABASE_URL.startswith("sqlite")
+engine = get_engine()
+
+
+@compiles(INET, "sqlite")
+def _inet_sqlite(type_, compiler, **kw):
+    return "TEXT"
+
+
+@compiles(sa.BigInteger, "sqlite")
+def _bigint_sqlite(type_, compiler, **kw):
+    # SQLite solo autoincrementa una PK declarada como INTEGER (llm_usage.id)
+    return "INTEGER"
+
+
+if IS_SQLITE:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_connect(dbapi_conn, _record):
+        # el esquema "sys" de Postgres se emula con una base adjunta en memoria compartida
+        db_path = settings.DATABASE_URL.split("///", 1)[-1]
+        cursor = dbapi_conn.cursor()
+        cursor.execute("ATTACH DATABASE ? AS sys", (db_path + ".sys",))
+        cursor.execute("PRAGMA sys.journal_mode=WAL")
+        cursor.close()
+
+    # gen_random_uuid() no existe en SQLite: se genera el id en el cliente
+    for table in Base.metadata.tables.values():
+        for column in table.columns:
+            default = column.server_default
+            if default is not None and "gen_random_uuid" in str(getattr(default, "arg", "")):
+                column.server_default = None
+                sa.ColumnDefault(uuid.uuid4)._set_parent(column)
+
+    async def _create_sqlite_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    # las tablas se crean antes del lifespan de la app, cuyo calentamiento ya las consulta
+    _app_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def _bench_lifespan(app_):
+        await _create_sqlite_tables()
+        async with _app_lifespan(app_) as state:
+            yield state
+
+    app.router.lifespan_context = _bench_lifespan
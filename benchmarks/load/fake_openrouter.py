@@ -0,0 +1,126 @@
+# benchmarks/load/fake_openrouter.py
+# Stand-in local de OpenRouter (API compatible con OpenAI) para pruebas de carga.
+# Configuración por variables de entorno:
+#   FAKE_LLM_LATENCY_MS    latencia base por respuesta (default 800)
+#   FAKE_LLM_JITTER_MS     variación uniforme +/- (default 200)
+#   FAKE_LLM_FAILURE_RATE  probabilidad de responder 500 (default 0)
+#   FAKE_LLM_CHUNK_MS      pausa entre trozos en modo streaming (default 15)
+#   FAKE_LLM_MISSING       modelos (coma-separados) que responden 404 "No endpoints found"
+# Uso: uvicorn benchmarks.load.fake_openrouter:app --port 8089
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "200"))
+FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+CHUNK_MS = float(os.getenv("FAKE_LLM_CHUNK_MS", "15"))
+MISSING = {m.strip() for m in os.getenv("FAKE_LLM_MISSING", "").split(",") if m.strip()}
+
+EXTRACTOR_RESPONSE = {
+    "rol_detectado": "Desarrollador Backend",
+    "seniority": "mid",
+    "tecnologias": [
+        {"name": "Python", "confidence": 0.9},
+        {"name": "FastAPI", "confidence": 0.8},
+        {"name": "PostgreSQL", "confidence": 0.7},
+        {"name": "Docker", "confidence": 0.6},
+    ],
+    "skills_duras": ["Diseño de APIs", "Testing automatizado"],
+    "skills_blandas": ["Trabajo en equipo", "Comunicación"],
+    "requisitos_imprescindibles": ["3 años de experiencia con Python"],
+    "requisitos_deseables": ["Kubernetes"],
+    "keywords_ats": ["Python", "FastAPI", "PostgreSQL", "REST", "Docker", "CI/CD"],
+    "suggested_sections": ["Perfil", "Experiencia", "Habilidades", "Educación"],
+    "confidence_score": 0.85,
+}
+
+ADAPTER_RESPONSE = """# [EMAIL_1]
+
+## Perfil profesional
+Desarrollador backend con experiencia en Python, FastAPI y PostgreSQL, orientado a APIs REST escalables.
+
+## Experiencia
+### Acme Corp — Desarrollador de software (2019 - 2022)
+- Diseño y desarrollo de APIs REST con FastAPI y PostgreSQL.
+- Automatización de despliegues con Docker y CI/CD.
+- Colaboración con equipos de producto y QA.
+
+## Educación
+- Ingeniería de Sistemas
+
+## Habilidades
+- Python, FastAPI, PostgreSQL, Docker, CI/CD, REST
+"""
+
+app = FastAPI(title="fake-openrouter")
+
+
+def _pick_response(messages: list) -> str:
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    if "analizador de ofertas" in system:
+        return json.dumps(EXTRACTOR_RESPONSE, ensure_ascii=False)
+    return ADAPTER_RESPONSE
+
+
+def _delay_s() -> float:
+    return max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)) / 1000
+
+
+@app.get("/models")
+async def models():
+    return {"object": "list", "data": [{"id": "fake/model", "object": "model"}]}
+
+
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "fake/model")
+    if model in MISSING:
+        return JSONResponse({"error": {"message": f"No endpoints found for {model}.", "code": 404}}, status_code=404)
+    if FAILURE_RATE and random.random() < FAILURE_RATE:
+        await asyncio.sleep(_delay_s() / 4)
+        return JSONResponse({"error": {"message": "upstream error", "code": 500}}, status_code=500)
+
+    content = _pick_response(body.get("messages") or [])
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    if body.get("stream"):
+        async def events():
+            # la latencia base se paga antes del primer token (time-to-first-token)
+            await asyncio.sleep(_delay_s())
+            words = content.split(" ")
+            for i in range(0, len(words), 8):
+                piece = " ".join(words[i:i + 8]) + (" " if i + 8 < len(words) else "")
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                if CHUNK_MS:
+                    await asyncio.sleep(CHUNK_MS / 1000)
+            done = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(_delay_s())
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
@@ -0,0 +1,324 @@
+# benchmarks/load/run_load.py
+# Benchmark de carga: levanta el stand-in de OpenRouter y la app (uvicorn) contra SQLite o
+# Postgres local, lanza carga concurrente por ruta y reporta p50/p95/p99 y req/s.
+# Los resultados se guardan en benchmarks/results/ para comparar regresiones.
+#
+# Ejemplos:
+#   python benchmarks/load/run_load.py --requests 200 --concurrency 20
+#   python benchmarks/load/run_load.py --llm-latency-ms 1500 --llm-failure-rate 0.05 --stream
+#   python benchmarks/load/run_load.py --llm-backend record --cassettes storage/llm_cassettes
+#   python benchmarks/load/run_load.py --llm-backend replay_fast --cassettes storage/llm_cassettes
+#   python benchmarks/load/run_load.py --db postgresql+asyncpg://u:p@localhost/cv_bench
+#   python benchmarks/load/run_load.py --baseline benchmarks/results/load-20251020-101500.json
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[2]
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+JOB_DESCRIPTION = (
+    "Buscamos Desarrollador Backend mid con 3 años de experiencia en Python, FastAPI y "
+    "PostgreSQL. Requisitos: APIs REST, Docker, CI/CD. Deseable: Kubernetes y AWS."
+)
+CV_MARKDOWN = (
+    "# Persona Ejemplo\npersona@example.com | +57 300 123 4567\n\n"
+    "## Experiencia\n### Acme Corp (2019 - 2022)\n- Desarrollo de APIs en Python\n"
+    "- Mantenimiento de bases de datos PostgreSQL\n\n## Educación\n- Ingeniería de Sistemas\n"
+)
+
+ALL_ROUTES = ["login", "me", "analyze_job", "generate_cv", "usage_history", "usage_stats"]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start(module_app: str, port: int, env: dict) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", module_app, "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning"]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env)
+
+
+async def _wait_ready(url: str, timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                r = await client.get(url)
+                if r.status_code < 400:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} no respondió en {timeout_s}s")
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _summarize(latencies_ms: list[float], errors: int, wall_s: float) -> dict:
+    lat = sorted(latencies_ms)
+    total = len(lat) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / wall_s, 2) if wall_s else 0.0,
+        "p50_ms": round(_percentile(lat, 50), 1),
+        "p95_ms": round(_percentile(lat, 95), 1),
+        "p99_ms": round(_percentile(lat, 99), 1),
+        "max_ms": round(lat[-1], 1) if lat else 0.0,
+    }
+
+
+class Scenario:
+    """Peticiones de cada ruta. Cada usuario tiene su token y un job_id ya analizado."""
+
+    def __init__(self, client: httpx.AsyncClient, users: list[dict]):
+        self.client = client
+        self.users = users
+
+    def _user(self) -> dict:
+        return random.choice(self.users)
+
+    async def login(self):
+        u = self._user()
+        return await self.client.post("/auth/login-user", json={"email": u["email"], "password": u["password"]})
+
+    async def me(self):
+        return await self.client.get("/auth/me", headers=self._user()["headers"])
+
+    async def analyze_job(self):
+        return await self.client.post(
+            "/cv-boost/analyze_job", data={"job_description": JOB_DESCRIPTION}, headers=self._user()["headers"]
+        )
+
+    async def generate_cv(self):
+        u = self._user()
+        return await self.client.post(
+            "/cv-boost/generate_cv/strict",
+            data={"job_id": u["job_id"]},
+            files={"cv": ("cv.md", CV_MARKDOWN.encode(), "text/markdown")},
+            headers=u["headers"],
+        )
+
+    async def usage_history(self):
+        return await self.client.get("/cv-boost/usage_history?limit=50", headers=self._user()["headers"])
+
+    async def usage_stats(self):
+        return await self.client.get("/cv-boost/usage_stats", headers=self._user()["headers"])
+
+
+async def _prepare_users(client: httpx.AsyncClient, n: int) -> list[dict]:
+    users = []
+    run = datetime.now().strftime("%H%M%S")
+    for i in range(n):
+        email = f"bench{run}-{i}@example.com"
+        password = "bench-password"
+        r = await client.post("/auth/register-user", json={"email": email, "password": password})
+        r.raise_for_status()
+        r = await client.post("/auth/login-user", json={"email": email, "password": password})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        r = await client.post("/cv-boost/analyze_job", data={"job_description": JOB_DESCRIPTION}, headers=headers)
+        r.raise_for_status()
+        users.append({"email": email, "password": password, "headers": headers, "job_id": r.json()["job_id"]})
+    return users
+
+
+async def _run_route(fn, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                r = await fn()
+                ok = r.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - t0) * 1000)
+            else:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return _summarize(latencies, errors, time.perf_counter() - t0)
+
+
+def _compare(current: dict, baseline: dict, threshold_pct: float) -> list[str]:
+    regressions = []
+    print(f"\nComparación con baseline ({baseline.get('timestamp')}):")
+    for route, stats in current["routes"].items():
+        base = baseline.get("routes", {}).get(route)
+        if route in current.get("failed_routes", ()):
+            print(f"  {route:<14} errores {stats['errors']}/{stats['requests']} <-- REGRESIÓN")
+            regressions.append(f"{route}.errors")
+            continue  # las latencias de una ruta que falla no son comparables
+        if not base:
+            continue
+        if base.get("errors"):
+            # una baseline con fallos mide respuestas de error (p50=0 si fallaron todas): no sirve
+            print(f"  {route:<14} baseline con {base['errors']} errores: no se compara")
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if base[metric]:
+                delta = 100 * (stats[metric] - base[metric]) / base[metric]
+                flag = " <-- REGRESIÓN" if delta > threshold_pct else ""
+                print(f"  {route:<14} {metric:<7} {base[metric]:>9.1f} -> {stats[metric]:>9.1f} ({delta:+.1f}%){flag}")
+                if flag:
+                    regressions.append(f"{route}.{metric}")
+        if base["rps"]:
+            delta = 100 * (stats["rps"] - base["rps"]) / base["rps"]
+            flag = " <-- REGRESIÓN" if -delta > threshold_pct else ""
+            print(f"  {route:<14} rps     {base['rps']:>9.1f} -> {stats['rps']:>9.1f} ({delta:+.1f}%){flag}")
+            if flag:
+                regressions.append(f"{route}.rps")
+    return regressions
+
+
+async def main_async(args) -> int:
+    tmp = Path(tempfile.mkdtemp(prefix="cvbench-"))
+    llm_port, app_port = _free_port(), _free_port()
+    db_url = args.db if args.db != "sqlite" else f"sqlite+aiosqlite:///{tmp / 'bench.db'}"
+
+    llm_env = {
+        **os.environ,
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_LLM_JITTER_MS": str(args.llm_jitter_ms),
+        "FAKE_LLM_FAILURE_RATE": str(args.llm_failure_rate),
+        "FAKE_LLM_CHUNK_MS": str(args.llm_chunk_ms),
+    }
+    app_env = {
+        **os.environ,
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_API_BASE": f"http://127.0.0.1:{llm_port}",
+        "OPENROUTER_MODEL": "fake/model",
+        "LLM_STREAMING": "true" if args.stream else "false",
+        "LLM_BACKEND_MODE": args.llm_backend,
+        "LLM_CASSETTE_DIR": args.cassettes or "",
+        "JWT_SECRET": "bench-secret",
+        "JWT_ALGORITHM": "HS256",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+        "DATABASE_URL": db_url,
+        "DB_ECHO": "false",
+        "RATE_LIMIT_ENABLED": "false",  # la carga sale de pocos usuarios: sin 429
+        "STORAGE_DIR": str(tmp / "storage"),
+        "MAX_UPLOAD_BYTES": "10485760",
+    }
+
+    procs = [
+        _start("benchmarks.load.fake_openrouter:app", llm_port, llm_env),
+        _start("benchmarks.load.bench_app:app", app_port, app_env),
+    ]
+    try:
+        await _wait_ready(f"http://127.0.0.1:{llm_port}/models")
+        await _wait_ready(f"http://127.0.0.1:{app_port}/ready")
+
+        limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", timeout=120, limits=limits) as client:
+            users = await _prepare_users(client, args.users)
+            scenario = Scenario(client, users)
+            results = {}
+            for route in args.routes:
+                fn = getattr(scenario, route)
+                await _run_route(fn, min(args.warmup, args.requests), args.concurrency)  # calentamiento
+                stats = await _run_route(fn, args.requests, args.concurrency)
+                results[route] = stats
+                print(f"{route:<14} {stats['requests']:>5} req  {stats['rps']:>8.1f} req/s  "
+                      f"p50 {stats['p50_ms']:>8.1f}  p95 {stats['p95_ms']:>8.1f}  "
+                      f"p99 {stats['p99_ms']:>8.1f} ms  errores {stats['errors']}")
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "db": "sqlite" if args.db == "sqlite" else "postgres",
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_failure_rate": args.llm_failure_rate,
+            "stream": args.stream,
+            "llm_backend": args.llm_backend,
+        },
+        "routes": results,
+    }
+    max_error_rate = args.llm_failure_rate if args.max_error_rate is None else args.max_error_rate
+    failed = [r for r, st in results.items() if st["requests"] and st["errors"] / st["requests"] > max_error_rate]
+    report["failed_routes"] = failed
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    out = Path(args.out) if args.out else RESULTS_DIR / f"load-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados guardados en {out}")
+    if failed:
+        print(f"Rutas con errores por encima de {max_error_rate:.0%}: {', '.join(failed)} "
+              "(no usar estos resultados como baseline)")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = _compare(report, baseline, args.threshold_pct)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga de CV Booster")
+    parser.add_argument("--db", default="sqlite", help="'sqlite' (temporal) o una DATABASE_URL de Postgres")
+    parser.add_argument("--routes", nargs="+", default=ALL_ROUTES, choices=ALL_ROUTES)
+    parser.add_argument("--requests", type=int, default=100, help="peticiones medidas por ruta")
+    parser.add_argument("--warmup", type=int, default=10, help="peticiones de calentamiento por ruta")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-chunk-ms", type=float, default=15)
+    parser.add_argument("--stream", action="store_true", help="activar LLM_STREAMING en la app")
+    parser.add_argument("--llm-backend", default="live", choices=["live", "record", "replay", "replay_fast"],
+                        help="LLM_BACKEND_MODE de la app (replay_fast mide solo la parte no-LLM)")
+    parser.add_argument("--cassettes", help="LLM_CASSETTE_DIR para record/replay")
+    parser.add_argument("--out", help="ruta del JSON de resultados")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--threshold-pct", type=float, default=10.0, help="umbral de regresión en %%")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--max-error-rate", type=float, default=None,
+                        help="fracción de errores admitida por ruta (por defecto --llm-failure-rate); "
+                             "si alguna ruta la supera, sale con código 1")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
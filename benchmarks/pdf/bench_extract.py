@@ -0,0 +1,164 @@
+# benchmarks/pdf/bench_extract.py
+# Compara los motores de extracción de utils/extractor.py (PDF_ENGINES) sobre un corpus de CVs:
+#   - velocidad: páginas/segundo (mejor de --repeat pasadas por PDF)
+#   - fidelidad frente al texto de referencia (<nombre>.txt junto al PDF):
+#       recall   palabras de la referencia recuperadas (bolsa de palabras)
+#       orden    similitud de la secuencia de palabras (difflib) = orden de lectura
+#       mezcla   % de líneas extraídas que mezclan las dos columnas (solo two_columns_*)
+# Sin --corpus se genera el corpus sintético (make_corpus.py). Se pueden añadir CVs reales
+# a un directorio propio: los PDF sin .txt solo cuentan para la velocidad.
+# Uso: python benchmarks/pdf/bench_extract.py [--corpus DIR] [--engines pdfplumber,pypdfium2] [--repeat 3]
+import argparse
+import difflib
+import json
+import os
+import re
+import statistics
+import sys
+import time
+import unicodedata
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Entorno mínimo para que Settings cargue sin .env (el extractor solo lee PDF_ENGINE/MAX_UPLOAD_BYTES)
+for key, value in {
+    "OPENROUTER_API_KEY": "bench", "OPENROUTER_API_BASE": "http://127.0.0.1:9/", "OPENROUTER_MODEL": "fake/model",
+    "JWT_SECRET": "bench", "JWT_ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "DATABASE_URL": "sqlite+aiosqlite:///:memory:", "STORAGE_DIR": "storage", "MAX_UPLOAD_BYTES": "10485760",
+}.items():
+    os.environ.setdefault(key, value)
+
+from utils.extractor import PDF_ENGINES  # noqa: E402
+from make_corpus import DEFAULT_OUT, make_corpus  # noqa: E402
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def words(text: str) -> list[str]:
+    folded = unicodedata.normalize("NFKD", text.lower())
+    return _WORD_RE.findall("".join(c for c in folded if not unicodedata.combining(c)))
+
+
+def recall(reference: list[str], extracted: list[str]) -> float:
+    if not reference:
+        return 1.0
+    ref, got = Counter(reference), Counter(extracted)
+    return sum(min(n, got[w]) for w, n in ref.items()) / len(reference)
+
+
+def order_similarity(reference: list[str], extracted: list[str]) -> float:
+    if not reference:
+        return 1.0
+    return difflib.SequenceMatcher(None, reference, extracted, autojunk=False).ratio()
+
+
+def mixed_lines(reference_text: str, extracted_text: str) -> float:
+    """% de líneas que contienen palabras exclusivas de la barra lateral y de la columna principal."""
+    ref_lines = reference_text.split("\n")
+    split = next((i for i, l in enumerate(ref_lines) if l == "Perfil profesional"), None)
+    if split is None:
+        return 0.0
+    side = set(words("\n".join(ref_lines[:split])))
+    main = set(words("\n".join(ref_lines[split:])))
+    side_only, main_only = side - main, main - side
+    lines = [set(words(l)) for l in extracted_text.split("\n") if l.strip()]
+    if not lines:
+        return 0.0
+    return 100 * sum(1 for l in lines if l & side_only and l & main_only) / len(lines)
+
+
+def bench_engine(name: str, pdfs: list[Path], repeat: int) -> dict:
+    extract = PDF_ENGINES[name]
+    pages = seconds = 0.0
+    per_layout: dict[str, dict[str, list]] = {}
+    errors = 0
+    for pdf in pdfs:
+        data = pdf.read_bytes()
+        best, text_pages = float("inf"), None
+        try:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                text_pages = extract(data)
+                best = min(best, time.perf_counter() - started)
+        except Exception as e:
+            print(f"  [{name}] {pdf.name}: error {e}")
+            errors += 1
+            continue
+        pages += len(text_pages)
+        seconds += best
+        ref_path = pdf.with_suffix(".txt")
+        if not ref_path.exists():
+            continue
+        reference = ref_path.read_text(encoding="utf-8")
+        text = "\n".join(text_pages)
+        ref_words, got_words = words(reference), words(text)
+        layout = pdf.stem.rsplit("_", 1)[0]
+        m = per_layout.setdefault(layout, {"recall": [], "order": [], "mixed": []})
+        m["recall"].append(recall(ref_words, got_words))
+        m["order"].append(order_similarity(ref_words, got_words))
+        if layout == "two_columns":
+            m["mixed"].append(mixed_lines(reference, text))
+    return {
+        "pages": int(pages),
+        "seconds": round(seconds, 4),
+        "pages_per_sec": round(pages / seconds, 1) if seconds else None,
+        "errors": errors,
+        "fidelity": {
+            layout: {k: round(statistics.mean(v), 3) for k, v in m.items() if v}
+            for layout, m in per_layout.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de motores de extracción de PDF")
+    parser.add_argument("--corpus", help="directorio con PDFs (y .txt de referencia); por defecto el sintético")
+    parser.add_argument("--engines", default=",".join(PDF_ENGINES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="ruta del JSON de resultados")
+    args = parser.parse_args()
+
+    corpus = Path(args.corpus) if args.corpus else DEFAULT_OUT
+    if not args.corpus and not any(corpus.glob("*.pdf")):
+        make_corpus(corpus)
+    pdfs = sorted(corpus.glob("*.pdf"))
+    if not pdfs:
+        sys.exit(f"Sin PDFs en {corpus}")
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    report = {"timestamp": datetime.now().isoformat(timespec="seconds"), "corpus": str(corpus),
+              "pdfs": len(pdfs), "engines": {}}
+    for name in engines:
+        # primera pasada fuera de la medición: imports y cachés del motor
+        PDF_ENGINES[name](pdfs[0].read_bytes())
+        report["engines"][name] = bench_engine(name, pdfs, args.repeat)
+
+    print(f"{len(pdfs)} PDFs en {corpus}\n")
+    print(f"{'motor':<12} {'págs/s':>9} {'págs':>6}")
+    for name, r in report["engines"].items():
+        print(f"{name:<12} {r['pages_per_sec'] or 0:>9.1f} {r['pages']:>6}" + (f"  ({r['errors']} errores)" if r["errors"] else ""))
+    layouts = sorted({l for r in report["engines"].values() for l in r["fidelity"]})
+    for layout in layouts:
+        print(f"\n{layout}")
+        print(f"  {'motor':<12} {'recall':>7} {'orden':>7} {'mezcla%':>8}")
+        for name, r in report["engines"].items():
+            f = r["fidelity"].get(layout, {})
+            mixed = f"{f['mixed']:8.1f}" if "mixed" in f else f"{'-':>8}"
+            print(f"  {name:<12} {f.get('recall', 0):7.3f} {f.get('order', 0):7.3f} {mixed}")
+    if "scanned" in layouts:
+        print("\n(scanned: PDFs sin capa de texto; ningún motor local los lee sin OCR)")
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    out = Path(args.out) if args.out else RESULTS_DIR / f"pdf-extract-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nResultados guardados en {out}")
+
+
+if __name__ == "__main__":
+    main()
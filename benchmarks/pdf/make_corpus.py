@@ -0,0 +1,191 @@
+# benchmarks/pdf/make_corpus.py
+# Genera un corpus sintético de CVs en PDF con su texto de referencia (<nombre>.txt) para
+# benchmarks/pdf/bench_extract.py: una columna, dos columnas (barra lateral), CV largo con
+# cabecera/pie repetidos en cada página y un "escaneado" (solo imagen, sin capa de texto).
+# Uso: python benchmarks/pdf/make_corpus.py [--out benchmarks/pdf/corpus] [--seed 7]
+import argparse
+import io
+import random
+from pathlib import Path
+
+DEFAULT_OUT = Path(__file__).resolve().parent / "corpus"
+
+NAMES = ["María José Pérez", "Carlos Gómez Ruiz", "Lucía Fernández", "Andrés Martín Núñez"]
+ROLES = ["Desarrolladora Backend", "Ingeniero de Datos", "Full Stack Developer", "DevOps Engineer"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Tech", "Hooli", "Stark Industries"]
+BULLETS = [
+    "Diseño y desarrollo de APIs REST con FastAPI y PostgreSQL para más de 20.000 usuarios.",
+    "Automatización de despliegues con Docker, GitHub Actions y Terraform en AWS.",
+    "Reducción de la latencia p95 de 800 ms a 240 ms optimizando consultas SQL.",
+    "Migración de un monolito Django a microservicios en Kubernetes.",
+    "Mentoring de 3 desarrolladores junior y revisión de código del equipo.",
+    "Pipelines de datos con Airflow y Spark procesando 2 TB diarios.",
+    "Integración de pasarelas de pago (Stripe, Redsys) y facturación electrónica.",
+    "Monitorización con Prometheus y Grafana; guardias y gestión de incidencias.",
+]
+SKILLS = ["Python", "FastAPI", "Django", "PostgreSQL", "Docker", "Kubernetes", "AWS", "Terraform",
+          "Redis", "Kafka", "React", "TypeScript", "Git", "Linux", "CI/CD", "Airflow"]
+
+
+def _cv_content(rnd: random.Random, jobs: int) -> dict:
+    name = rnd.choice(NAMES)
+    experience = []
+    year = 2024
+    for _ in range(jobs):
+        start = year - rnd.randint(1, 3)
+        experience.append({
+            "title": f"{rnd.choice(ROLES)} - {rnd.choice(COMPANIES)} ({start} - {year})",
+            "bullets": rnd.sample(BULLETS, rnd.randint(3, 5)),
+        })
+        year = start
+    return {
+        "name": name,
+        "headline": rnd.choice(ROLES),
+        "contact": [f"{name.split()[0].lower()}@example.com", "+34 600 123 456", "Madrid, España"],
+        "profile": "Ingeniera de software con experiencia en sistemas distribuidos, APIs de alto "
+                   "rendimiento y equipos ágiles. Orientada a la calidad, la observabilidad y la automatización.",
+        "experience": experience,
+        "education": [f"Grado en Ingeniería Informática - Universidad Politécnica de Madrid ({year - 5} - {year - 1})"],
+        "skills": rnd.sample(SKILLS, 10),
+        "languages": ["Español (nativo)", "Inglés (C1)", "Francés (B1)"],
+    }
+
+
+def _lines_main(cv: dict) -> list[tuple[str, str]]:
+    """(estilo, texto) de la columna principal en orden de lectura."""
+    out = [("h2", "Perfil profesional"), ("p", cv["profile"]), ("h2", "Experiencia")]
+    for job in cv["experience"]:
+        out.append(("h3", job["title"]))
+        out.extend(("li", b) for b in job["bullets"])
+    out.append(("h2", "Educación"))
+    out.extend(("p", e) for e in cv["education"])
+    return out
+
+
+def _lines_side(cv: dict) -> list[tuple[str, str]]:
+    return ([("h2", "Contacto")] + [("p", c) for c in cv["contact"]]
+            + [("h2", "Habilidades")] + [("li", s) for s in cv["skills"]]
+            + [("h2", "Idiomas")] + [("li", l) for l in cv["languages"]])
+
+
+STYLES = {"h1": ("B", 18, 9), "h2": ("B", 12, 7), "h3": ("B", 10, 6), "p": ("", 10, 5), "li": ("", 10, 5)}
+
+
+def _write(pdf, x: float, width: float, lines: list[tuple[str, str]]) -> None:
+    for style, text in lines:
+        emphasis, size, height = STYLES[style]
+        pdf.set_font("helvetica", emphasis, size)
+        pdf.set_x(x)
+        if style == "h2":
+            pdf.ln(2)
+            pdf.set_x(x)
+        pdf.multi_cell(width, height, ("- " if style == "li" else "") + text, new_x="LEFT", new_y="NEXT")
+
+
+def _reference(lines: list[tuple[str, str]]) -> str:
+    return "\n".join(("- " if style == "li" else "") + text for style, text in lines)
+
+
+def single_column(cv: dict) -> tuple[bytes, str]:
+    from fpdf import FPDF
+    pdf = FPDF(format="A4")
+    pdf.add_page()
+    head = [("h1", cv["name"]), ("p", cv["headline"]), ("p", " | ".join(cv["contact"]))]
+    body = _lines_main(cv) + [("h2", "Habilidades"), ("p", ", ".join(cv["skills"])),
+                              ("h2", "Idiomas"), ("p", ", ".join(cv["languages"]))]
+    _write(pdf, pdf.l_margin, 0, head + body)
+    return bytes(pdf.output()), _reference(head + body)
+
+
+def two_columns(cv: dict) -> tuple[bytes, str]:
+    """Barra lateral a la izquierda y columna principal a la derecha (plantilla "moderna")."""
+    from fpdf import FPDF
+    pdf = FPDF(format="A4")
+    pdf.set_auto_page_break(False)
+    pdf.add_page()
+    head = [("h1", cv["name"]), ("p", cv["headline"])]
+    _write(pdf, pdf.l_margin, 0, head)
+    top = pdf.get_y() + 4
+    side, main = _lines_side(cv), _lines_main(cv)
+    pdf.set_y(top)
+    _write(pdf, 10, 55, side)
+    pdf.set_y(top)
+    _write(pdf, 75, 125, main)
+    # referencia: cabecera, barra lateral y después la columna principal
+    return bytes(pdf.output()), _reference(head + side + main)
+
+
+def long_cv(cv: dict) -> tuple[bytes, str]:
+    """Varias páginas con cabecera y pie repetidos (los quita la compactación, no el motor)."""
+    from fpdf import FPDF
+
+    class _PDF(FPDF):
+        def header(self):
+            self.set_font("helvetica", "I", 8)
+            self.cell(0, 5, f"{cv['name']} - Curriculum Vitae", new_x="LMARGIN", new_y="NEXT")
+
+        def footer(self):
+            self.set_y(-12)
+            self.set_font("helvetica", "I", 8)
+            self.cell(0, 5, f"Página {self.page_no()}", align="C")
+
+    pdf = _PDF(format="A4")
+    pdf.add_page()
+    lines = [("h1", cv["name"]), ("p", cv["headline"]), ("p", " | ".join(cv["contact"]))] + _lines_main(cv)
+    _write(pdf, pdf.l_margin, 0, lines)
+    return bytes(pdf.output()), _reference(lines)
+
+
+def scanned(cv: dict) -> tuple[bytes, str]:
+    """Página como imagen (sin capa de texto): ningún motor local la lee sin OCR."""
+    from fpdf import FPDF
+    from PIL import Image, ImageDraw
+    img = Image.new("L", (1240, 1754), 255)  # A4 a 150 dpi
+    draw = ImageDraw.Draw(img)
+    lines = [("h1", cv["name"]), ("p", cv["headline"])] + _lines_main(cv)[:12]
+    y = 60
+    for _, text in lines:
+        draw.text((80, y), text, fill=0)
+        y += 28
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    pdf = FPDF(format="A4")
+    pdf.add_page()
+    pdf.image(buf, x=0, y=0, w=210)
+    return bytes(pdf.output()), _reference(lines)
+
+
+LAYOUTS = {
+    "single_column": (single_column, 3),
+    "two_columns": (two_columns, 3),
+    "long": (long_cv, 12),
+    "scanned": (scanned, 3),
+}
+
+
+def make_corpus(out: Path, seed: int = 7, per_layout: int = 3) -> list[Path]:
+    out.mkdir(parents=True, exist_ok=True)
+    rnd = random.Random(seed)
+    written = []
+    for layout, (build, jobs) in LAYOUTS.items():
+        for i in range(per_layout):
+            data, reference = build(_cv_content(rnd, jobs))
+            path = out / f"{layout}_{i + 1}.pdf"
+            path.write_bytes(data)
+            path.with_suffix(".txt").write_text(reference, encoding="utf-8")
+            written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Corpus sintético de CVs en PDF")
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--per-layout", type=int, default=3)
+    args = parser.parse_args()
+    written = make_corpus(Path(args.out), args.seed, args.per_layout)
+    print(f"{len(written)} PDFs en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
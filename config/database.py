@@ -1,32 +1,64 @@
 # config/database.py
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import threading
+from typing import Optional
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config.settings import settings
-import ssl
 
-ssl_context = ssl.create_default_context()
+# El engine (y el contexto SSL) se crean en el primer uso o en el arranque de la app,
+# no al importar el módulo: así importar modelos/routers es barato (cold start).
+_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock()
 
-if not settings.DATABASE_URL:
-    raise ValueError("DATABASE_URL no está definido en .env")
-
-# Crear engine async
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,  # pon False en producción si no quieres logs SQL
-    future=True,
-    connect_args={"ssl": ssl_context},  # 👈 aquí pasamos el contexto SSL
-)
-
-# Session local async
-AsyncSessionLocal = sessionmaker(
+# Session local async (se enlaza al engine al crearlo)
+_session_factory = sessionmaker(
     autocommit=False,
     autoflush=False,
-    bind=engine,
     class_=AsyncSession,
     expire_on_commit=False
 )
 
+def get_engine() -> AsyncEngine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if not settings.DATABASE_URL:
+                    raise ValueError("DATABASE_URL no está definido en .env")
+
+                # SSL solo aplica a Postgres (asyncpg); SQLite se usa como stand-in local en benchmarks
+                connect_args = {}
+                if settings.DB_SSL and settings.DATABASE_URL.startswith("postgresql"):
+                    import ssl
+                    connect_args["ssl"] = ssl.create_default_context()  # 👈 aquí pasamos el contexto SSL
+
+                # Crear engine async
+                engine = create_async_engine(
+                    settings.DATABASE_URL,
+                    echo=settings.DB_ECHO,  # pon False en producción si no quieres logs SQL
+                    future=True,
+                    connect_args=connect_args,
+                )
+                _session_factory.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+def current_engine() -> Optional[AsyncEngine]:
+    """Engine ya creado o None (para métricas: no fuerza su creación)."""
+    return _engine
+
+def AsyncSessionLocal(**kwargs) -> AsyncSession:
+    """Nueva sesión async (crea el engine si aún no existe)."""
+    get_engine()
+    return _session_factory(**kwargs)
+
+def __getattr__(name):
+    # compatibilidad: `from config.database import engine` sigue funcionando (crea el engine)
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # Base para tus modelos
 Base = declarative_base()
 
@@ -5,16 +5,113 @@ class Settings(BaseSettings):
     OPENROUTER_API_KEY: str
     OPENROUTER_API_BASE: str
     OPENROUTER_MODEL: str
+    # Listas ordenadas (coma-separadas) de modelos por prompt; vacías = OPENROUTER_MODEL
+    OPENROUTER_EXTRACTOR_MODELS: str = ""
+    OPENROUTER_ADAPTER_MODELS: str = ""
+    MODEL_ROUTER_EWMA_ALPHA: float = 0.3
+    MODEL_ROUTER_ERROR_PENALTY: float = 4.0
+    # Pedir al LLM la respuesta del adaptador en streaming (post-proceso incremental)
+    LLM_STREAMING: bool = True
+    # Backend del LLM: "live", "record", "replay" o "replay_fast" (ver services/llm_cassette.py)
+    LLM_BACKEND_MODE: str = "live"
+    LLM_CASSETTE_DIR: str = ""  # vacío = STORAGE_DIR/llm_cassettes
+
+    # Adaptación del CV: "single" (una llamada), "sections" (una por sección, en paralelo)
+    # o "auto" (por secciones si el CV supera ADAPT_SECTIONS_MIN_TOKENS)
+    ADAPT_CV_MODE: str = "auto"
+    ADAPT_SECTIONS_MIN_TOKENS: int = 1500
+    ADAPT_SECTIONS_CONCURRENCY: int = 4
+    ADAPT_SECTION_MAX_TOKENS: int = 800
+    # Regenerar solo las secciones afectadas al cambiar keywords/options (STORAGE_DIR/cv_results)
+    CV_DELTA_REGENERATION: bool = True
+
+    # Generación especulativa (services/speculation.py): si analyze_job recibe el CV, se adapta
+    # en segundo plano con las keywords sin editar; caduca sin reclamar a los SPECULATION_TTL_S
+    SPECULATIVE_GENERATION: bool = True
+    SPECULATION_TTL_S: float = 600
+
+    # Análisis de ofertas: "llm", "local" o "local_first"
+    ANALYZE_JOB_MODE: str = "llm"
+    LOCAL_ANALYZER_MIN_CONFIDENCE: float = 0.75
 
     JWT_SECRET: str
     JWT_ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
 
     DATABASE_URL: str
+    DB_ECHO: bool = True
+    DB_SSL: bool = True
+
+    # Calentamiento al arrancar (lifespan) y apagado ordenado
+    DB_WARMUP_CONNECTIONS: int = 2
+    LLM_WARMUP_CONNECTIONS: int = 1
+    WARMUP_TIMEOUT_S: float = 20
+    WARMUP_RETRY_S: float = 5  # reintento del paso de BD si falló (/ready sigue en 503)
+    SHUTDOWN_DRAIN_TIMEOUT_S: float = 10
+
+    # Límites por usuario (utils/rate_limit.py): token bucket por acción, cuota diaria de
+    # llamadas al LLM (0 = sin cuota) y generaciones concurrentes. Backend "memory" o "db".
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_ANALYZE_PER_MIN: float = 10
+    RATE_LIMIT_ANALYZE_BURST: int = 5
+    RATE_LIMIT_GENERATE_PER_MIN: float = 4
+    RATE_LIMIT_GENERATE_BURST: int = 2
+    LLM_DAILY_QUOTA: int = 50
+    MAX_CONCURRENT_GENERATIONS_PER_USER: int = 2
+
+    # Idempotency-Key en analyze_job/generate_cv (utils/idempotency.py): respuestas guardadas por proceso
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL_S: float = 86400
+    IDEMPOTENCY_MAX_ENTRIES: int = 1000
+
+    # Motor de extracción de texto de PDFs: "pdfplumber", "pdfminer" o "pypdfium2"
+    # (ver utils/extractor.py y benchmarks/pdf/bench_extract.py)
+    PDF_ENGINE: str = "pdfplumber"
+
+    # Retención (services/retention.py): días a conservar por tabla (0 = para siempre) y
+    # barrido periódico por lotes. LLM_USAGE_PARTITIONED: llm_usage particionada por mes (Postgres)
+    RETENTION_ENABLED: bool = True
+    RETENTION_INTERVAL_S: float = 3600
+    RETENTION_BATCH_SIZE: int = 1000
+    RETENTION_BATCH_PAUSE_MS: float = 50
+    RETENTION_MAX_BATCHES: int = 200  # por tabla y barrido; el resto queda para el siguiente
+    SESSIONS_RETENTION_DAYS: int = 7  # desde que expiran o se revocan
+    EMAIL_CONFIRMATIONS_RETENTION_DAYS: int = 7
+    LLM_USAGE_RETENTION_DAYS: int = 365
+    LLM_USAGE_PARTITIONED: bool = False
+    LLM_USAGE_PARTITIONS_AHEAD: int = 2
+    JOB_FILES_RETENTION_DAYS: int = 30  # STORAGE_DIR/tmp_jobs y cv_results
+
+    # Exportación en streaming de llm_usage (GET /cv-boost/usage_export): filas por lote del
+    # cursor y token (header X-Export-Token) para exportar todos los usuarios; vacío = desactivado
+    USAGE_EXPORT_BATCH_ROWS: int = 500
+    USAGE_EXPORT_TOKEN: str = ""
 
     STORAGE_DIR: str
     MAX_UPLOAD_BYTES: int
 
+    # Detección de bloqueos del event loop y profiler por petición (X-Profile: <PROFILING_TOKEN>)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_MS: float = 50
+    LOOP_BLOCK_THRESHOLD_MS: float = 100
+    PROFILING_TOKEN: str = ""  # vacío = profiler desactivado
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5
+    PROFILES_RETENTION_DAYS: int = 7  # STORAGE_DIR/profiles (barrido de services/retention.py)
+
+    # Compresión de respuestas (gzip, o brotli si está instalado) a partir de este tamaño
+    COMPRESSION_MIN_BYTES: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Exportación a PDF/DOCX (services/renderer.py): procesos del pool y artefactos en caché
+    RENDER_WORKERS: int = 2
+    RENDER_CACHE_MAX_FILES: int = 2000  # 0 = sin límite
+
+    # Compactación del CV antes del LLM (presupuesto en tokens estimados; 0 = sin límite)
+    CV_COMPACTION_ENABLED: bool = True
+    CV_TOKEN_BUDGET: int = 6000
+
     class Config:
         env_file = ".env"
 
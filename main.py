@@ -1,13 +1,47 @@
 # main.py
 import asyncio
-from fastapi import FastAPI
+import logging
+import hmac
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 # Routers
 from routers.cv_boost.cv import router as cv_boost_router
 from routers.auth.auth import router as auth_router
+from config.settings import settings
+from services import lifecycle
+from services.retention import retention_sweeper
+from utils import background
+from utils.metrics import MetricsMiddleware, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from utils.loop_monitor import loop_monitor, ProfilingMiddleware, read_profile
+from utils.responses import ORJSONResponse
+from utils.compression import CompressionMiddleware
+from utils.rate_limit import RateLimitHeadersMiddleware
+from utils.idempotency import IdempotencyMiddleware
 
-app = FastAPI(title="CV Booster")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Avisa (con la pila) cuando una sección síncrona bloquea el event loop
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    # El calentamiento (BD, HTTP a OpenRouter, router de modelos, cachés) corre en segundo
+    # plano: el proceso acepta conexiones de inmediato y /ready responde 200 al terminar.
+    warmup = background.spawn(lifecycle.warm_up(), name="warmup")
+    # Barrido periódico de sesiones, confirmaciones y llm_usage caducados
+    if settings.RETENTION_ENABLED:
+        retention_sweeper.start()
+    try:
+        yield
+    finally:
+        if not warmup.done():
+            warmup.cancel()
+        await retention_sweeper.stop()
+        await lifecycle.shutdown()
+        await loop_monitor.stop()
+
+app = FastAPI(title="CV Booster", lifespan=lifespan, default_response_class=ORJSONResponse)
 # chame es gay
 # Ajusta estos valores a tu entorno (dominios del frontend)
 origins = [
@@ -15,6 +49,9 @@ origins = [
     "http://localhost:3000",  # para desarrollo
 ]
 
+# Idempotency-Key en los endpoints del LLM; el más interno: guarda la respuesta sin comprimir
+# y los reintentos no pasan por el rate limit
+app.add_middleware(IdempotencyMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,        # o ["*"] para pruebas
@@ -23,11 +60,44 @@ app.add_middleware(
     allow_headers=["*"],          # o lista concreta: ["Authorization", "Content-Type"]
     expose_headers=["*"],
 )
+# compresión negociada (br/gzip) de respuestas grandes (cv_markdown, historial completo)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+# cabeceras X-RateLimit-*/X-Quota-* de los endpoints con límite por usuario
+app.add_middleware(RateLimitHeadersMiddleware)
+# métricas por ruta (histogramas de latencia) expuestas en /metrics
+app.add_middleware(MetricsMiddleware)
+# perfil bajo demanda de una petición (header X-Profile con PROFILING_TOKEN)
+app.add_middleware(ProfilingMiddleware)
 
 # registrar routers después de middleware
 app.include_router(cv_boost_router)
 app.include_router(auth_router)
 
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    # Readiness: 503 hasta que termina el calentamiento (y durante el apagado)
+    state = lifecycle.readiness.snapshot()
+    return ORJSONResponse(state, status_code=200 if state["ready"] else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+async def get_profile(profile_id: str, x_profile: str = Header("")):
+    # Perfil guardado por ProfilingMiddleware (collapsed stacks para flamegraph/speedscope)
+    if not settings.PROFILING_TOKEN or not hmac.compare_digest(x_profile.encode(), settings.PROFILING_TOKEN.encode()):
+        raise HTTPException(status_code=404, detail="Not found")
+    content = await asyncio.to_thread(read_profile, profile_id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return PlainTextResponse(content)
+
 @app.get("/")
 async def root():
     return {"message": "CV ATS optimizer"}
\ No newline at end of file
@@ -1,15 +1,19 @@
 import sqlalchemy as sa
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 from config.database import Base
 
 class LLMUsage(Base):
     __tablename__ = "llm_usage"
+    # barrido de retención por fecha (y clave de partición si LLM_USAGE_PARTITIONED)
+    __table_args__ = (sa.Index("ix_llm_usage_created_at", "created_at"),)
     id = sa.Column(sa.BigInteger, primary_key=True, autoincrement=True)
     user_id = sa.Column(UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     request_id = sa.Column(UUID(as_uuid=True))
     model = sa.Column(sa.Text, nullable=False)
     endpoint = sa.Column(sa.Text, nullable=False)
     latency_ms = sa.Column(sa.Integer)
+    stage_timings = sa.Column(sa.JSON().with_variant(JSONB, "postgresql"))  # ms por etapa del pipeline
+    llm_calls = sa.Column(sa.Integer)  # llamadas al LLM de la petición (varias en modo por secciones)
     result = sa.Column(sa.Text)  # Lo que generó la IA
     created_at = sa.Column(sa.TIMESTAMP(timezone=True), server_default=func.now())
\ No newline at end of file
@@ -0,0 +1,9 @@
+import sqlalchemy as sa
+from config.database import Base
+
+class RateLimitBucket(Base):
+    """Token bucket compartido entre workers (RATE_LIMIT_BACKEND=db)."""
+    __tablename__ = "rate_limit_buckets"
+    key = sa.Column(sa.Text, primary_key=True)  # "<accion>:<user_id>"
+    tokens = sa.Column(sa.Float, nullable=False)
+    updated_at = sa.Column(sa.Float, nullable=False)  # epoch en segundos (reloj de la app)
@@ -6,6 +6,11 @@ from sqlalchemy.orm import relationship
 
 class Session(Base):
     __tablename__ = "sessions"
+    # sesiones de un usuario (vigentes primero por fecha); la auth va por PK con el jti del token
+    __table_args__ = (
+        sa.Index("ix_sessions_user_revoked_created", "user_id", "is_revoked", "created_at"),
+        sa.Index("ix_sessions_expires_at", "expires_at"),  # barrido de retención
+    )
 
     id = sa.Column(UUID(as_uuid=True), primary_key=True, server_default=sa.text("gen_random_uuid()"))
     user_id = sa.Column(UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
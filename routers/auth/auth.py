@@ -7,14 +7,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, HTTPException
 from models.user import User
 import sqlalchemy as sa
+import asyncio
 import bcrypt
 from datetime import datetime, timedelta, timezone
 from utils.jwt_utils import create_access_token
-from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer
-from utils.auth_deps import get_current_user
+from utils.auth_deps import get_current_user, token_claims, find_session
+from utils.responses import ORJSONResponse
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], default_response_class=ORJSONResponse)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login-user")
 
@@ -34,7 +35,8 @@ async def register(payload: RegisterIn, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # hashear password
-    hashed = bcrypt.hashpw(payload.password.encode(), bcrypt.gensalt()).decode()
+    # (en thread: bcrypt es deliberadamente lento y bloquearía el event loop)
+    hashed = (await asyncio.to_thread(bcrypt.hashpw, payload.password.encode(), bcrypt.gensalt())).decode()
 
     # crear usuario (ya confirmado)
     user = User(
@@ -52,21 +54,10 @@ async def register(payload: RegisterIn, db: AsyncSession = Depends(get_db)):
 
 @router.post("/logout-user")
 async def logout(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        user_id = payload.get("sub")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    # marca la sesión más reciente como revocada
-    q = await db.execute(
-        sa.select(Session).
-        where(Session.user_id == user_id).
-        where(Session.is_revoked == False).
-        order_by(Session.created_at.desc()).
-        limit(1)
-    )
-    session = q.scalars().first()
+    user_id, session_id = token_claims(token)
+
+    # revoca la sesión del token (jti); tokens sin jti: la sesión más reciente
+    session = await find_session(db, user_id, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="No active session")
 
@@ -88,16 +79,13 @@ async def login(payload: LoginIn, request: Request, db: AsyncSession = Depends(g
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
     # verifica password (passlib/bcrypt)
-    if not bcrypt.checkpw(payload.password.encode(), user.password_hash.encode()):
+    if not await asyncio.to_thread(bcrypt.checkpw, payload.password.encode(), user.password_hash.encode()):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
-    # token JWT
-    expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token({"sub": str(user.id)}, expires_delta=expires)
-
-    # crear sesión en BD (sys.sessions)
+    # crear sesión en BD (sys.sessions); su id va en el token como `jti`
     from uuid import uuid4
     session_id = uuid4()
+    expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     now = datetime.now(timezone.utc)
     expires_at = now + expires
 
@@ -114,6 +102,9 @@ async def login(payload: LoginIn, request: Request, db: AsyncSession = Depends(g
     await db.execute(stmt)
     await db.commit()
 
+    # token JWT
+    access_token = create_access_token({"sub": str(user.id), "jti": str(session_id)}, expires_delta=expires)
+
     return {"access_token": access_token, "token_type": "bearer"}
 
 
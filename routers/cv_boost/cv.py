@@ -1,9 +1,19 @@
 # cv.py (APIRouter) - flujo en 2 pasos
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException, Request, status, Depends
+from fastapi.responses import FileResponse, StreamingResponse
+from utils.responses import ORJSONResponse
 from utils.extractor import extract_text_from_upload
-from services.ai_client import analyze_job, adapt_cv_strict
-from utils.safety import obfuscate_personal_data, postprocess_check
+from services.ai_client import analyze_job, adapt_cv_strict, ANALYZE_JOB_MODES
+from services.job_analyzer import LOCAL_ANALYZER_MODEL
+from services import renderer, usage_export
+from services.cv_sections import ADAPT_CV_MODES, resolve_mode, adapt_cv_by_sections
+from services.cv_results import cv_digest, load_result, save_result, plan_delta
+from services.speculation import speculation_registry, take_result
+from utils.safety import (
+    obfuscate_personal_data, rehydrate_personal_data, PIIRehydrator, IncrementalPostprocessChecker
+)
+from utils.compactor import compact_cv_text
+from utils.ats_score import score_cv
 from utils.llm_tracker import create_tracker
 from config.settings import settings
 from config.database import get_db
@@ -11,41 +21,107 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, func, and_
 
 import asyncio
+import hmac
 import json
 import os
 from pathlib import Path
 import uuid
 from typing import Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from utils.auth_deps import get_current_user
+from utils.rate_limit import rate_limited, release_quota
 from models.user import User
 from models.llmUsage import LLMUsage
 
+# Filas de llm_usage de generaciones servidas enteras desde el resultado anterior (sin LLM)
+CACHED_GENERATION_ENDPOINT = "/cv-boost/generate_cv/cached"
+
 router = APIRouter(
     prefix="/cv-boost", 
     tags=["cv-boost"], 
-    dependencies=[Depends(get_current_user)]
+    dependencies=[Depends(get_current_user)],
+    default_response_class=ORJSONResponse
     )
 
-# Aseguramos carpeta de almacenamiento temporal
+# Carpeta de almacenamiento temporal (se crea al guardar el primer job)
 TMP_JOBS_DIR = Path(settings.STORAGE_DIR) / "tmp_jobs"
-TMP_JOBS_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def _load_job(job_id: str) -> dict:
+    """Lee el job guardado por analyze_job (job_description + extractor_json)."""
+    save_path = TMP_JOBS_DIR / f"{job_id}.json"
+    if not save_path.exists():
+        raise HTTPException(status_code=404, detail="job_id no encontrado o expirado")
+
+    try:
+        with open(save_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error leyendo job guardado: {e}")
+
+
+def _save_job(job_id: str, data: dict) -> None:
+    TMP_JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    save_path = TMP_JOBS_DIR / f"{job_id}.json"
+    with open(save_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _prepare_llm_text(original_text: str, tracker) -> tuple[str, dict, Optional[dict]]:
+    """Compacta (si está activo) y ofusca el texto del CV. Devuelve (texto ofuscado, mapping, compaction)."""
+    # Compactar el texto (espacios, cabeceras/pies repetidos, guiones, presupuesto de tokens)
+    if settings.CV_COMPACTION_ENABLED:
+        with tracker.span("compact"):
+            llm_text, compaction = compact_cv_text(original_text, settings.CV_TOKEN_BUDGET)
+    else:
+        llm_text, compaction = original_text, None
+
+    # Ofuscar datos personales antes de mandar a LLM
+    with tracker.span("obfuscate"):
+        obf_text, mapping = obfuscate_personal_data(llm_text)
+    return obf_text, mapping, compaction
+
+
+async def _start_speculation(db: AsyncSession, user_id, job_id: str, cv: UploadFile, extractor_json: dict,
+                             tracker) -> str:
+    """Lanza la adaptación especulativa del CV subido en analyze_job. Devuelve el estado para la respuesta."""
+    try:
+        original_text = await extract_text_from_upload(cv)
+    except HTTPException as e:
+        return f"skipped: {e.detail}"
+    if not original_text or not original_text.strip():
+        return "skipped: CV vacío"
+    obf_text, _, _ = _prepare_llm_text(original_text, tracker)
+    adapt_mode, _ = resolve_mode(None, obf_text)
+    if adapt_mode != "single":
+        return "skipped: modo por secciones"
+    skipped = await speculation_registry.start(db, user_id, job_id, cv_digest(obf_text), obf_text, extractor_json)
+    return f"skipped: {skipped}" if skipped else "started"
 
 
 @router.post("/analyze_job", status_code=status.HTTP_201_CREATED)
 async def analyze_job_endpoint(
+    request: Request,
     job_description: str = Form(...),
     keywords: Optional[str] = Form(None),
+    mode: Optional[str] = Form(None),  # "llm" | "local" | "local_first" (default: settings)
+    cv: Optional[UploadFile] = File(None),  # opcional: arranca la generación especulativa
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    _rate_limit: None = Depends(rate_limited("analyze")),
 ):
     """
     Paso A - Analizador:
     - recibe: job_description (string) y opcionalmente keywords (coma-separadas)
+    - opcional: mode para elegir analizador LLM, local o local con refinamiento LLM
+    - opcional: cv (pdf/md); el CV se adapta ya en segundo plano con estas keywords y, si el
+      usuario las confirma sin cambios, generate_cv/strict lo sirve al instante
     - devuelve: extractor_json + job_id (uuid) guardado temporalmente para confirmación
     """
     if not job_description or not job_description.strip():
         raise HTTPException(status_code=400, detail="job_description requerido")
+    if mode and mode not in ANALYZE_JOB_MODES:
+        raise HTTPException(status_code=400, detail=f"mode debe ser uno de: {', '.join(ANALYZE_JOB_MODES)}")
 
     # Iniciar tracking de IA
     tracker = create_tracker()
@@ -53,7 +129,11 @@ async def analyze_job_endpoint(
 
     try:
         # Llamada al extractor (prompt A)
-        extractor_json = analyze_job(job_description)
+        # (en thread: la llamada al LLM y el analizador local son síncronos)
+        with tracker.span("analyze"):
+            extractor_json = await asyncio.to_thread(analyze_job, job_description, tracker, mode)
+        if tracker.model == LOCAL_ANALYZER_MODEL:
+            release_quota(request)  # local_first sin refinar: no llegó a usar el LLM
 
         # Fusionar keywords manuales si vienen
         kw_list = [k.strip() for k in (keywords or "").split(",") if k.strip()]
@@ -63,16 +143,21 @@ async def analyze_job_endpoint(
 
         # Guardar JSON en disco con job_id
         job_id = uuid.uuid4().hex
-        save_path = TMP_JOBS_DIR / f"{job_id}.json"
         try:
-            with open(save_path, "w", encoding="utf-8") as f:
-                json.dump({
+            with tracker.span("save_job"):
+                await asyncio.to_thread(_save_job, job_id, {
                     "job_description": job_description,
                     "extractor_json": extractor_json
-                }, f, ensure_ascii=False, indent=2)
+                })
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"No se pudo guardar job: {e}")
 
+        # Generación especulativa mientras el usuario revisa las keywords
+        speculation = None
+        if cv is not None and settings.SPECULATIVE_GENERATION and isinstance(extractor_json, dict):
+            with tracker.span("speculate"):
+                speculation = await _start_speculation(db, current_user.id, job_id, cv, extractor_json, tracker)
+
         # Registrar uso de IA
         result_text = json.dumps(extractor_json, ensure_ascii=False, indent=2)
         await tracker.log_usage(
@@ -83,9 +168,11 @@ async def analyze_job_endpoint(
             result=result_text
         )
 
-        return JSONResponse({
+        return ORJSONResponse({
             "job_id": job_id,
             "extractor_json": extractor_json,
+            "speculation": speculation,
+            "stage_timings": tracker.stage_timings(),
             "message": "Analisis generado. Muestra esto al usuario y pídeles confirmar/editar keywords antes de generar el CV."
         })
     
@@ -117,31 +204,39 @@ async def analyze_job_endpoint(
 
 @router.post("/generate_cv/strict", status_code=status.HTTP_200_OK)
 async def generate_cv_endpoint(
+    request: Request,
     job_id: str = Form(...),
     cv: UploadFile = File(...),
     confirm_keywords: Optional[str] = Form(None),  # opcion: usuario pudo editar keywords en UI
     options: Optional[str] = Form(None),  # prompt personalizado del usuario
+    mode: Optional[str] = Form(None),  # "single" | "sections" | "auto" (default: settings)
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    _rate_limit: None = Depends(rate_limited("generate")),
 ):
     """
     Paso B - Generador:
     - recibe: job_id (string) que referencia el extractor_json confirmado, y cv (pdf/md)
     - opcional: confirm_keywords (coma-separadas) si la UI permite editar
     - opcional: options (string) con instrucciones personalizadas del usuario
-    - realiza: ofuscación, adaptador Nivel 1 con prompt personalizado, postprocess checks
-    - devuelve: extractor_json (final), cv_markdown, postprocess_checks, obfuscation_mapping
+    - opcional: mode para adaptar en una sola llamada o por secciones en paralelo (CVs largos)
+    - si ya se generó este CV para este job_id y solo cambian confirm_keywords/options, solo se
+      regeneran las secciones afectadas (sections_reused lista las reutilizadas)
+    - realiza: compactación, ofuscación, adaptador Nivel 1 con prompt personalizado, rehidratación de
+      datos personales, postprocess checks
+    - devuelve: extractor_json (final), cv_markdown, postprocess_checks, obfuscation_mapping, adapt_mode,
+      prompt_report, compaction (tokens ahorrados), ats_score (cobertura de keywords original vs adaptado)
     """
-    # Recuperar el extractor_json guardado
-    save_path = TMP_JOBS_DIR / f"{job_id}.json"
-    if not save_path.exists():
-        raise HTTPException(status_code=404, detail="job_id no encontrado o expirado")
+    if mode and mode not in ADAPT_CV_MODES:
+        raise HTTPException(status_code=400, detail=f"mode debe ser uno de: {', '.join(ADAPT_CV_MODES)}")
 
-    try:
-        with open(save_path, "r", encoding="utf-8") as f:
-            stored = json.load(f)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error leyendo job guardado: {e}")
+    # Iniciar tracking de IA (latency_ms de extremo a extremo; stage_timings con el desglose)
+    tracker = create_tracker()
+    tracker.start_tracking()
+
+    # Recuperar el extractor_json guardado
+    with tracker.span("load_job"):
+        stored = await asyncio.to_thread(_load_job, job_id)
 
     extractor_json = stored.get("extractor_json")
     # Si la UI editó keywords, reemplazamos
@@ -151,42 +246,120 @@ async def generate_cv_endpoint(
             extractor_json["keywords_ats"] = kw_list
 
     # Extraer texto del CV
-    original_text = await extract_text_from_upload(cv)
+    with tracker.span("extract"):
+        original_text = await extract_text_from_upload(cv)
     if not original_text or len(original_text.strip()) == 0:
         raise HTTPException(status_code=400, detail="CV vacío o no se pudo extraer texto")
 
-    # Ofuscar datos personales antes de mandar a LLM
-    obf_text, mapping = obfuscate_personal_data(original_text)
+    # Compactar y ofuscar datos personales antes de mandar a LLM
+    obf_text, mapping, compaction = _prepare_llm_text(original_text, tracker)
 
-    # Iniciar tracking de IA
-    tracker = create_tracker()
-    tracker.start_tracking()
+    # Una sola llamada o, en CVs largos, una por sección en paralelo
+    adapt_mode, sections = resolve_mode(mode, obf_text)
+
+    # Regeneración incremental: si ya hay un resultado por secciones para este job y este CV,
+    # solo vuelven al LLM las secciones afectadas por el cambio de keywords/options
+    digest = cv_digest(obf_text)
+    previous, only, delta_reason = None, None, None
+    if settings.CV_DELTA_REGENERATION and mode != "single":
+        with tracker.span("load_previous"):
+            previous = await asyncio.to_thread(load_result, current_user.id, job_id, digest)
+        if previous is not None and sections is None:
+            adapt_mode, sections = resolve_mode("sections", obf_text)
+        if sections is not None:
+            only, delta_reason = plan_delta(previous, sections, extractor_json, options)
+
+    # Adaptación especulativa lanzada por analyze_job: sirve si coinciden CV, keywords, options y modo
+    speculation, speculation_outcome = None, None
+    if settings.SPECULATIVE_GENERATION:
+        speculation, speculation_outcome = speculation_registry.claim(
+            current_user.id, job_id, digest, extractor_json, options, adapt_mode,
+        )
 
     try:
+        # Post-process incremental: revisa cada línea (ya rehidratada) mientras el LLM hace streaming
+        # (por secciones no hay streaming: las secciones llegan desordenadas y se unen al final)
+        checker = IncrementalPostprocessChecker(original_text)
+        rehydrator = PIIRehydrator(mapping)
+        streaming = settings.LLM_STREAMING and sections is None and speculation is None
+        on_chunk = (lambda chunk: checker.feed(rehydrator.feed(chunk))) if streaming else None
+
         # Llamada al adaptador (en thread para no bloquear event-loop)
-        adapted_md = await asyncio.to_thread(adapt_cv_strict, obf_text, extractor_json, True, options)
+        # (la etapa "adapt" incluye la "llm" más el prompt y el post-proceso en streaming)
+        with tracker.span("adapt"):
+            adapted_md = None
+            llm_called = True
+            if speculation is not None:
+                # ya generado (o en curso) desde analyze_job; si falló, se genera aquí
+                adapted_md = await take_result(speculation, tracker)
+                if adapted_md is None:
+                    speculation_outcome = "failed"
+            if sections is None:
+                if adapted_md is None:
+                    adapted_md = await asyncio.to_thread(adapt_cv_strict, obf_text, extractor_json, True, options, tracker, on_chunk)
+            else:
+                adapted_md, adapted_sections, _ = await adapt_cv_by_sections(
+                    sections, extractor_json, options, tracker,
+                    only=only, previous=previous["adapted"] if only is not None else None,
+                )
+                if delta_reason:
+                    tracker.prompt_report["delta_reason"] = delta_reason
+                llm_called = tracker.prompt_report["sections_generated"] > 0
+                if settings.CV_DELTA_REGENERATION and llm_called:
+                    with tracker.span("save_result"):
+                        await asyncio.to_thread(
+                            save_result, current_user.id, job_id, digest, sections, adapted_sections,
+                            extractor_json, options,
+                        )
+
+        # Restaurar los datos personales en el markdown generado
+        with tracker.span("rehydrate"):
+            cv_markdown = rehydrate_personal_data(adapted_md, mapping)
 
         # Post-process: detectar nuevas líneas/métricas que no estaban en el original
-        checks = postprocess_check(original_text, adapted_md)
+        with tracker.span("postprocess"):
+            if on_chunk is None:
+                checker.feed(cv_markdown)
+            else:
+                checker.feed(rehydrator.finish())
+            checks = checker.finish()
 
-        # Registrar uso de IA
+        # Cobertura ATS local antes/después (sin coste de LLM)
+        with tracker.span("ats_score"):
+            ats_score = score_cv(extractor_json or {}, original_text, cv_markdown)
+
+        # Registrar uso de IA (se guarda la salida del LLM tal cual, sin datos personales).
+        # Si todas las secciones se reutilizaron no hubo llamada al LLM: se registra aparte,
+        # sin consumir cuota ni contar como muestra de latencia de un modelo
+        if not llm_called:
+            release_quota(request)
         await tracker.log_usage(
             db=db,
             user_id=str(current_user.id),
-            model=settings.OPENROUTER_MODEL,
-            endpoint="/cv-boost/generate_cv/strict",
+            model=settings.OPENROUTER_MODEL if llm_called else "local/cv-results",
+            endpoint="/cv-boost/generate_cv/strict" if llm_called else CACHED_GENERATION_ENDPOINT,
             result=adapted_md
         )
 
         # (Opcional) podrías borrar el job guardado aquí o mantenerlo según política
         # os.remove(save_path)
 
-        return JSONResponse({
+        return ORJSONResponse({
             "extractor_json": extractor_json,
-            "cv_markdown": adapted_md,
+            "cv_markdown": cv_markdown,
             "postprocess_checks": checks,
             "obfuscation_mapping": mapping,
-            "custom_instructions_used": options if options and options.strip() else None
+            "custom_instructions_used": options if options and options.strip() else None,
+            "adapt_mode": adapt_mode,
+            "speculation": speculation_outcome,
+            "sections_reused": [
+                {"index": s.index, "kind": s.kind, "title": s.title}
+                for s in sections if s.index in tracker.prompt_report["sections_reused"]
+            ] if sections is not None else [],
+            "prompt_report": tracker.prompt_report,
+            "compaction": compaction,
+            "ats_score": ats_score,
+            "stage_timings": tracker.stage_timings()
         })
     
     except ValueError as e:
@@ -215,6 +388,76 @@ async def generate_cv_endpoint(
         raise
 
 
+@router.post("/score", status_code=status.HTTP_200_OK)
+async def score_cv_endpoint(
+    job_id: str = Form(...),
+    cv: Optional[UploadFile] = File(None),
+    cv_text: Optional[str] = Form(None),
+    adapted_text: Optional[str] = Form(None),
+    confirm_keywords: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Puntuación ATS local (sin LLM) de un CV frente a la oferta de `job_id`:
+    - recibe: cv (pdf/md) o cv_text, y opcionalmente adapted_text para comparar
+    - opcional: confirm_keywords (coma-separadas) para puntuar con las keywords editadas
+    - devuelve: score/coverage/matched/missing para original y adaptado, y delta
+    """
+    stored = await asyncio.to_thread(_load_job, job_id)
+    extractor_json = dict(stored.get("extractor_json") or {})
+    if confirm_keywords:
+        extractor_json["keywords_ats"] = [k.strip() for k in confirm_keywords.split(",") if k.strip()]
+
+    if cv is not None:
+        original_text = await extract_text_from_upload(cv)
+    else:
+        original_text = cv_text
+    if not original_text or not original_text.strip():
+        raise HTTPException(status_code=400, detail="Envía cv o cv_text")
+
+    return ORJSONResponse({
+        "job_id": job_id,
+        "ats_score": score_cv(extractor_json, original_text, adapted_text)
+    })
+
+
+@router.post("/export", status_code=status.HTTP_200_OK)
+async def export_cv_endpoint(
+    cv_markdown: str = Form(...),
+    format: str = Form("pdf"),  # "pdf" | "docx"
+    template: str = Form("classic"),  # ver renderer.TEMPLATES
+    filename: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Exporta el cv_markdown (ya rehidratado, tal como lo devuelve generate_cv/strict) a PDF o DOCX
+    en el servidor. El render corre en un pool de procesos y el artefacto queda en caché por
+    contenido + plantilla + formato: repetir la descarga se sirve desde disco (X-Render-Cache: hit).
+    """
+    fmt = (format or "").lower()
+    if fmt not in renderer.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format debe ser uno de: {', '.join(renderer.FORMATS)}")
+    if template not in renderer.TEMPLATES:
+        raise HTTPException(status_code=400, detail=f"template debe ser uno de: {', '.join(renderer.TEMPLATES)}")
+    if not cv_markdown.strip():
+        raise HTTPException(status_code=400, detail="cv_markdown vacío")
+    if len(cv_markdown) > renderer.MAX_MARKDOWN_CHARS:
+        raise HTTPException(status_code=413, detail="cv_markdown demasiado grande")
+
+    path, cached = await renderer.render(cv_markdown, fmt, template)
+    name = Path(filename or "cv").stem or "cv"
+    return FileResponse(
+        path,
+        media_type=renderer.FORMATS[fmt],
+        filename=f"{name}.{fmt}",
+        headers={
+            "X-Render-Cache": "hit" if cached else "miss",
+            "ETag": f'"{path.stem}"',
+            "Cache-Control": "private, max-age=86400",
+        },
+    )
+
+
 @router.get("/usage_history")
 async def get_usage_history(
     current_user: User = Depends(get_current_user),
@@ -300,12 +543,14 @@ async def get_usage_history(
                 "model": record.model,
                 "endpoint": record.endpoint,
                 "latency_ms": record.latency_ms,
+                "stage_timings": record.stage_timings,
+                "llm_calls": record.llm_calls,
                 "result": result_content,
                 "result_length": len(record.result) if record.result else 0,
                 "created_at": record.created_at.isoformat() if record.created_at else None
             })
         
-        return JSONResponse({
+        return ORJSONResponse({
             "success": True,
             "data": {
                 "history": history,
@@ -331,6 +576,105 @@ async def get_usage_history(
         )
 
 
+@router.get("/usage_export")
+async def export_usage_history(
+    current_user: User = Depends(get_current_user),
+    format: str = "ndjson",  # "ndjson" | "csv"
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    endpoint_filter: Optional[str] = None,
+    model_filter: Optional[str] = None,
+    include_result: bool = False,
+    all_users: bool = False,
+    x_export_token: str = Header(""),
+):
+    """
+    Exporta el historial completo de uso de IA en streaming (NDJSON o CSV), en orden cronológico
+
+    Args:
+        format: "ndjson" (un objeto JSON por línea) o "csv"
+        date_from: Desde esta fecha/hora, inclusive (ISO 8601; sin zona = UTC)
+        date_to: Hasta esta fecha/hora, exclusive
+        endpoint_filter: Filtrar por endpoint (opcional)
+        model_filter: Filtrar por modelo (opcional)
+        include_result: Incluir el texto generado completo (default: False, solo su longitud)
+        all_users: Uso de todos los usuarios (columna user_id); requiere X-Export-Token = USAGE_EXPORT_TOKEN
+    """
+    fmt = (format or "").lower()
+    if fmt not in usage_export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format debe ser uno de: {', '.join(usage_export.FORMATS)}")
+    if date_from and date_to and date_from >= date_to:
+        raise HTTPException(status_code=400, detail="date_from debe ser anterior a date_to")
+    if all_users and (
+        not settings.USAGE_EXPORT_TOKEN
+        or not hmac.compare_digest(x_export_token.encode(), settings.USAGE_EXPORT_TOKEN.encode())
+    ):
+        raise HTTPException(status_code=403, detail="Exportación global no autorizada")
+
+    stmt = usage_export.build_query(
+        user_id=None if all_users else current_user.id,
+        date_from=date_from,
+        date_to=date_to,
+        endpoint_filter=endpoint_filter,
+        model_filter=model_filter,
+        include_result=include_result,
+    )
+    filename = f"llm_usage-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(
+        usage_export.stream_rows(stmt, fmt),
+        media_type=usage_export.FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    """Percentil con interpolación lineal sobre una lista ya ordenada."""
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _stage_percentiles(rows) -> list[dict]:
+    """
+    Agrupa los stage_timings por endpoint y etapa y calcula p50/p95/p99 (ms).
+    `rows`: pares (endpoint, stage_timings).
+    """
+    samples: dict[tuple[str, str], list] = {}
+    for endpoint, timings in rows:
+        if not isinstance(timings, dict):
+            continue
+        for stage, ms in timings.items():
+            if isinstance(ms, (int, float)):
+                samples.setdefault((endpoint, stage), []).append(ms)
+
+    stats = []
+    for (endpoint, stage), values in sorted(samples.items()):
+        values.sort()
+        stats.append({
+            "endpoint": endpoint,
+            "stage": stage,
+            "count": len(values),
+            "p50_ms": round(_percentile(values, 50), 1),
+            "p95_ms": round(_percentile(values, 95), 1),
+            "p99_ms": round(_percentile(values, 99), 1),
+            "max_ms": values[-1]
+        })
+    return stats
+
+
+def _iso_date(value) -> Optional[str]:
+    """func.date devuelve date en Postgres y str ("YYYY-MM-DD") en SQLite."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10]).isoformat()
+    return value.isoformat()
+
+
 @router.get("/usage_stats")
 async def get_usage_stats(
     current_user: User = Depends(get_current_user),
@@ -434,6 +778,20 @@ async def get_usage_stats(
         
         daily_result = await db.execute(daily_stats_stmt)
         daily_stats = daily_result.all()
+
+        # Desglose por etapa (solo registros con stage_timings)
+        stages_stmt = (
+            select(LLMUsage.endpoint, LLMUsage.stage_timings)
+            .where(
+                and_(
+                    LLMUsage.user_id == current_user.id,
+                    LLMUsage.created_at >= start_date,
+                    LLMUsage.stage_timings.isnot(None)
+                )
+            )
+        )
+        stages_result = await db.execute(stages_stmt)
+        stage_stats = _stage_percentiles(stages_result.all())
         
         # Procesar resultados
         stats_data = {
@@ -467,15 +825,16 @@ async def get_usage_stats(
             ],
             "daily_usage": [
                 {
-                    "date": stat.date.isoformat() if stat.date else None,
+                    "date": _iso_date(stat.date),
                     "count": stat.count,
                     "avg_latency_ms": round(stat.avg_latency, 2) if stat.avg_latency else 0
                 }
                 for stat in daily_stats
-            ]
+            ],
+            "by_stage": stage_stats
         }
         
-        return JSONResponse({
+        return ORJSONResponse({
             "success": True,
             "data": stats_data
         })
@@ -527,12 +886,13 @@ async def get_usage_record(
             "model": record.model,
             "endpoint": record.endpoint,
             "latency_ms": record.latency_ms,
+            "stage_timings": record.stage_timings,
             "result": record.result,
             "result_length": len(record.result) if record.result else 0,
             "created_at": record.created_at.isoformat() if record.created_at else None
         }
         
-        return JSONResponse({
+        return ORJSONResponse({
             "success": True,
             "data": record_data
         })
@@ -1,13 +1,44 @@
 # services/ai_client.py
+import threading
 import time
-from openai import OpenAI
+from types import SimpleNamespace
 import os
 from config.settings import settings
+from services.model_router import model_router, PROMPT_EXTRACTOR, PROMPT_ADAPTER
+from services.job_analyzer import analyze_job_local, LOCAL_ANALYZER_MODEL
+from services.llm_cassette import llm_cassette, ChunkRecorder
+from utils.tokens import estimate_tokens, prompt_token_report
+from utils.metrics import LLM_REQUEST_DURATION, LLM_ERRORS
 import logging
 import json
 
-# Inicializa cliente OpenAI apuntando al endpoint de OpenRouter
-client = OpenAI(api_key=settings.OPENROUTER_API_KEY, base_url=settings.OPENROUTER_API_BASE)
+# Cliente OpenAI apuntando al endpoint de OpenRouter. Se construye en el primer uso (o en el
+# arranque de la app): importar `openai` y crear el cliente es caro y retrasa el cold start.
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=settings.OPENROUTER_API_KEY, base_url=settings.OPENROUTER_API_BASE)
+    return _client
+
+def close_client() -> None:
+    """Cierra el pool HTTP del cliente (apagado ordenado)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+def __getattr__(name):
+    # compatibilidad: `ai_client.client` sigue funcionando, pero de forma perezosa
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Prompt A (Extractor) - devuelve JSON con estructura conocida
 PROMPT_A_SYSTEM = """
@@ -103,45 +134,173 @@ OBJETIVO: Crear un CV que maximice las coincidencias con la oferta sin inventar
 Salida: SOLO markdown del CV. Nada más.
 """
 
-def _call_chat(messages: list[dict[str,str]], max_tokens=1500, temperature=0.0) -> str:
+def _is_model_not_found(error_msg: str) -> bool:
+    return "404" in error_msg or "No endpoints found" in error_msg or "not found" in error_msg.lower()
+
+def _stream_completion(model: str, messages: list[dict[str,str]], max_tokens, temperature,
+                       on_chunk, emitted: list) -> str:
+    """
+    Petición en modo streaming: entrega cada delta a `on_chunk` según llega y devuelve
+    el texto completo. `emitted` se rellena con los trozos ya entregados.
+    """
+    stream = get_client().chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True,
+    )
+    for event in stream:
+        try:
+            delta = event.choices[0].delta.content
+        except (AttributeError, IndexError):
+            delta = None
+        if delta:
+            emitted.append(delta)
+            on_chunk(delta)
+    return "".join(emitted)
+
+def _timed_first_chunk(on_chunk, tracker):
+    """
+    Envuelve `on_chunk` para anotar en el tracker la etapa "ttft": ms desde el inicio de la
+    llamada (incluidos reintentos sin texto) hasta que llega el primer trozo en streaming.
+    """
+    started = time.perf_counter()
+    first = True
+
+    def wrapper(delta: str) -> None:
+        nonlocal first
+        if first:
+            first = False
+            tracker.add_stage("ttft", (time.perf_counter() - started) * 1000)
+        on_chunk(delta)
+
+    return wrapper
+
+def _call_chat(messages: list[dict[str,str]], max_tokens=1500, temperature=0.0,
+               prompt: str = PROMPT_ADAPTER, tracker=None, on_chunk=None) -> str:
+    """
+    Llamada central al LLM. Según settings.LLM_BACKEND_MODE llama a OpenRouter (`live`),
+    llama y graba la respuesta en un cassette (`record`) o la reproduce desde el cassette
+    (`replay` con la latencia original, `replay_fast` sin esperas).
+    """
+    if tracker is None:
+        return _call_chat_backend(messages, max_tokens, temperature, prompt, tracker, on_chunk)
+    tracker.llm_calls += 1
+    if on_chunk is not None:
+        on_chunk = _timed_first_chunk(on_chunk, tracker)
+    # tiempo total en el LLM (incluidos reintentos y fallbacks) como etapa del tracker
+    with tracker.span("llm"):
+        return _call_chat_backend(messages, max_tokens, temperature, prompt, tracker, on_chunk)
+
+def _call_chat_backend(messages, max_tokens, temperature, prompt, tracker, on_chunk) -> str:
+    if llm_cassette.replaying:
+        text, model = llm_cassette.replay(messages, max_tokens, temperature, on_chunk=on_chunk)
+        if tracker is not None:
+            tracker.model = model
+        return text
+    if not llm_cassette.recording:
+        return _call_chat_live(messages, max_tokens, temperature, prompt, tracker, on_chunk)
+
+    started = time.perf_counter()
+    recorder = ChunkRecorder(on_chunk, started) if on_chunk is not None else None
+    # el modelo que respondió se lee del tracker; sin tracker se usa uno temporal
+    probe = tracker if tracker is not None else SimpleNamespace(model=None)
+    text = _call_chat_live(messages, max_tokens, temperature, prompt, probe, recorder)
+    llm_cassette.record(
+        messages, max_tokens, temperature,
+        prompt=prompt,
+        model=probe.model,
+        text=text,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+        chunks=recorder.chunks if recorder is not None else None,
+    )
+    return text
+
+def _call_chat_live(messages: list[dict[str,str]], max_tokens=1500, temperature=0.0,
+                    prompt: str = PROMPT_ADAPTER, tracker=None, on_chunk=None) -> str:
     """
     Llamada central al cliente OpenAI/OpenRouter. Extrae el contenido de la respuesta
     de forma robusta para las distintas representaciones que la SDK puede devolver.
+    Prueba los modelos configurados para `prompt` en el orden que decide el router
+    (EWMA de latencia y errores) y cae al siguiente si uno falla.
+    Si se pasa `tracker`, se anota en él el modelo que respondió realmente.
+    Si se pasa `on_chunk`, la respuesta se pide en streaming y cada trozo se entrega
+    a `on_chunk` según llega (solo se cambia de modelo si aún no se entregó nada).
     Retorna: string con el texto del assistant (o string vacío en error).
     """
-    # reintentos simples en caso de fallo transitorio
-    for attempt in range(1, 3):
-        try:
-            resp = client.chat.completions.create(
-                model=settings.OPENROUTER_MODEL,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-            )
+    candidates = model_router.route(prompt)
+    resp = None
+    last_error = None
+    not_found = []
+    # con un solo modelo se reintenta; con varios, el fallback hace de reintento
+    attempts = 2 if len(candidates) == 1 else 1
+    for idx, model in enumerate(candidates):
+        # reintentos simples en caso de fallo transitorio
+        for attempt in range(1, attempts + 1):
+            started = time.perf_counter()
+            emitted = []
+            try:
+                if on_chunk is None:
+                    resp = get_client().chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                    )
+                else:
+                    resp = _stream_completion(model, messages, max_tokens, temperature, on_chunk, emitted)
+            except Exception as e:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                last_error = e
+                error_msg = str(e)
+                if emitted:
+                    # el consumidor ya recibió parte del texto: no se puede rehacer con otro modelo
+                    logging.exception("Streaming interrumpido con %s tras %s trozos", model, len(emitted))
+                    model_router.observe(model, elapsed_ms, error=True)
+                    LLM_ERRORS.labels(prompt, model, "stream_interrupted").inc()
+                    raise
+                # Detectar errores específicos de modelo no encontrado: no tiene sentido reintentar
+                if _is_model_not_found(error_msg):
+                    logging.error("Modelo no encontrado en OpenRouter: %s. Probando el siguiente.", model)
+                    model_router.observe(model, None, error=True)
+                    LLM_ERRORS.labels(prompt, model, "not_found").inc()
+                    not_found.append(model)
+                    break
+                logging.exception("Error llamando al LLM %s (intento %s): %s", model, attempt, e)
+                model_router.observe(model, elapsed_ms, error=True)
+                LLM_ERRORS.labels(prompt, model, "error").inc()
+                if attempt < attempts:
+                    time.sleep(0.8)
+                continue
+            elapsed_s = time.perf_counter() - started
+            model_router.observe(model, elapsed_s * 1000)
+            LLM_REQUEST_DURATION.labels(prompt, model).observe(elapsed_s)
+            if tracker is not None:
+                tracker.model = model
             break
-        except Exception as e:
-            error_msg = str(e)
-            # Detectar errores específicos de modelo no encontrado
-            if "404" in error_msg or "No endpoints found" in error_msg or "not found" in error_msg.lower():
-                logging.error(
-                    "Modelo no encontrado en OpenRouter: %s. "
-                    "Verifica que el modelo esté disponible. "
-                    "Modelos alternativos sugeridos: "
-                    "x-ai/grok-beta, openai/gpt-3.5-turbo, google/gemini-flash-1.5, meta-llama/llama-3.2-3b-instruct:free",
-                    settings.OPENROUTER_MODEL
-                )
-                raise ValueError(
-                    f"Modelo '{settings.OPENROUTER_MODEL}' no está disponible en OpenRouter. "
-                    f"Error: {error_msg}. "
-                    f"Por favor, actualiza OPENROUTER_MODEL en tu archivo .env con un modelo válido. "
-                    f"Modelos sugeridos: x-ai/grok-beta, openai/gpt-3.5-turbo, google/gemini-flash-1.5, "
-                    f"meta-llama/llama-3.2-3b-instruct:free"
-                ) from e
-            logging.exception("Error llamando al LLM (intento %s): %s", attempt, e)
-            if attempt < 2:
-                time.sleep(0.8)
-            else:
-                raise
+        if resp is not None:
+            break
+        if idx < len(candidates) - 1:
+            logging.warning("Fallback de modelo: %s falló, usando el siguiente candidato.", model)
+
+    if resp is None:
+        if tracker is not None:
+            tracker.model = model  # el último intentado: la fila de error se le atribuye a él
+        if len(not_found) == len(candidates):
+            raise ValueError(
+                f"Ningún modelo configurado está disponible en OpenRouter ({', '.join(candidates)}). "
+                f"Error: {last_error}. "
+                f"Por favor, actualiza OPENROUTER_MODEL (o las listas OPENROUTER_EXTRACTOR_MODELS / "
+                f"OPENROUTER_ADAPTER_MODELS) en tu archivo .env con modelos válidos. "
+                f"Modelos sugeridos: x-ai/grok-beta, openai/gpt-3.5-turbo, google/gemini-flash-1.5, "
+                f"meta-llama/llama-3.2-3b-instruct:free"
+            ) from last_error
+        raise last_error
+
+    if isinstance(resp, str):
+        # respuesta ya ensamblada desde el streaming
+        return resp
 
     # Ahora extraer contenido de forma robusta
     try:
@@ -201,15 +360,52 @@ def _call_chat(messages: list[dict[str,str]], max_tokens=1500, temperature=0.0)
     except Exception:
         return ""
 
-def analyze_job(job_text: str) -> dict:
+ANALYZE_JOB_MODES = ("llm", "local", "local_first")
+
+def analyze_job(job_text: str, tracker=None, mode: str = None) -> dict:
+    """
+    Analiza la oferta y devuelve dict con el esquema de PROMPT_A_SYSTEM.
+    `mode` (por defecto settings.ANALYZE_JOB_MODE):
+      - "llm": solo Prompt A.
+      - "local": solo el analizador local (milisegundos, sin coste de LLM).
+      - "local_first": analizador local; si su confianza no llega a
+        LOCAL_ANALYZER_MIN_CONFIDENCE, el LLM refina el pre-análisis local.
+    """
+    mode = mode or settings.ANALYZE_JOB_MODE
+    if mode not in ANALYZE_JOB_MODES:
+        raise ValueError(f"Modo de análisis no soportado: {mode}")
+
+    if mode == "llm":
+        return _analyze_job_llm(job_text, tracker=tracker)
+
+    local = analyze_job_local(job_text)
+    if mode == "local" or local["confidence_score"] >= settings.LOCAL_ANALYZER_MIN_CONFIDENCE:
+        if tracker is not None:
+            tracker.model = LOCAL_ANALYZER_MODEL
+        return local
+
+    refined = _analyze_job_llm(job_text, tracker=tracker, local_hint=local)
+    if refined.get("error"):
+        # el LLM no devolvió JSON usable: mejor el análisis local que un parse_error
+        logging.warning("Refinamiento LLM fallido, se usa el análisis local.")
+        return local
+    refined["source"] = "local+llm"
+    return refined
+
+def _analyze_job_llm(job_text: str, tracker=None, local_hint: dict = None) -> dict:
     """
     Llama al Prompt A y devuelve dict (parseado). Si falla el parseo, tratamos de 'sanear' respuesta.
+    Con `local_hint`, se adjunta el pre-análisis local para que el modelo lo revise y complete.
     """
+    user_content = f"Aquí está la oferta:\n\n{job_text}"
+    if local_hint:
+        hint = json.dumps(local_hint, ensure_ascii=False)
+        user_content += f"\n\nPRE-ANÁLISIS LOCAL (revísalo, corrígelo y complétalo):\n{hint}"
     messages = [
         {"role": "system", "content": PROMPT_A_SYSTEM},
-        {"role": "user", "content": f"Aquí está la oferta:\n\n{job_text}"}
+        {"role": "user", "content": user_content}
     ]
-    raw = _call_chat(messages, temperature=0.0)
+    raw = _call_chat(messages, temperature=0.0, prompt=PROMPT_EXTRACTOR, tracker=tracker)
     # Intentar parsear JSON. El modelo debe devolver JSON puro según instrucción.
     try:
         parsed = json.loads(raw)
@@ -227,9 +423,77 @@ def analyze_job(job_text: str) -> dict:
             parsed = {"error": "parse_error", "raw": raw}
     return parsed
 
+# Guías estáticas (iguales para todas las ofertas). Forman parte del prefijo fijo del
+# system prompt para que el proveedor pueda cachearlo entre peticiones.
+STATIC_MAPPING_GUIDANCE = "\n".join([
+    "SUGERENCIAS DE MAPEO E INFERENCIA AGRESIVA:",
+    "- Si el CV menciona 'JavaScript' → enfatizar frameworks como React, Vue, Angular, Node.js",
+    "- Si el CV menciona 'Python' → destacar frameworks web, data science, automation, pandas, numpy",
+    "- Si el CV menciona 'Base de datos' → especificar PostgreSQL, MySQL, MongoDB, SQL",
+    "- Si el CV menciona 'Cloud' → especificar AWS, Azure, GCP, Docker, Kubernetes",
+    "- Si el CV menciona 'DevOps' → destacar CI/CD, Docker, Kubernetes, Jenkins, GitLab",
+    "- Si el CV menciona 'aplicación web' → inferir HTML, CSS, JavaScript, HTTP, APIs",
+    "- Si el CV menciona 'API' → inferir REST, JSON, HTTP, endpoints, microservicios",
+    "- Si el CV menciona 'móvil' → inferir iOS, Android, React Native, Flutter",
+    "- Si el CV menciona 'ML/AI' → inferir Python, pandas, scikit-learn, TensorFlow, PyTorch",
+    "- Si el CV menciona 'análisis de datos' → inferir SQL, Python, pandas, visualización",
+    "",
+    "TRANSFORMACIÓN DE EXPERIENCIA LABORAL:",
+    "ADAPTACIÓN DE RESPONSABILIDADES:",
+    "- 'Desarrollador Junior' → 'Desarrollador con responsabilidades de liderazgo técnico'",
+    "- 'Mantenimiento de código' → 'Diseño y arquitectura de soluciones'",
+    "- 'Testing manual' → 'Automatización de pruebas y CI/CD'",
+    "- 'Soporte técnico' → 'Gestión de infraestructura y automatización'",
+    "- 'Escribir código' → 'Desarrollar soluciones escalables y optimizadas'",
+    "- 'Corregir bugs' → 'Optimizar rendimiento y mejorar experiencia del usuario'",
+    "- 'Reuniones con clientes' → 'Liderar consultoría técnica y definición de requerimientos'",
+    "- 'Documentar código' → 'Establecer estándares de documentación y mejores prácticas'",
+])
+
+# Bloques de adaptación según el tipo de cargo objetivo (se elige uno por petición)
+ROLE_ADAPTATION_GUIDANCE = {
+    "lead": "\n".join([
+        "ADAPTACIÓN PARA LIDERAZGO:",
+        "- Enfatizar: liderazgo de equipo, mentoring, coordinación, toma de decisiones",
+        "- Transformar: 'Desarrollo individual' → 'Liderazgo de equipo de desarrollo'",
+        "- Añadir: 'Mentoring de desarrolladores junior', 'Coordinación de proyectos'",
+    ]),
+    "devops": "\n".join([
+        "ADAPTACIÓN PARA DEVOPS:",
+        "- Enfatizar: automatización, CI/CD, infraestructura, monitoreo",
+        "- Transformar: 'Despliegue manual' → 'Automatización de despliegues'",
+        "- Añadir: 'Gestión de infraestructura', 'Monitoreo y alertas'",
+    ]),
+    "full_stack": "\n".join([
+        "ADAPTACIÓN PARA FULL STACK:",
+        "- Enfatizar: frontend y backend, arquitectura completa",
+        "- Transformar: 'Desarrollo frontend' → 'Desarrollo full stack con arquitectura completa'",
+        "- Añadir: 'Integración frontend-backend', 'Arquitectura de microservicios'",
+    ]),
+}
+
+PROMPT_B_INPUT_NOTE = """
+FORMATO DE LA ENTRADA:
+El mensaje del usuario trae, en este orden: GUÍAS ESPECÍFICAS PARA ESTA OFERTA, opcionalmente
+INSTRUCCIONES PERSONALIZADAS DEL USUARIO (aplícalas siempre que no contradigan la regla 1),
+opcionalmente MODO POR SECCIONES (entonces CV_ORIGINAL es solo una sección y se devuelve solo
+esa sección adaptada), CV_ORIGINAL y EXTRACTOR_JSON.
+"""
+
+# Prefijo fijo del system prompt del adaptador, construido una sola vez al importar.
+# Debe ser idéntico byte a byte en todas las peticiones: nada por petición va aquí.
+PROMPT_B_STATIC_PREFIX = (
+    PROMPT_B_SYSTEM.rstrip()
+    + "\n\nGUÍAS GENERALES DE MAPEO:\n" + STATIC_MAPPING_GUIDANCE
+    + "\n" + PROMPT_B_INPUT_NOTE
+)
+# Tokens del prefijo estático: se estiman una vez, no en cada informe
+_STATIC_PREFIX_TOKENS = {"system_prefix": estimate_tokens(PROMPT_B_STATIC_PREFIX)}
+
 def _generate_technology_mapping_guidance(extractor_json: dict) -> str:
     """
     Genera guías específicas de mapeo de tecnologías basadas en el análisis de la oferta.
+    Solo incluye lo que depende de la oferta; las guías generales van en PROMPT_B_STATIC_PREFIX.
     """
     guidance = []
     
@@ -253,73 +517,76 @@ def _generate_technology_mapping_guidance(extractor_json: dict) -> str:
         for keyword in keywords_ats[:10]:  # Top 10 keywords
             guidance.append(f"- {keyword}")
     
-    # Sugerencias de mapeo e inferencia agresiva
-    guidance.append("\nSUGERENCIAS DE MAPEO E INFERENCIA AGRESIVA:")
-    guidance.append("- Si el CV menciona 'JavaScript' → enfatizar frameworks como React, Vue, Angular, Node.js")
-    guidance.append("- Si el CV menciona 'Python' → destacar frameworks web, data science, automation, pandas, numpy")
-    guidance.append("- Si el CV menciona 'Base de datos' → especificar PostgreSQL, MySQL, MongoDB, SQL")
-    guidance.append("- Si el CV menciona 'Cloud' → especificar AWS, Azure, GCP, Docker, Kubernetes")
-    guidance.append("- Si el CV menciona 'DevOps' → destacar CI/CD, Docker, Kubernetes, Jenkins, GitLab")
-    guidance.append("- Si el CV menciona 'aplicación web' → inferir HTML, CSS, JavaScript, HTTP, APIs")
-    guidance.append("- Si el CV menciona 'API' → inferir REST, JSON, HTTP, endpoints, microservicios")
-    guidance.append("- Si el CV menciona 'móvil' → inferir iOS, Android, React Native, Flutter")
-    guidance.append("- Si el CV menciona 'ML/AI' → inferir Python, pandas, scikit-learn, TensorFlow, PyTorch")
-    guidance.append("- Si el CV menciona 'análisis de datos' → inferir SQL, Python, pandas, visualización")
-    
-    # Sugerencias específicas para transformación de experiencia laboral
-    guidance.append("\nTRANSFORMACIÓN DE EXPERIENCIA LABORAL:")
-    guidance.append("ADAPTACIÓN DE RESPONSABILIDADES:")
-    guidance.append("- 'Desarrollador Junior' → 'Desarrollador con responsabilidades de liderazgo técnico'")
-    guidance.append("- 'Mantenimiento de código' → 'Diseño y arquitectura de soluciones'")
-    guidance.append("- 'Testing manual' → 'Automatización de pruebas y CI/CD'")
-    guidance.append("- 'Soporte técnico' → 'Gestión de infraestructura y automatización'")
-    guidance.append("- 'Escribir código' → 'Desarrollar soluciones escalables y optimizadas'")
-    guidance.append("- 'Corregir bugs' → 'Optimizar rendimiento y mejorar experiencia del usuario'")
-    guidance.append("- 'Reuniones con clientes' → 'Liderar consultoría técnica y definición de requerimientos'")
-    guidance.append("- 'Documentar código' → 'Establecer estándares de documentación y mejores prácticas'")
-    
     # Adaptación según el tipo de cargo objetivo
-    rol_detectado = extractor_json.get('rol_detectado', '').lower()
+    rol_detectado = (extractor_json.get('rol_detectado') or '').lower()
     if 'lead' in rol_detectado or 'manager' in rol_detectado:
-        guidance.append("\nADAPTACIÓN PARA LIDERAZGO:")
-        guidance.append("- Enfatizar: liderazgo de equipo, mentoring, coordinación, toma de decisiones")
-        guidance.append("- Transformar: 'Desarrollo individual' → 'Liderazgo de equipo de desarrollo'")
-        guidance.append("- Añadir: 'Mentoring de desarrolladores junior', 'Coordinación de proyectos'")
+        guidance.append("\n" + ROLE_ADAPTATION_GUIDANCE["lead"])
     elif 'devops' in rol_detectado or 'sre' in rol_detectado:
-        guidance.append("\nADAPTACIÓN PARA DEVOPS:")
-        guidance.append("- Enfatizar: automatización, CI/CD, infraestructura, monitoreo")
-        guidance.append("- Transformar: 'Despliegue manual' → 'Automatización de despliegues'")
-        guidance.append("- Añadir: 'Gestión de infraestructura', 'Monitoreo y alertas'")
+        guidance.append("\n" + ROLE_ADAPTATION_GUIDANCE["devops"])
     elif 'full stack' in rol_detectado:
-        guidance.append("\nADAPTACIÓN PARA FULL STACK:")
-        guidance.append("- Enfatizar: frontend y backend, arquitectura completa")
-        guidance.append("- Transformar: 'Desarrollo frontend' → 'Desarrollo full stack con arquitectura completa'")
-        guidance.append("- Añadir: 'Integración frontend-backend', 'Arquitectura de microservicios'")
+        guidance.append("\n" + ROLE_ADAPTATION_GUIDANCE["full_stack"])
     
-    return "\n".join(guidance)
+    return "\n".join(guidance).strip()
 
-def adapt_cv_strict(cv_text: str, extractor_json: dict, obfuscated: bool = True, custom_instructions: str = None) -> str:
+def build_adapter_messages(cv_text: str, extractor_json: dict, custom_instructions: str = None,
+                           section_note: str = None) -> tuple[list[dict], dict]:
     """
-    Llama al Prompt B (Nivel 2). Devuelve markdown del CV.
-    `obfuscated` indica si el cv_text ya vino ofuscado; si no, la función no lo hace aquí.
-    `custom_instructions` son instrucciones adicionales del usuario que se combinan con el prompt base.
+    Ensambla los mensajes del Prompt B: primero el prefijo estático (system) y después
+    todo lo que cambia por petición (user). Devuelve (messages, informe_de_tokens).
+    `section_note` (modo por secciones) indica qué sección del CV trae CV_ORIGINAL.
     """
-    # Construir el prompt del sistema combinando el base con las instrucciones personalizadas
-    system_prompt = PROMPT_B_SYSTEM
-    if custom_instructions and custom_instructions.strip():
-        system_prompt += f"\n\nINSTRUCCIONES PERSONALIZADAS DEL USUARIO:\n{custom_instructions.strip()}"
-    
-    # Añadir guías específicas de mapeo de tecnologías
+    dynamic = {}
     tech_guidance = _generate_technology_mapping_guidance(extractor_json)
     if tech_guidance:
-        system_prompt += f"\n\nGUÍAS ESPECÍFICAS PARA ESTA OFERTA:\n{tech_guidance}"
-    
+        dynamic["offer_guidance"] = f"GUÍAS ESPECÍFICAS PARA ESTA OFERTA:\n{tech_guidance}"
+    if custom_instructions and custom_instructions.strip():
+        dynamic["custom_instructions"] = f"INSTRUCCIONES PERSONALIZADAS DEL USUARIO:\n{custom_instructions.strip()}"
+    if section_note:
+        dynamic["section"] = f"MODO POR SECCIONES:\n{section_note.strip()}"
+    dynamic["cv_original"] = f"CV_ORIGINAL:\n{cv_text}"
     extract_json_str = json.dumps(extractor_json, ensure_ascii=False, indent=2)
+    dynamic["extractor_json"] = f"EXTRACTOR_JSON:\n{extract_json_str}"
+
     messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": f"CV_ORIGINAL:\n{cv_text}\n\nEXTRACTOR_JSON:\n{extract_json_str}"}
+        {"role": "system", "content": PROMPT_B_STATIC_PREFIX},
+        {"role": "user", "content": "\n\n".join(dynamic.values())}
     ]
-    md = _call_chat(messages, temperature=0.05)
+    report = prompt_token_report(_STATIC_PREFIX_TOKENS, dynamic)
+    return messages, report
+
+def adapt_cv_strict(cv_text: str, extractor_json: dict, obfuscated: bool = True, custom_instructions: str = None, tracker=None, on_chunk=None) -> str:
+    """
+    Llama al Prompt B (Nivel 2). Devuelve markdown del CV.
+    `obfuscated` indica si el cv_text ya vino ofuscado; si no, la función no lo hace aquí.
+    `custom_instructions` son instrucciones adicionales del usuario; viajan en el mensaje
+    del usuario para no romper el prefijo cacheable del system prompt.
+    Si se pasa `tracker`, se guarda en él el informe de tokens por sección del prompt.
+    Si se pasa `on_chunk`, el markdown se genera en streaming y se entrega por trozos.
+    """
+    messages, report = build_adapter_messages(cv_text, extractor_json, custom_instructions)
+    started = time.perf_counter()
+    md = _call_chat(messages, temperature=0.05, prompt=PROMPT_ADAPTER, tracker=tracker, on_chunk=on_chunk)
+    report["llm_ms"] = int((time.perf_counter() - started) * 1000)
+    if tracker is not None and "ttft" in tracker.stages:
+        report["ttft_ms"] = int(tracker.stages["ttft"])
+    logging.info("Prompt B tokens: %s", report)
+    if tracker is not None:
+        tracker.prompt_report = report
+    return md
+
+def adapt_cv_section(section_text: str, extractor_json: dict, section_note: str, custom_instructions: str = None,
+                     tracker=None, max_tokens: int = 800) -> str:
+    """
+    Prompt B sobre una sola sección del CV (ver services/cv_sections.py). Mismo prefijo
+    estático que adapt_cv_strict, así que las llamadas de todas las secciones comparten caché.
+    Sin streaming: las secciones se generan en paralelo y se unen al final.
+    """
+    messages, report = build_adapter_messages(section_text, extractor_json, custom_instructions, section_note)
+    started = time.perf_counter()
+    md = _call_chat(messages, max_tokens=max_tokens, temperature=0.05, prompt=PROMPT_ADAPTER, tracker=tracker)
+    report["llm_ms"] = int((time.perf_counter() - started) * 1000)
+    if tracker is not None:
+        tracker.prompt_report = report
     return md
 
 def build_prompt(cv_text: str, job_text: str, keywords: list[str]) -> str:
@@ -349,7 +616,7 @@ Genera el CV optimizado en markdown.
 def generate_cv_markdown(cv_text: str, job_text: str, keywords: list[str]) -> str:
     prompt = build_prompt(cv_text, job_text, keywords)
     # Llamada al endpoint de chat completions compatible OpenAI (vía OpenRouter)
-    completion = client.chat.completions.create(
+    completion = get_client().chat.completions.create(
         model=settings.OPENROUTER_MODEL,  # AutoRouter selecciona un modelo adecuado
         messages=[{"role": "user", "content": prompt}],
         max_tokens=1500,
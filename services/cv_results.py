@@ -0,0 +1,131 @@
+# services/cv_results.py
+# Regeneración incremental: se guarda el último resultado por (usuario, job_id, digest del CV)
+# partido en secciones (STORAGE_DIR/cv_results, solo texto ofuscado: sin datos personales).
+# Si el usuario vuelve a generar cambiando solo confirm_keywords u options, se calcula qué
+# secciones afecta el cambio y solo esas vuelven al LLM; el resto se reutiliza tal cual.
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+from config.settings import settings
+from services.cv_sections import CVSection, SECTION_KINDS, gaps_section_index
+from utils.aho_corasick import fold
+from utils.ats_score import normalize_for_ats, _alias_index
+
+RESULTS_DIR = Path(settings.STORAGE_DIR) / "cv_results"
+
+# Secciones donde se integran las keywords aunque no aparezcan en el original
+KEYWORD_SECTIONS = ("profile", "skills")
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cv_digest(cv_text: str) -> str:
+    """Digest del texto del CV tal como se manda al LLM (compactado y ofuscado)."""
+    return _sha256(cv_text)
+
+
+def context_digest(extractor_json: dict) -> str:
+    """Digest del análisis de la oferta sin keywords_ats (las keywords se comparan aparte)."""
+    context = {k: v for k, v in (extractor_json or {}).items() if k != "keywords_ats"}
+    return _sha256(json.dumps(context, ensure_ascii=False, sort_keys=True, default=str))
+
+
+def _path(user_id, job_id: str, digest: str) -> Path:
+    return RESULTS_DIR / f"{_sha256(f'{user_id}:{job_id}:{digest}')}.json"
+
+
+def load_result(user_id, job_id: str, digest: str) -> Optional[dict]:
+    try:
+        with open(_path(user_id, job_id, digest), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    data["adapted"] = {int(k): v for k, v in (data.get("adapted") or {}).items()}
+    return data
+
+
+def save_result(user_id, job_id: str, digest: str, sections: list[CVSection], adapted: dict[int, str],
+                extractor_json: dict, options: Optional[str]) -> None:
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = _path(user_id, job_id, digest)
+    data = {
+        "context_digest": context_digest(extractor_json),
+        "keywords": list((extractor_json or {}).get("keywords_ats") or []),
+        "options": (options or "").strip(),
+        "sections": [s.text for s in sections],
+        "adapted": adapted,
+    }
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _mentions(normalized_text: str, keyword: str) -> bool:
+    """¿Aparece `keyword` (o un sinónimo del vocabulario ATS) en el texto ya normalizado?"""
+    kw = normalize_for_ats(keyword)
+    if not kw:
+        return False
+    padded = f" {normalized_text} "
+    return any(f" {alias} " in padded for alias in _alias_index().get(kw, (kw,)))
+
+
+def _kinds_in_instructions(text: str) -> set[str]:
+    """Tipos de sección que nombran unas instrucciones ("mejora la experiencia", "skills"...)."""
+    words = f" {' '.join(re.findall(r'[a-z0-9&]+', fold(text)))} "
+    return {kind for kind, names in SECTION_KINDS.items() if any(f" {n} " in words for n in names)}
+
+
+def plan_delta(previous: Optional[dict], sections: list[CVSection], extractor_json: dict,
+               options: Optional[str]) -> tuple[Optional[set[int]], str]:
+    """
+    Decide qué secciones regenerar respecto al resultado anterior.
+    Devuelve (índices a regenerar, motivo); None = regenerar todo.
+    - keywords añadidas: secciones cuyo original las menciona, más perfil, habilidades y la
+      sección con la [Formación sugerida...]; keywords quitadas: secciones cuya versión
+      adaptada las menciona.
+    - options cambiadas: las secciones que nombran las instrucciones nuevas y las anteriores;
+      si alguna de las dos no nombra ninguna sección (instrucción general), todas.
+    """
+    if previous is None:
+        return None, "sin resultado anterior"
+    if previous.get("sections") != [s.text for s in sections]:
+        return None, "secciones distintas"
+    if previous.get("context_digest") != context_digest(extractor_json):
+        return None, "análisis de la oferta distinto"
+
+    affected: set[int] = set()
+    old_kw = {k.strip().lower(): k for k in previous.get("keywords") or []}
+    new_kw = {k.strip().lower(): k for k in (extractor_json or {}).get("keywords_ats") or []}
+    added = [new_kw[k] for k in new_kw.keys() - old_kw.keys()]
+    removed = [old_kw[k] for k in old_kw.keys() - new_kw.keys()]
+    if added or removed:
+        affected.add(gaps_section_index(sections))
+        for section in sections:
+            if section.kind in KEYWORD_SECTIONS:
+                affected.add(section.index)
+                continue
+            source = normalize_for_ats(section.text)
+            adapted = normalize_for_ats(previous["adapted"].get(section.index, ""))
+            if any(_mentions(source, kw) for kw in added) or any(_mentions(adapted, kw) for kw in removed):
+                affected.add(section.index)
+
+    old_options, new_options = previous.get("options") or "", (options or "").strip()
+    if old_options != new_options:
+        kinds = set()
+        for text in (old_options, new_options):
+            named = _kinds_in_instructions(text)
+            if text and not named:  # instrucción general: afecta a todo el CV
+                return None, "instrucciones generales cambiadas"
+            kinds |= named
+        affected |= {s.index for s in sections if s.kind in kinds}
+
+    # secciones que no llegaron a guardarse se generan siempre
+    affected |= {s.index for s in sections if s.index not in previous["adapted"]}
+    return affected, "delta"
@@ -0,0 +1,274 @@
+# services/cv_sections.py
+# Adaptación del CV por secciones: el texto (ya compactado y ofuscado) se parte en cabecera,
+# perfil, cada puesto de experiencia, educación, habilidades, etc.; cada sección se adapta con
+# su propia llamada al Prompt B (mismo prefijo estático y mismo extractor_json) con paralelismo
+# acotado, y el resultado se recompone en el orden original. La latencia queda acotada por la
+# sección más lenta en vez de por la longitud total de la salida, y un CV largo ya no se trunca
+# en los max_tokens de una única generación.
+import asyncio
+import logging
+import re
+import time
+from collections import Counter
+from typing import Optional
+
+from config.settings import settings
+from services.ai_client import adapt_cv_section
+from utils.llm_tracker import LLMTracker
+from utils.tokens import estimate_tokens
+
+ADAPT_CV_MODES = ("single", "sections", "auto")
+
+# Encabezados de sección habituales (es/en), comparados sin acentos ni mayúsculas
+SECTION_KINDS = {
+    "profile": ("perfil", "perfil profesional", "resumen", "resumen profesional", "sobre mi", "acerca de mi",
+                "extracto", "objetivo", "objetivo profesional", "profile", "summary", "professional summary",
+                "about me", "objective"),
+    "experience": ("experiencia", "experiencia laboral", "experiencia profesional", "historial laboral",
+                   "trayectoria profesional", "experience", "work experience", "professional experience",
+                   "employment history", "work history"),
+    "education": ("educacion", "formacion", "formacion academica", "estudios", "education",
+                  "academic background"),
+    "skills": ("habilidades", "habilidades tecnicas", "competencias", "competencias tecnicas", "conocimientos",
+               "tecnologias", "aptitudes", "stack tecnologico", "skills", "technical skills", "tech stack"),
+    "projects": ("proyectos", "proyectos destacados", "projects", "side projects"),
+    "certifications": ("certificaciones", "certificados", "cursos", "cursos y certificaciones",
+                       "certifications", "courses", "licenses & certifications"),
+    "languages": ("idiomas", "lenguas", "languages"),
+    "other": ("logros", "premios", "voluntariado", "publicaciones", "intereses", "referencias",
+              "achievements", "awards", "volunteering", "publications", "interests", "references"),
+}
+_HEADING_INDEX = {name: kind for kind, names in SECTION_KINDS.items() for name in names}
+
+_ACCENTS = str.maketrans("áéíóúüñ", "aeiouun")
+_MD_HEADING_RE = re.compile(r"^#{1,6}\s+(.*)$")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•·▪►]|\d+[.)])\s+")
+# "2019 - 2022", "ene. 2020 – actualidad", "03/2018 - Presente", "2021 - Present"
+_DATE_RANGE_RE = re.compile(
+    r"(?:19|20)\d{2}\s*[-–—a]+\s*(?:\w+\.?\s+)?(?:(?:19|20)\d{2}|actual(?:idad|mente)?|presente?|hoy|now|current)",
+    re.IGNORECASE,
+)
+
+
+class CVSection:
+    __slots__ = ("index", "kind", "title", "text")
+
+    def __init__(self, index: int, kind: str, title: str, text: str):
+        self.index = index
+        self.kind = kind  # header, profile, experience, education, skills, ...
+        self.title = title  # encabezado tal cual aparece en el CV ("" en la cabecera)
+        self.text = text
+
+    def to_dict(self) -> dict:
+        return {"index": self.index, "kind": self.kind, "title": self.title, "text": self.text}
+
+
+def _heading_kind(line: str) -> Optional[str]:
+    """Tipo de sección si `line` es un encabezado conocido (o un encabezado markdown)."""
+    stripped = line.strip()
+    md = _MD_HEADING_RE.match(stripped)
+    candidate = (md.group(1) if md else stripped).strip(" *_:|").lower().translate(_ACCENTS)
+    if len(candidate) > 40:
+        return None
+    kind = _HEADING_INDEX.get(candidate)
+    if kind is None and md and stripped.startswith("## "):
+        return "other"  # "## ..." desconocido: sección propia (el "# Nombre" sigue en la cabecera)
+    return kind
+
+
+def _has_content(lines: list[str]) -> bool:
+    return any(l.strip() for l in lines)
+
+
+def _split_experience(lines: list[str]) -> list[list[str]]:
+    """
+    Parte el cuerpo de "Experiencia" en puestos. Un puesto empieza en un `### ...` o en una
+    línea (no viñeta) con un rango de fechas; las líneas sueltas justo anteriores a esa línea
+    (cargo, empresa) se mueven al nuevo puesto.
+    """
+    entries: list[list[str]] = [[]]
+    for line in lines:
+        current = entries[-1]
+        starts = line.startswith("###") or (not _BULLET_RE.match(line) and _DATE_RANGE_RE.search(line))
+        if starts and _has_content(current):
+            carry = []
+            while current and current[-1].strip() and not _BULLET_RE.match(current[-1]) and len(carry) < 2:
+                carry.insert(0, current.pop())
+            if _has_content(current):
+                entries.append(carry)
+            else:
+                current.extend(carry)  # el puesto actual solo tenía su título: la fecha es suya
+        entries[-1].append(line)
+    return [e for e in entries if _has_content(e)]
+
+
+def split_cv_sections(text: str) -> list[CVSection]:
+    """
+    Divide el texto de un CV en secciones en su orden original. Lo anterior al primer
+    encabezado es la cabecera (nombre, contacto). La experiencia se parte por puestos.
+    """
+    blocks: list[tuple[str, str, list[str]]] = [("header", "", [])]
+    for line in text.split("\n"):
+        kind = _heading_kind(line) if line.strip() else None
+        if kind is not None:
+            blocks.append((kind, line.strip().lstrip("#").strip(" *_:"), [line]))
+        else:
+            blocks[-1][2].append(line)
+
+    sections: list[CVSection] = []
+    for kind, title, lines in blocks:
+        if not _has_content(lines):
+            continue
+        if kind == "experience":
+            entries = _split_experience(lines[1:])
+            if len(entries) > 1:
+                # el encabezado "Experiencia" (y lo previo al primer puesto) va con el primer puesto
+                entries[0] = [lines[0]] + entries[0]
+                for entry in entries:
+                    sections.append(CVSection(len(sections), kind, title, "\n".join(entry)))
+                continue
+        sections.append(CVSection(len(sections), kind, title, "\n".join(lines)))
+    return sections
+
+
+def resolve_mode(mode: Optional[str], cv_text: str) -> tuple[str, Optional[list[CVSection]]]:
+    """
+    Decide entre una sola llamada ("single") o por secciones ("sections"). En "auto" se usa
+    el modo por secciones solo si el CV supera ADAPT_SECTIONS_MIN_TOKENS y tiene al menos
+    2 secciones detectables. Devuelve (modo efectivo, secciones o None).
+    """
+    mode = mode or settings.ADAPT_CV_MODE
+    if mode not in ADAPT_CV_MODES:
+        raise ValueError(f"Modo de adaptación no soportado: {mode}")
+    if mode == "single":
+        return "single", None
+    if mode == "auto" and estimate_tokens(cv_text) < settings.ADAPT_SECTIONS_MIN_TOKENS:
+        return "single", None
+    sections = split_cv_sections(cv_text)
+    if len(sections) < 2:
+        return "single", None
+    return "sections", sections
+
+
+def gaps_section_index(sections: list[CVSection]) -> int:
+    """Sección que lleva "[Formación sugerida para cerrar gaps]": habilidades o, si no hay, la última."""
+    for section in reversed(sections):
+        if section.kind == "skills":
+            return section.index
+    return sections[-1].index
+
+
+def _starts_with_heading(section: CVSection) -> bool:
+    first = section.text.lstrip().split("\n", 1)[0]
+    return _heading_kind(first) is not None
+
+
+def section_note(section: CVSection, sections: list[CVSection], gaps_owner: int) -> str:
+    names, job = [], 0
+    for s in sections:
+        if s.kind == "experience":
+            job += 1
+            names.append(f"{s.title} (puesto {job})")
+        else:
+            names.append(s.title or "cabecera")
+    outline = ", ".join(names)
+    lines = [
+        f'Estás adaptando SOLO la sección {section.index + 1} de {len(sections)} del CV '
+        f'(tipo: {section.kind}{", " + repr(section.title) if section.title else ""}). '
+        f"Las demás se adaptan por separado y se unen después en este orden: {outline}.",
+    ]
+    if section.kind == "header":
+        lines.append("- Es la cabecera (nombre, titular y contacto): devuélvela como `# Nombre` seguido del "
+                     "contacto, conservando los marcadores de datos personales tal cual.")
+    elif section.kind == "experience" and not _starts_with_heading(section):
+        lines.append("- Es un puesto dentro de Experiencia: empieza por `### Cargo - Empresa (fechas)`, sin "
+                     "repetir el encabezado de la sección.")
+    elif section.kind == "experience":
+        lines.append(f"- Empieza por su encabezado (`## {section.title}`); cada puesto va como "
+                     "`### Cargo - Empresa (fechas)`.")
+    else:
+        lines.append(f"- Empieza por su encabezado (`## {section.title}`).")
+    lines.append("- Devuelve SOLO el markdown de esta sección; no añadas ni repitas contenido de otras.")
+    if section.index == gaps_owner:
+        lines.append("- Si procede (regla 9), añade al final la sección [Formación sugerida para cerrar gaps].")
+    else:
+        lines.append("- NO añadas la sección [Formación sugerida para cerrar gaps]: va en otra sección.")
+    return "\n".join(lines)
+
+
+async def adapt_cv_by_sections(
+    sections: list[CVSection],
+    extractor_json: dict,
+    custom_instructions: str = None,
+    tracker: LLMTracker = None,
+    only: Optional[set[int]] = None,
+    previous: Optional[dict[int, str]] = None,
+) -> tuple[str, dict[int, str], dict]:
+    """
+    Adapta las secciones en paralelo (como mucho ADAPT_SECTIONS_CONCURRENCY llamadas a la vez)
+    y las une en orden. Si se pasa `only`, solo se regeneran esas secciones y el resto se toma
+    de `previous` (índice -> markdown ya adaptado). Devuelve (markdown, markdown por índice,
+    informe); el informe queda también en tracker.prompt_report. En `tracker` la etapa "llm" es la sección más
+    lenta (camino crítico), no la suma.
+    """
+    semaphore = asyncio.Semaphore(max(1, settings.ADAPT_SECTIONS_CONCURRENCY))
+    gaps_owner = gaps_section_index(sections)
+    previous = previous or {}
+    todo = [s for s in sections if only is None or s.index in only or s.index not in previous]
+
+    async def run(section: CVSection) -> tuple[str, LLMTracker]:
+        child = LLMTracker()  # modelo, tokens y tiempo de esta sección
+        note = section_note(section, sections, gaps_owner)
+        async with semaphore:
+            md = await asyncio.to_thread(
+                adapt_cv_section, section.text, extractor_json, note, custom_instructions,
+                child, settings.ADAPT_SECTION_MAX_TOKENS,
+            )
+        return md, child
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run(s) for s in todo))
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    adapted = dict(previous)
+    per_section = []
+    for section, (md, child) in zip(todo, results):
+        if not md or not md.strip():
+            logging.warning("Sección %s sin respuesta del LLM; se conserva el texto original.", section.index)
+            md = section.text
+        adapted[section.index] = md.strip()
+        per_section.append({
+            "index": section.index,
+            "kind": section.kind,
+            "model": child.model,
+            "llm_ms": int(round(child.stages.get("llm", 0.0))),
+            "llm_calls": child.llm_calls,
+            "prompt_tokens": (child.prompt_report or {}).get("total_tokens"),
+        })
+    llm_calls = sum(p["llm_calls"] for p in per_section)
+
+    if tracker is not None:
+        # una llamada por sección: la fila de llm_usage lleva el total en llm_calls
+        tracker.llm_calls += llm_calls
+        models = Counter(p["model"] for p in per_section if p["model"])
+        if models:
+            tracker.model = models.most_common(1)[0][0]
+        if per_section:
+            tracker.add_stage("llm", max(p["llm_ms"] for p in per_section))
+
+    markdown = "\n\n".join(adapted[s.index] for s in sections)
+    report = {
+        "mode": "sections",
+        "sections": len(sections),
+        "sections_generated": len(todo),
+        "sections_reused": [s.index for s in sections if s.index not in {t.index for t in todo}],
+        "concurrency": settings.ADAPT_SECTIONS_CONCURRENCY,
+        "wall_ms": int(wall_ms),
+        "llm_ms_sum": sum(p["llm_ms"] for p in per_section),
+        "llm_calls": llm_calls,
+        "prompt_tokens_sum": sum(p["prompt_tokens"] or 0 for p in per_section),
+        "per_section": per_section,
+    }
+    if tracker is not None:
+        tracker.prompt_report = report
+    return markdown, adapted, report
@@ -0,0 +1,218 @@
+# services/job_analyzer.py
+import re
+from bisect import bisect_right
+from functools import lru_cache
+
+from utils.aho_corasick import AhoCorasick, fold, leftmost_longest
+from services.job_vocabulary import (
+    TECHNOLOGIES, HARD_SKILLS, SOFT_SKILLS, ROLES, SENIORITY_TERMS,
+    REQUIRED_MARKERS, DESIRED_MARKERS,
+)
+
+# Nombre con el que se registra en llm_usage un análisis resuelto sin LLM
+LOCAL_ANALYZER_MODEL = "local/job-analyzer"
+
+# ":" no separa: "Deseable: Docker, AWS" es una sola frase y "Requisitos:" una cabecera
+_SENTENCE_SPLIT_RE = re.compile(r"(?:\n+|(?<=[.;!?])\s+|\s*[•·▪●◦‣]\s*|\s+-\s+)")
+# Longitud máxima de una cabecera de lista ("Requisitos:", "Se valorará:")
+_HEADER_MAX_CHARS = 60
+# Tipos cuyas coincidencias solapadas se reducen a la más larga (ver leftmost_longest)
+_ENTITY_KINDS = ("tech", "hard", "soft", "role")
+_YEARS_RE = re.compile(r"(\d{1,2})\s*\+?\s*(?:anos|years|ano|year)")
+_LEVEL_LABEL_RE = re.compile(r"(?:nivel|level|seniority)\s*:?\s*$")
+_CERT_RE = re.compile(r"\b(?:certificacion|certificado|certification|certified)\b")
+
+_SENIORITY_ORDER = ("lead", "senior", "mid", "junior")
+
+
+@lru_cache(maxsize=1)
+def get_job_matcher() -> AhoCorasick:
+    """Autómata con todo el vocabulario; se construye una vez por proceso."""
+    ac = AhoCorasick()
+    for kind, vocab in (("tech", TECHNOLOGIES), ("hard", HARD_SKILLS), ("soft", SOFT_SKILLS), ("role", ROLES)):
+        for canonical, aliases in vocab.items():
+            for alias in aliases:
+                ac.add(alias, (kind, canonical))
+    for level, terms in SENIORITY_TERMS.items():
+        for term in terms:
+            ac.add(term, ("seniority", level))
+    for marker in REQUIRED_MARKERS:
+        ac.add(marker, ("required", marker))
+    for marker in DESIRED_MARKERS:
+        ac.add(marker, ("desired", marker))
+    return ac.build()
+
+
+def _split_sentences(text: str) -> list[tuple[int, int]]:
+    """Devuelve los rangos (inicio, fin) de frases/viñetas de la oferta."""
+    spans = []
+    pos = 0
+    for m in _SENTENCE_SPLIT_RE.finditer(text):
+        if m.start() > pos:
+            spans.append((pos, m.start()))
+        pos = m.end()
+    if pos < len(text):
+        spans.append((pos, len(text)))
+    return spans
+
+
+def _classify_sentences(folded: str, sentences: list[tuple[int, int]],
+                        required: set[int], desired: set[int]) -> tuple[set[int], set[int], set[int]]:
+    """
+    Propaga el contexto de las cabeceras ("Requisitos:", "Deseable:") a las frases que las
+    siguen hasta la siguiente cabecera o línea en blanco. Devuelve (imprescindibles,
+    deseables, cabeceras); las cabeceras no se listan como requisito.
+    """
+    headers = set()
+    context = None
+    prev_end = 0
+    for i, (s, e) in enumerate(sentences):
+        if folded.count("\n", prev_end, s) >= 2:
+            context = None
+        prev_end = e
+        text = folded[s:e].strip(" -*•\t")
+        if text.endswith(":") and len(text) <= _HEADER_MAX_CHARS:
+            headers.add(i)
+            context = "desired" if i in desired else "required" if i in required else None
+        elif context == "desired":
+            desired.add(i)
+        elif context == "required":
+            required.add(i)
+    desired -= headers
+    return required - desired - headers, desired, headers
+
+
+def _detect_seniority(folded: str, seniority_hits: list[tuple[int, str]]) -> str:
+    # 1) palabra explícita cerca del título (primeros 300 caracteres) o tras "nivel:"/"level:"
+    head = [
+        level for start, level in seniority_hits
+        if start < 300 or _LEVEL_LABEL_RE.search(folded, max(0, start - 14), start)
+    ]
+    if head:
+        return min(head, key=_SENIORITY_ORDER.index)
+    # 2) años de experiencia pedidos
+    years = [int(y) for y in _YEARS_RE.findall(folded)]
+    if years:
+        y = max(years)
+        if y >= 8:
+            return "lead"
+        if y >= 5:
+            return "senior"
+        if y >= 2:
+            return "mid"
+        return "junior"
+    # 3) palabra explícita en cualquier parte
+    if seniority_hits:
+        return min((level for _, level in seniority_hits), key=_SENIORITY_ORDER.index)
+    return "unknown"
+
+
+def analyze_job_local(job_text: str) -> dict:
+    """
+    Analizador determinista de ofertas: vocabulario curado + Aho-Corasick + heurísticas.
+    Devuelve el mismo esquema que PROMPT_A_SYSTEM (más "source": "local").
+    """
+    folded = fold(job_text or "")
+    sentences = _split_sentences(folded)
+
+    techs: dict[str, dict] = {}
+    hard: dict[str, int] = {}
+    soft: dict[str, int] = {}
+    roles: list[tuple[int, int, str]] = []
+    seniority_hits: list[tuple[int, str]] = []
+    req_positions: list[int] = []
+    des_positions: list[int] = []
+
+    matches = list(get_job_matcher().search(folded))
+    entities = leftmost_longest(m for m in matches if m[2][0] in _ENTITY_KINDS)
+    seniority_matches = leftmost_longest(m for m in matches if m[2][0] == "seniority")
+    markers = [m for m in matches if m[2][0] in ("required", "desired")]
+
+    for start, end, (kind, value) in sorted(entities + seniority_matches + markers):
+        if kind == "tech":
+            entry = techs.setdefault(value, {"count": 0, "first": start})
+            entry["count"] += 1
+        elif kind == "hard":
+            hard.setdefault(value, start)
+        elif kind == "soft":
+            soft.setdefault(value, start)
+        elif kind == "role":
+            roles.append((start, -(end - start), value))
+        elif kind == "seniority":
+            seniority_hits.append((start, value))
+        elif kind == "required":
+            req_positions.append(start)
+        elif kind == "desired":
+            des_positions.append(start)
+
+    # Clasificar frases por marcadores de requisito
+    starts = [s for s, _ in sentences]
+
+    def _sentence_of(pos: int) -> int:
+        i = bisect_right(starts, pos) - 1
+        return i if i >= 0 and pos < sentences[i][1] else -1
+
+    desired_idx = {_sentence_of(p) for p in des_positions} - {-1}
+    required_idx = {_sentence_of(p) for p in req_positions} - {-1} - desired_idx
+    required_idx, desired_idx, _ = _classify_sentences(folded, sentences, required_idx, desired_idx)
+
+    def _sentence_text(i: int) -> str:
+        s, e = sentences[i]
+        return job_text[s:e].strip(" -*•\t")[:200]
+
+    requisitos_imprescindibles = [_sentence_text(i) for i in sorted(required_idx)][:10]
+    requisitos_deseables = [_sentence_text(i) for i in sorted(desired_idx)][:10]
+    desired_spans = [sentences[i] for i in desired_idx]
+
+    # Confianza por tecnología: menciones, posición y si solo aparece como deseable
+    tecnologias = []
+    for name, info in techs.items():
+        conf = 0.6 + 0.1 * min(info["count"] - 1, 3)
+        if info["first"] < 300:
+            conf += 0.05
+        if any(s <= info["first"] < e for s, e in desired_spans):
+            conf -= 0.2
+        tecnologias.append({"name": name, "confidence": round(max(0.3, min(conf, 0.95)), 2)})
+    tecnologias.sort(key=lambda t: (-t["confidence"], techs[t["name"]]["first"]))
+
+    skills_duras = sorted(hard, key=hard.get)
+    skills_blandas = sorted(soft, key=soft.get)
+
+    rol_detectado = min(roles)[2] if roles else "unknown"
+    seniority = _detect_seniority(folded, seniority_hits)
+
+    keywords_ats = list(dict.fromkeys(
+        [t["name"] for t in tecnologias]
+        + skills_duras
+        + ([rol_detectado] if rol_detectado != "unknown" else [])
+        + skills_blandas[:3]
+    ))
+
+    suggested_sections = ["Perfil profesional", "Experiencia", "Habilidades técnicas", "Educación"]
+    if any(t in techs for t in ("Git", "Docker")) or "Arquitectura de software" in hard:
+        suggested_sections.append("Proyectos")
+    if _CERT_RE.search(folded):
+        suggested_sections.append("Certificaciones")
+    if "Inglés" in soft:
+        suggested_sections.append("Idiomas")
+
+    # Confianza global: cuánto de la oferta se ha podido reconocer
+    confidence = 0.2
+    confidence += min(len(tecnologias), 5) * 0.08
+    confidence += 0.1 if rol_detectado != "unknown" else 0.0
+    confidence += 0.1 if seniority != "unknown" else 0.0
+    confidence += 0.1 if requisitos_imprescindibles else 0.0
+
+    return {
+        "rol_detectado": rol_detectado,
+        "seniority": seniority,
+        "tecnologias": tecnologias,
+        "skills_duras": skills_duras,
+        "skills_blandas": skills_blandas,
+        "requisitos_imprescindibles": requisitos_imprescindibles,
+        "requisitos_deseables": requisitos_deseables,
+        "keywords_ats": keywords_ats,
+        "suggested_sections": suggested_sections,
+        "confidence_score": round(max(0.0, min(confidence, 0.95)), 2),
+        "source": "local",
+    }
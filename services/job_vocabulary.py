@@ -0,0 +1,187 @@
+# services/job_vocabulary.py
+# Vocabulario curado para el analizador local de ofertas (services/job_analyzer.py).
+# Cada entrada es nombre_canónico -> alias con los que aparece en las ofertas.
+# Los alias se comparan en minúsculas y sin tildes, por palabra completa.
+
+TECHNOLOGIES = {
+    # Lenguajes
+    "Python": ["python", "python3"],
+    "Java": ["java", "java 8", "java 11", "java 17", "jdk"],
+    "JavaScript": ["javascript", "js", "ecmascript", "es6"],
+    "TypeScript": ["typescript", "ts"],
+    "C#": ["c#", "csharp", "c sharp"],
+    "C++": ["c++", "cpp"],
+    "Go": ["golang", "go lang"],
+    "Rust": ["rust"],
+    "PHP": ["php"],
+    "Ruby": ["ruby"],
+    "Kotlin": ["kotlin"],
+    "Swift": ["swift"],
+    "Scala": ["scala"],
+    "R": ["lenguaje r", "r language", "rstudio"],
+    "SQL": ["sql", "t-sql", "pl/sql", "plsql", "tsql"],
+    "Bash": ["bash", "shell scripting", "shell script"],
+    "COBOL": ["cobol"],
+    # Frontend
+    "HTML": ["html", "html5"],
+    "CSS": ["css", "css3", "sass", "scss"],
+    "React": ["react", "react.js", "reactjs"],
+    "Angular": ["angular", "angularjs"],
+    "Vue.js": ["vue", "vue.js", "vuejs"],
+    "Next.js": ["next.js", "nextjs"],
+    "Redux": ["redux"],
+    "Tailwind CSS": ["tailwind", "tailwindcss"],
+    # Backend
+    "Node.js": ["node", "node.js", "nodejs"],
+    "Express": ["express", "express.js", "expressjs"],
+    "NestJS": ["nestjs", "nest.js"],
+    "Django": ["django"],
+    "Flask": ["flask"],
+    "FastAPI": ["fastapi"],
+    "Spring": ["spring", "spring boot", "springboot", "spring framework"],
+    ".NET": [".net", "dotnet", ".net core", "asp.net", "asp.net core"],
+    "Laravel": ["laravel"],
+    "Ruby on Rails": ["rails", "ruby on rails"],
+    "GraphQL": ["graphql"],
+    "REST": ["rest", "restful", "api rest", "apis rest", "rest api", "rest apis"],
+    "gRPC": ["grpc"],
+    "Microservicios": ["microservicios", "microservices", "microservicio"],
+    # Móvil
+    "Android": ["android"],
+    "iOS": ["ios"],
+    "React Native": ["react native"],
+    "Flutter": ["flutter"],
+    # Datos
+    "PostgreSQL": ["postgresql", "postgres"],
+    "MySQL": ["mysql", "mariadb"],
+    "SQL Server": ["sql server", "mssql"],
+    "Oracle": ["oracle", "oracle db"],
+    "MongoDB": ["mongodb", "mongo"],
+    "Redis": ["redis"],
+    "Elasticsearch": ["elasticsearch", "elastic search", "elk"],
+    "Kafka": ["kafka", "apache kafka"],
+    "RabbitMQ": ["rabbitmq"],
+    "Spark": ["spark", "apache spark", "pyspark"],
+    "Airflow": ["airflow", "apache airflow"],
+    "dbt": ["dbt"],
+    "Snowflake": ["snowflake"],
+    "BigQuery": ["bigquery"],
+    "Databricks": ["databricks"],
+    "Hadoop": ["hadoop"],
+    "pandas": ["pandas"],
+    "NumPy": ["numpy"],
+    "scikit-learn": ["scikit-learn", "sklearn"],
+    "TensorFlow": ["tensorflow"],
+    "PyTorch": ["pytorch"],
+    "Power BI": ["power bi", "powerbi"],
+    "Tableau": ["tableau"],
+    "Excel": ["excel"],
+    "ETL": ["etl", "elt"],
+    "Machine Learning": ["machine learning", "aprendizaje automatico", "ml"],
+    "LLM": ["llm", "llms", "genai", "ia generativa", "generative ai"],
+    # Cloud / DevOps
+    "AWS": ["aws", "amazon web services", "ec2", "s3", "lambda"],
+    "Azure": ["azure", "microsoft azure"],
+    "GCP": ["gcp", "google cloud", "google cloud platform"],
+    "Docker": ["docker", "contenedores", "containers"],
+    "Kubernetes": ["kubernetes", "k8s", "eks", "aks", "gke"],
+    "Terraform": ["terraform"],
+    "Ansible": ["ansible"],
+    "Jenkins": ["jenkins"],
+    "GitLab CI": ["gitlab ci", "gitlab"],
+    "GitHub Actions": ["github actions"],
+    "CI/CD": ["ci/cd", "ci cd", "integracion continua", "continuous integration", "despliegue continuo"],
+    "Linux": ["linux", "unix"],
+    "Git": ["git", "github", "bitbucket"],
+    "Prometheus": ["prometheus"],
+    "Grafana": ["grafana"],
+    # Calidad
+    "Selenium": ["selenium"],
+    "Cypress": ["cypress"],
+    "Jest": ["jest"],
+    "pytest": ["pytest"],
+    "JUnit": ["junit"],
+    "Jira": ["jira"],
+    "Confluence": ["confluence"],
+    # Plataformas
+    "Salesforce": ["salesforce", "salesforce dx", "sfdc"],
+    "Apex": ["apex"],
+    "SAP": ["sap", "sap abap", "abap"],
+}
+
+HARD_SKILLS = {
+    "Arquitectura de software": ["arquitectura de software", "software architecture", "diseno de arquitectura"],
+    "Diseño de APIs": ["diseno de apis", "api design", "desarrollo de apis"],
+    "Testing automatizado": ["pruebas automatizadas", "testing automatizado", "test automation", "automatizacion de pruebas"],
+    "Pruebas unitarias": ["pruebas unitarias", "unit testing", "unit tests", "tdd"],
+    "Patrones de diseño": ["patrones de diseno", "design patterns", "solid", "clean code", "clean architecture"],
+    "Bases de datos": ["bases de datos", "base de datos", "databases", "modelado de datos", "data modeling"],
+    "Seguridad": ["seguridad informatica", "ciberseguridad", "security", "owasp"],
+    "Análisis de datos": ["analisis de datos", "data analysis", "analitica de datos"],
+    "Ingeniería de datos": ["ingenieria de datos", "data engineering", "pipelines de datos", "data pipelines"],
+    "Cloud computing": ["cloud computing", "computacion en la nube", "nube", "cloud"],
+    "Infraestructura como código": ["infraestructura como codigo", "infrastructure as code", "iac"],
+    "Monitoreo": ["monitoreo", "monitoring", "observabilidad", "observability"],
+    "Metodologías ágiles": ["scrum", "agile", "agil", "metodologias agiles", "kanban"],
+    "Control de versiones": ["control de versiones", "version control"],
+    "Documentación técnica": ["documentacion tecnica", "documentacion", "technical documentation"],
+    "Optimización de rendimiento": ["optimizacion de rendimiento", "performance tuning", "optimizacion"],
+    "Soporte técnico": ["soporte tecnico", "soporte", "technical support", "troubleshooting"],
+    "Frontend": ["frontend", "front-end", "front end"],
+    "Backend": ["backend", "back-end", "back end"],
+    "Full Stack": ["full stack", "fullstack", "full-stack"],
+}
+
+SOFT_SKILLS = {
+    "Trabajo en equipo": ["trabajo en equipo", "teamwork", "team player", "colaboracion", "colaborar"],
+    "Comunicación": ["comunicacion", "communication", "comunicacion efectiva", "habilidades comunicativas"],
+    "Liderazgo": ["liderazgo", "leadership", "liderar"],
+    "Resolución de problemas": ["resolucion de problemas", "problem solving", "solucion de problemas"],
+    "Proactividad": ["proactividad", "proactivo", "proactiva", "proactive"],
+    "Autonomía": ["autonomia", "autonomo", "autonoma", "autonomous", "self-starter"],
+    "Adaptabilidad": ["adaptabilidad", "adaptability", "flexibilidad"],
+    "Pensamiento analítico": ["pensamiento analitico", "analytical thinking", "capacidad analitica"],
+    "Orientación a resultados": ["orientacion a resultados", "results oriented", "orientado a resultados"],
+    "Mentoring": ["mentoring", "mentoria", "mentorizar"],
+    "Atención al cliente": ["atencion al cliente", "orientacion al cliente", "customer focus", "atender a los usuarios"],
+    "Inglés": ["ingles", "english"],
+    "Gestión del tiempo": ["gestion del tiempo", "time management", "planificar"],
+}
+
+# Títulos de rol frecuentes (se toma el que aparece primero en la oferta)
+ROLES = {
+    "Desarrollador Backend": ["desarrollador backend", "backend developer", "backend engineer", "desarrollador back-end"],
+    "Desarrollador Frontend": ["desarrollador frontend", "frontend developer", "frontend engineer", "desarrollador front-end"],
+    "Desarrollador Full Stack": ["desarrollador full stack", "full stack developer", "fullstack developer", "full stack engineer"],
+    "Desarrollador Móvil": ["desarrollador movil", "mobile developer", "desarrollador android", "desarrollador ios"],
+    "Ingeniero de Software": ["ingeniero de software", "software engineer", "software developer", "desarrollador de software", "desarrollador"],
+    "Ingeniero de Datos": ["ingeniero de datos", "data engineer"],
+    "Científico de Datos": ["cientifico de datos", "data scientist"],
+    "Analista de Datos": ["analista de datos", "data analyst", "analista bi", "bi analyst"],
+    "Ingeniero de Machine Learning": ["ml engineer", "machine learning engineer", "ingeniero de machine learning"],
+    "Ingeniero DevOps": ["devops", "devops engineer", "ingeniero devops", "sre", "site reliability engineer"],
+    "Ingeniero QA": ["qa", "qa engineer", "tester", "analista de pruebas", "qa automation"],
+    "Tech Lead": ["tech lead", "lider tecnico", "technical lead", "team lead", "engineering manager"],
+    "Arquitecto de Software": ["arquitecto de software", "software architect", "arquitecto"],
+    "Analista de Sistemas": ["analista de sistemas", "systems analyst", "analista programador"],
+}
+
+# Palabras de seniority explícitas -> nivel (schema de PROMPT_A_SYSTEM)
+SENIORITY_TERMS = {
+    "lead": ["lead", "lider", "principal", "staff", "head of", "jefe", "manager"],
+    "senior": ["senior", "sr", "sr."],
+    "mid": ["semi senior", "semisenior", "semi-senior", "ssr", "mid", "mid-level", "intermedio"],
+    "junior": ["junior", "jr", "jr.", "trainee", "practicante", "becario", "entry level", "sin experiencia"],
+}
+
+# Marcadores para clasificar frases de requisitos
+REQUIRED_MARKERS = [
+    "requisito", "requisitos", "imprescindible", "indispensable", "obligatorio", "excluyente",
+    "required", "requirements", "must have", "must", "necesario", "experiencia en",
+    "experiencia con", "conocimientos en", "conocimiento de", "dominio de", "experience with",
+    "experience in", "years of experience", "anos de experiencia",
+]
+DESIRED_MARKERS = [
+    "deseable", "valorable", "se valorara", "plus", "nice to have", "preferible",
+    "preferred", "bonus", "un extra", "sera un plus",
+]
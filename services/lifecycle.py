@@ -0,0 +1,161 @@
+# services/lifecycle.py
+# Calentamiento al arrancar y apagado ordenado (usados por el lifespan de main.py).
+#
+# Arranque: abre DB_WARMUP_CONNECTIONS conexiones a la BD a la vez (handshake TLS + pool),
+# LLM_WARMUP_CONNECTIONS conexiones HTTP a OpenRouter (GET /models), siembra el router de
+# modelos e inicializa cachés locales (matcher de ofertas, índice de sinónimos ATS, motor de PDF).
+# Mientras tanto /ready responde 503; al terminar, 200 con el resultado de cada paso. Si falla
+# la BD (paso imprescindible) sigue en 503 y el paso se reintenta cada WARMUP_RETRY_S.
+# Apagado: espera tareas en segundo plano y escrituras de uso pendientes, y cierra pools
+# (BD, HTTP y procesos de render).
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from config.settings import settings
+from config.database import AsyncSessionLocal, get_engine, current_engine
+from services.model_router import model_router
+from services.llm_cassette import llm_cassette
+from utils import background
+from utils.metrics import USAGE_LOG_PENDING
+
+logger = logging.getLogger("cv_booster.lifecycle")
+
+# Pasos sin los que la instancia no puede atender peticiones: si fallan, no está lista
+REQUIRED_STEPS = ("db",)
+
+
+class Readiness:
+    def __init__(self):
+        self.ready = False
+        self.started_at = time.monotonic()
+        self.warmup_ms: Optional[int] = None
+        self.steps: dict[str, str] = {}  # paso -> "ok" | "error: ..." | "skipped"
+
+    def snapshot(self) -> dict:
+        return {
+            "ready": self.ready,
+            "warmup_ms": self.warmup_ms,
+            "steps": dict(self.steps),
+            "degraded": [k for k, v in self.steps.items() if v.startswith("error")],
+            "blocking": self.blocking(),
+        }
+
+    def blocking(self) -> list[str]:
+        """Pasos imprescindibles que fallaron (mantienen /ready en 503)."""
+        return [k for k in REQUIRED_STEPS if self.steps.get(k, "").startswith("error")]
+
+
+readiness = Readiness()
+
+
+async def _warm_db(n: int) -> None:
+    engine = get_engine()
+
+    async def open_conn():
+        conn = await engine.connect()
+        await conn.execute(text("SELECT 1"))
+        return conn
+
+    # todas a la vez: si se abren de una en una el pool reutiliza la misma
+    results = await asyncio.gather(*(open_conn() for _ in range(n)), return_exceptions=True)
+    conns = [r for r in results if not isinstance(r, BaseException)]
+    await asyncio.gather(*(c.close() for c in conns), return_exceptions=True)  # vuelven al pool
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        raise errors[0]
+
+
+async def _warm_llm_http(n: int) -> None:
+    from services.ai_client import get_client
+    client = await asyncio.to_thread(get_client)
+    await asyncio.gather(*(asyncio.to_thread(client.models.list) for _ in range(n)))
+
+
+async def _seed_router() -> None:
+    async with AsyncSessionLocal() as db:
+        await model_router.seed_from_usage(db)
+
+
+def _prime_local_caches() -> None:
+    from services.job_analyzer import get_job_matcher
+    from utils.ats_score import _alias_index
+    get_job_matcher()
+    _alias_index()
+    from utils.extractor import prime_pdf_engine
+    prime_pdf_engine()  # el primer PDF no paga el import del motor
+
+
+async def _step(name: str, coro) -> None:
+    started = time.perf_counter()
+    try:
+        await coro
+        readiness.steps[name] = "ok"
+    except Exception as e:
+        readiness.steps[name] = f"error: {e}"
+        logger.exception("Calentamiento %s falló", name)
+    logger.info("Calentamiento %s: %s (%.0f ms)", name, readiness.steps[name], (time.perf_counter() - started) * 1000)
+
+
+async def warm_up() -> None:
+    """Ejecuta los pasos de calentamiento en paralelo y marca la app como lista (si la BD responde)."""
+    started = time.perf_counter()
+    steps = []
+    if settings.DB_WARMUP_CONNECTIONS > 0:
+        steps.append(_step("db", _warm_db(settings.DB_WARMUP_CONNECTIONS)))
+    else:
+        readiness.steps["db"] = "skipped"
+    if settings.LLM_WARMUP_CONNECTIONS > 0 and not llm_cassette.replaying:
+        steps.append(_step("llm_http", _warm_llm_http(settings.LLM_WARMUP_CONNECTIONS)))
+    else:
+        readiness.steps["llm_http"] = "skipped"
+    steps.append(_step("model_router", _seed_router()))
+    steps.append(_step("local_caches", asyncio.to_thread(_prime_local_caches)))
+    try:
+        await asyncio.wait_for(asyncio.gather(*steps), timeout=settings.WARMUP_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        logger.warning("Calentamiento incompleto tras %ss", settings.WARMUP_TIMEOUT_S)
+        for name in ("db", "llm_http", "model_router", "local_caches"):
+            readiness.steps.setdefault(name, "error: timeout")
+    readiness.warmup_ms = int((time.perf_counter() - started) * 1000)
+    while readiness.blocking():
+        logger.warning("Calentamiento: falló %s; /ready sigue en 503, reintento en %ss",
+                       ", ".join(readiness.blocking()), settings.WARMUP_RETRY_S)
+        await asyncio.sleep(settings.WARMUP_RETRY_S)
+        try:
+            await asyncio.wait_for(_step("db", _warm_db(1)), timeout=settings.WARMUP_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            readiness.steps["db"] = "error: timeout"
+    readiness.ready = True
+
+
+async def _wait_usage_writes(timeout_s: float) -> None:
+    pending = USAGE_LOG_PENDING.labels()
+    deadline = time.monotonic() + timeout_s
+    while pending.value > 0 and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+
+
+async def shutdown() -> None:
+    """Deja de estar lista, drena trabajo pendiente y cierra pools (BD, HTTP y render)."""
+    readiness.ready = False
+    timeout_s = settings.SHUTDOWN_DRAIN_TIMEOUT_S
+    from services.speculation import speculation_registry
+    speculation_registry.cancel_all()  # no se espera a generaciones que quizá nadie reclame
+    cancelled = await background.drain(timeout_s)
+    if cancelled:
+        logger.warning("%s tareas en segundo plano canceladas al apagar", cancelled)
+    await _wait_usage_writes(timeout_s)
+
+    engine = current_engine()
+    if engine is not None:
+        await engine.dispose()
+
+    from services.ai_client import close_client
+    await asyncio.to_thread(close_client)
+
+    from services.renderer import shutdown_pool
+    await asyncio.to_thread(shutdown_pool)
@@ -0,0 +1,130 @@
+# services/llm_cassette.py
+# Grabación y reproducción de llamadas al LLM ("cassettes") para ejecuciones deterministas.
+# Modos (settings.LLM_BACKEND_MODE):
+#   live         llamadas reales, sin grabar (por defecto)
+#   record       llamadas reales; cada par petición/respuesta se guarda con sus tiempos
+#   replay       responde desde el cassette reproduciendo la latencia original
+#   replay_fast  responde desde el cassette sin esperas (perfilar solo la parte no-LLM)
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from config.settings import settings
+
+LLM_BACKEND_MODES = ("live", "record", "replay", "replay_fast")
+
+
+class CassetteMissError(LookupError):
+    """No hay grabación para la petición en modo replay."""
+
+
+def cassette_key(messages: list[dict[str, str]], max_tokens, temperature) -> str:
+    """Hash estable de la petición (mensajes + parámetros de muestreo)."""
+    payload = json.dumps(
+        {"messages": messages, "max_tokens": max_tokens, "temperature": temperature},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChunkRecorder:
+    """Envuelve `on_chunk` para anotar cada trozo con su instante relativo al inicio (ms)."""
+
+    def __init__(self, on_chunk: Callable[[str], None], started: float):
+        self._on_chunk = on_chunk
+        self._started = started
+        self.chunks: list[tuple[float, str]] = []
+
+    def __call__(self, chunk: str) -> None:
+        self.chunks.append((round((time.perf_counter() - self._started) * 1000, 2), chunk))
+        self._on_chunk(chunk)
+
+
+class LLMCassette:
+    """Un fichero JSON por petición en `directory`, nombrado por `cassette_key`."""
+
+    def __init__(self, mode: str, directory: Path):
+        if mode not in LLM_BACKEND_MODES:
+            raise ValueError(f"LLM_BACKEND_MODE inválido: {mode!r} (usa uno de {', '.join(LLM_BACKEND_MODES)})")
+        self.mode = mode
+        self.directory = directory
+        self._lock = threading.Lock()
+        if mode != "live":
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode in ("replay", "replay_fast")
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def record(self, messages, max_tokens, temperature, *, prompt: str, model: Optional[str],
+               text: str, elapsed_ms: float, chunks: Optional[list[tuple[float, str]]] = None) -> None:
+        key = cassette_key(messages, max_tokens, temperature)
+        entry = {
+            "key": key,
+            "prompt": prompt,
+            "model": model,
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "elapsed_ms": round(elapsed_ms, 2),
+            "request": {"messages": messages, "max_tokens": max_tokens, "temperature": temperature},
+            "text": text,
+            "chunks": chunks,
+        }
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        with self._lock:
+            tmp.write_text(json.dumps(entry, ensure_ascii=False, indent=2), encoding="utf-8")
+            tmp.replace(path)
+
+    def load(self, messages, max_tokens, temperature) -> dict:
+        key = cassette_key(messages, max_tokens, temperature)
+        path = self._path(key)
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise CassetteMissError(
+                f"No hay grabación para la petición {key[:12]} en {self.directory}. "
+                f"Graba primero con LLM_BACKEND_MODE=record."
+            ) from None
+
+    def replay(self, messages, max_tokens, temperature, on_chunk=None) -> tuple[str, Optional[str]]:
+        """
+        Devuelve (texto, modelo) grabados. En modo `replay` respeta la latencia original
+        (y el ritmo de los trozos si se grabó en streaming); en `replay_fast` no espera.
+        """
+        entry = self.load(messages, max_tokens, temperature)
+        realtime = self.mode == "replay"
+        started = time.perf_counter()
+        chunks = entry.get("chunks")
+        if on_chunk is not None:
+            # si se grabó sin streaming se entrega la respuesta como un único trozo
+            for at_ms, chunk in chunks or [(entry["elapsed_ms"], entry["text"])]:
+                if realtime:
+                    wait = at_ms / 1000 - (time.perf_counter() - started)
+                    if wait > 0:
+                        time.sleep(wait)
+                on_chunk(chunk)
+        if realtime:
+            wait = entry["elapsed_ms"] / 1000 - (time.perf_counter() - started)
+            if wait > 0:
+                time.sleep(wait)
+        return entry["text"], entry.get("model")
+
+
+llm_cassette = LLMCassette(
+    settings.LLM_BACKEND_MODE,
+    Path(settings.LLM_CASSETTE_DIR or Path(settings.STORAGE_DIR) / "llm_cassettes"),
+)
+if llm_cassette.mode != "live":
+    logging.warning("Backend LLM en modo %s (cassettes en %s)", llm_cassette.mode, llm_cassette.directory)
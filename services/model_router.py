@@ -0,0 +1,140 @@
+# services/model_router.py
+import logging
+import threading
+from typing import Optional
+
+from config.settings import settings
+
+# Prompts conocidos (cada uno con su propia lista de modelos)
+PROMPT_EXTRACTOR = "extractor"
+PROMPT_ADAPTER = "adapter"
+
+
+def _parse_models(raw: Optional[str]) -> list[str]:
+    """Convierte una lista separada por comas en lista ordenada sin duplicados."""
+    models = [m.strip() for m in (raw or "").split(",") if m.strip()]
+    return list(dict.fromkeys(models))
+
+
+class ModelStats:
+    """EWMA de latencia (ms) y tasa de error observadas para un modelo."""
+
+    __slots__ = ("latency_ms", "error_rate", "samples")
+
+    def __init__(self):
+        self.latency_ms: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = 0
+
+    def update(self, alpha: float, latency_ms: Optional[float], error: bool) -> None:
+        if latency_ms is not None:
+            if self.latency_ms is None:
+                self.latency_ms = float(latency_ms)
+            else:
+                self.latency_ms = alpha * latency_ms + (1 - alpha) * self.latency_ms
+        self.error_rate = alpha * (1.0 if error else 0.0) + (1 - alpha) * self.error_rate
+        self.samples += 1
+
+    def score(self, error_penalty: float) -> Optional[float]:
+        """Menor es mejor. None si todavía no hay observaciones."""
+        if self.latency_ms is None:
+            # solo ha fallado (p.ej. "No endpoints found"): al final de la cola
+            return None if self.samples == 0 else float("inf")
+        return self.latency_ms * (1 + error_penalty * self.error_rate)
+
+
+class ModelRouter:
+    """
+    Ordena los modelos candidatos de cada prompt según la EWMA de latencia y errores.
+    Los modelos sin observaciones se tratan como el mejor conocido y se desempata
+    por el orden configurado, de modo que el modelo principal se usa mientras esté sano.
+    """
+
+    def __init__(self, alpha: float, error_penalty: float):
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self._stats: dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def candidates(self, prompt: str) -> list[str]:
+        """Lista ordenada (configurada) de modelos para el prompt dado."""
+        if prompt == PROMPT_EXTRACTOR:
+            models = _parse_models(settings.OPENROUTER_EXTRACTOR_MODELS)
+        elif prompt == PROMPT_ADAPTER:
+            models = _parse_models(settings.OPENROUTER_ADAPTER_MODELS)
+        else:
+            models = []
+        if not models:
+            models = [settings.OPENROUTER_MODEL]
+        return models
+
+    def route(self, prompt: str) -> list[str]:
+        """Devuelve los candidatos ordenados del más al menos preferido."""
+        models = self.candidates(prompt)
+        with self._lock:
+            scores = [
+                self._stats[m].score(self.error_penalty) if m in self._stats else None
+                for m in models
+            ]
+        known = [s for s in scores if s is not None]
+        best = min(known) if known else 0.0
+        order = sorted(
+            range(len(models)),
+            key=lambda i: (scores[i] if scores[i] is not None else best, i),
+        )
+        return [models[i] for i in order]
+
+    def observe(self, model: str, latency_ms: Optional[float], error: bool = False) -> None:
+        """Registra el resultado de una llamada a `model`."""
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None:
+                stats = self._stats[model] = ModelStats()
+            stats.update(self.alpha, latency_ms, error)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                m: {
+                    "latency_ms": round(s.latency_ms, 1) if s.latency_ms is not None else None,
+                    "error_rate": round(s.error_rate, 3),
+                    "samples": s.samples,
+                }
+                for m, s in self._stats.items()
+            }
+
+    async def seed_from_usage(self, db, limit_per_model: int = 50) -> None:
+        """
+        Inicializa las EWMA a partir de los registros recientes de llm_usage con la etapa "llm"
+        (tiempo de la llamada al modelo, no de la petición entera); las filas sin esa etapa
+        (analizador local, resultados reutilizados, especulación servida) no son una llamada.
+        Los resultados que empiezan por "ERROR:" cuentan como fallo del modelo registrado,
+        que en los errores es el último que se intentó.
+        """
+        from sqlalchemy import select, desc
+        from models.llmUsage import LLMUsage
+
+        models = set()
+        for prompt in (PROMPT_EXTRACTOR, PROMPT_ADAPTER):
+            models.update(self.candidates(prompt))
+
+        llm_ms = LLMUsage.stage_timings["llm"].as_float()
+        for model in models:
+            stmt = (
+                select(llm_ms, LLMUsage.result)
+                .where(LLMUsage.model == model, llm_ms.is_not(None))
+                .order_by(desc(LLMUsage.created_at))
+                .limit(limit_per_model)
+            )
+            rows = (await db.execute(stmt)).all()
+            # recorrer del más antiguo al más reciente para que la EWMA pondere lo último
+            for latency_ms, result in reversed(rows):
+                error = bool(result) and result.startswith("ERROR:")
+                self.observe(model, None if error else latency_ms, error=error)
+        logging.info("Router de modelos inicializado desde llm_usage: %s", self.snapshot())
+
+
+model_router = ModelRouter(
+    alpha=settings.MODEL_ROUTER_EWMA_ALPHA,
+    error_penalty=settings.MODEL_ROUTER_ERROR_PENALTY,
+)
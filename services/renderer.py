@@ -0,0 +1,307 @@
+# services/renderer.py
+# Exportación del cv_markdown generado a PDF (fpdf2, vía HTML de markdown2) y DOCX
+# (python-docx, recorriendo los tokens de markdown-it) en un pool de procesos acotado
+# (RENDER_WORKERS): el render es CPU puro y no debe competir con el event loop ni con el GIL.
+#
+# Los artefactos se cachean en STORAGE_DIR/render_cache con clave sha256(versión, plantilla,
+# formato, markdown): descargar otra vez el mismo resultado sirve el fichero del disco, y dos
+# peticiones simultáneas del mismo artefacto comparten un único render.
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Subir al cambiar el render o las plantillas: invalida la caché existente
+RENDERER_VERSION = 1
+
+FORMATS = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+# Plantillas: familia tipográfica (fuentes core de PDF / nombre de fuente en Word),
+# tamaño base, márgenes (mm) y color de encabezados (RGB)
+TEMPLATES = {
+    "classic": {"pdf_font": "times", "docx_font": "Times New Roman", "size": 11, "margin": 18, "accent": (0, 0, 0)},
+    "modern": {"pdf_font": "helvetica", "docx_font": "Calibri", "size": 10, "margin": 15, "accent": (31, 78, 121)},
+}
+
+CACHE_DIR = Path(settings.STORAGE_DIR) / "render_cache"
+MAX_MARKDOWN_CHARS = 200_000
+
+
+# ---------------------------------------------------------------------------
+# Render (se ejecuta en los procesos del pool: funciones de módulo, imports dentro)
+# ---------------------------------------------------------------------------
+
+# Las fuentes core de PDF solo cubren latin-1: se sustituye la tipografía "inteligente"
+_PDF_REPLACEMENTS = str.maketrans({
+    "–": "-", "—": "-", "‘": "'", "’": "'", "“": '"', "”": '"',
+    "•": "\xb7", "…": "...", " ": " ", "→": "->", "​": "",
+})
+
+
+def _pdf_text(text: str) -> str:
+    return text.translate(_PDF_REPLACEMENTS).encode("latin-1", "replace").decode("latin-1")
+
+
+def _first_heading(markdown: str) -> Optional[str]:
+    for line in markdown.splitlines():
+        if line.startswith("# "):
+            return line[2:].strip()
+    return None
+
+
+def render_pdf(markdown: str, template: str) -> bytes:
+    import markdown2
+    from fpdf import FPDF
+    from fpdf.fonts import FontFace
+
+    style = TEMPLATES[template]
+    html = markdown2.markdown(_pdf_text(markdown), extras=["tables", "cuddled-lists", "strike"])
+
+    pdf = FPDF(format="A4")
+    pdf.set_margins(style["margin"], style["margin"], style["margin"])
+    pdf.set_auto_page_break(True, margin=style["margin"])
+    pdf.add_page()
+    pdf.set_font(style["pdf_font"], size=style["size"])
+    title = _first_heading(markdown)
+    if title:
+        pdf.set_title(_pdf_text(title))
+    pdf.set_creator("CV Booster")
+    size = style["size"]
+    heading = {"color": style["accent"], "emphasis": "B"}
+    pdf.write_html(
+        html,
+        font_family=style["pdf_font"],
+        ul_bullet_char="\xb7",
+        li_prefix_color=style["accent"],
+        tag_styles={
+            "h1": FontFace(size_pt=size + 9, **heading),
+            "h2": FontFace(size_pt=size + 4, **heading),
+            "h3": FontFace(size_pt=size + 1, **heading),
+        },
+    )
+    return bytes(pdf.output())
+
+
+def _add_runs(paragraph, inline_token) -> None:
+    """Añade al párrafo los runs de un token `inline` de markdown-it (negrita, cursiva, código)."""
+    bold = italic = False
+    for child in inline_token.children or []:
+        if child.type == "strong_open":
+            bold = True
+        elif child.type == "strong_close":
+            bold = False
+        elif child.type == "em_open":
+            italic = True
+        elif child.type == "em_close":
+            italic = False
+        elif child.type in ("text", "code_inline"):
+            run = paragraph.add_run(child.content)
+            run.bold, run.italic = bold, italic
+            if child.type == "code_inline":
+                run.font.name = "Consolas"
+        elif child.type in ("softbreak", "hardbreak"):
+            paragraph.add_run().add_break()
+
+
+def render_docx(markdown: str, template: str) -> bytes:
+    from docx import Document
+    from docx.shared import Mm, Pt, RGBColor
+    from markdown_it import MarkdownIt
+
+    style = TEMPLATES[template]
+    doc = Document()
+    for section in doc.sections:
+        section.top_margin = section.bottom_margin = Mm(style["margin"])
+        section.left_margin = section.right_margin = Mm(style["margin"])
+    normal = doc.styles["Normal"]
+    normal.font.name = style["docx_font"]
+    normal.font.size = Pt(style["size"])
+    for level in (1, 2, 3):
+        heading_style = doc.styles[f"Heading {level}"]
+        heading_style.font.name = style["docx_font"]
+        heading_style.font.color.rgb = RGBColor(*style["accent"])
+    title = _first_heading(markdown)
+    if title:
+        doc.core_properties.title = title
+
+    tokens = MarkdownIt("commonmark").enable(["table", "strikethrough"]).parse(markdown)
+    lists: list[str] = []  # pila de "List Bullet" / "List Number" para listas anidadas
+    heading_level: Optional[int] = None
+    table_rows: Optional[list[list]] = None
+    for tok in tokens:
+        if tok.type == "heading_open":
+            heading_level = min(int(tok.tag[1]), 4)
+        elif tok.type == "bullet_list_open":
+            lists.append("List Bullet")
+        elif tok.type == "ordered_list_open":
+            lists.append("List Number")
+        elif tok.type in ("bullet_list_close", "ordered_list_close"):
+            lists.pop()
+        elif tok.type == "table_open":
+            table_rows = []
+        elif tok.type == "tr_open" and table_rows is not None:
+            table_rows.append([])
+        elif tok.type == "inline" and table_rows is not None:
+            table_rows[-1].append(tok)
+        elif tok.type == "table_close" and table_rows:
+            table = doc.add_table(rows=len(table_rows), cols=max(len(r) for r in table_rows))
+            table.style = "Table Grid"
+            for r, row in enumerate(table_rows):
+                for c, cell_tok in enumerate(row):
+                    _add_runs(table.cell(r, c).paragraphs[0], cell_tok)
+            table_rows = None
+        elif tok.type == "inline":
+            if heading_level is not None:
+                paragraph = doc.add_heading(level=heading_level)
+            elif lists:
+                depth = len(lists)
+                paragraph = doc.add_paragraph(style=lists[-1] + (f" {depth}" if 1 < depth <= 3 else ""))
+            else:
+                paragraph = doc.add_paragraph()
+            heading_level = None
+            _add_runs(paragraph, tok)
+        elif tok.type == "hr":
+            doc.add_paragraph("_" * 40)
+        elif tok.type in ("fence", "code_block"):
+            run = doc.add_paragraph().add_run(tok.content.rstrip("\n"))
+            run.font.name = "Consolas"
+
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+_RENDERERS = {"pdf": render_pdf, "docx": render_docx}
+
+
+def _render_to_file(fmt: str, template: str, markdown: str, path: str) -> int:
+    """Punto de entrada en el proceso del pool: renderiza y escribe el fichero de forma atómica."""
+    data = _RENDERERS[fmt](markdown, template)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+# ---------------------------------------------------------------------------
+# Pool y caché (proceso de la app)
+# ---------------------------------------------------------------------------
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_inflight: dict[str, asyncio.Future] = {}
+
+# Un artefacto servido hace menos de esto puede estar aún en un FileResponse: no se poda
+_PRUNE_GRACE_S = 60.0
+
+
+class _OwnerCancelled(Exception):
+    """El render compartido se canceló (cliente desconectado): quien esperaba lo retoma."""
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: no se hereda el estado del proceso (event loop, threads, conexiones)
+                _pool = ProcessPoolExecutor(max_workers=max(1, settings.RENDER_WORKERS), mp_context=get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """Cierra los procesos del pool (apagado ordenado); los renders en cola se cancelan."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def cache_key(markdown: str, fmt: str, template: str) -> str:
+    h = hashlib.sha256(f"{RENDERER_VERSION}\0{template}\0{fmt}\0".encode())
+    h.update(markdown.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _prune_cache(max_files: int) -> None:
+    """
+    Borra los artefactos menos usados recientemente (mtime, que se actualiza en cada acierto).
+    Los tocados en los últimos _PRUNE_GRACE_S segundos se conservan aunque se pase del límite.
+    """
+    files = []
+    for p in (p for fmt in FORMATS for p in CACHE_DIR.glob(f"*.{fmt}")):  # no los .tmp en curso
+        try:
+            files.append((p.stat().st_mtime, p))
+        except FileNotFoundError:
+            continue
+    files.sort(key=lambda item: item[0])
+    recent = time.time() - _PRUNE_GRACE_S
+    for mtime, path in files[:max(0, len(files) - max_files)]:
+        if mtime >= recent:
+            break  # ordenados por mtime: los siguientes son aún más recientes
+        path.unlink(missing_ok=True)
+
+
+def _cached(path: Path) -> bool:
+    try:
+        os.utime(path)  # LRU: un acierto refresca el mtime
+        return True
+    except FileNotFoundError:
+        return False
+
+
+async def render(markdown: str, fmt: str, template: str) -> tuple[Path, bool]:
+    """Devuelve (ruta del artefacto, si venía de la caché)."""
+    key = cache_key(markdown, fmt, template)
+    path = CACHE_DIR / f"{key}.{fmt}"
+    while True:
+        if await asyncio.to_thread(_cached, path):
+            return path, True
+        shared = _inflight.get(key)
+        if shared is None:
+            break
+        try:  # mismo artefacto ya renderizándose
+            await asyncio.shield(shared)
+        except _OwnerCancelled:
+            continue  # el original se canceló: una de las que esperaban pasa a renderizarlo
+        return path, True
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    _inflight[key] = future
+    try:
+        await asyncio.to_thread(CACHE_DIR.mkdir, parents=True, exist_ok=True)
+        started = time.perf_counter()
+        size = await loop.run_in_executor(get_pool(), _render_to_file, fmt, template, markdown, str(path))
+        logger.info("render %s/%s: %d bytes en %.0f ms", fmt, template, size, (time.perf_counter() - started) * 1000)
+        future.set_result(None)
+    except asyncio.CancelledError:
+        future.set_exception(_OwnerCancelled())
+        future.exception()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # marcar como recuperada si nadie más la espera
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+    if settings.RENDER_CACHE_MAX_FILES > 0:
+        await asyncio.to_thread(_prune_cache, settings.RENDER_CACHE_MAX_FILES)
+    return path, False
@@ -0,0 +1,306 @@
+# services/retention.py
+# Retención de datos: un barrido periódico (RETENTION_INTERVAL_S) borra lo que ya no sirve
+# según una política por tabla (sesiones expiradas/revocadas, confirmaciones de email
+# consumidas o caducadas, llm_usage antiguo, token buckets inactivos) y los ficheros viejos
+# de STORAGE_DIR (tmp_jobs, cv_results y los perfiles de ProfilingMiddleware).
+#
+# El borrado va por lotes de RETENTION_BATCH_SIZE filas, cada uno en su propia transacción
+# (DELETE ... WHERE pk IN (SELECT pk ... LIMIT n)) con una pausa entre lotes: nunca hay una
+# transacción larga ni bloqueos sobre muchas filas a la vez. Con varios workers/réplicas
+# sobre Postgres solo barre quien obtiene el advisory lock.
+#
+# Con LLM_USAGE_PARTITIONED, llm_usage es una tabla particionada por mes (ver README): el
+# barrido crea las particiones de los próximos meses y descarta las que quedan enteras
+# fuera de la retención con DROP TABLE, sin borrar fila a fila.
+import asyncio
+import logging
+import random
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+import sqlalchemy as sa
+from sqlalchemy import text
+
+from config.settings import settings
+from config.database import Base, get_engine
+from models.emailConfirmation import EmailConfirmation
+from models.llmUsage import LLMUsage
+from models.rateLimitBucket import RateLimitBucket
+from models.session import Session
+from utils.metrics import RETENTION_DELETED, RETENTION_SWEEP_DURATION
+
+logger = logging.getLogger("cv_booster.retention")
+
+SCHEMA = Base.metadata.schema
+ADVISORY_LOCK_KEY = 0x43565F5245544E  # "CV_RETN": un único barrido a la vez entre procesos
+# Un bucket sin tocar en un día está lleno: borrarlo equivale a no tenerlo
+RATE_LIMIT_BUCKET_IDLE_S = 86400
+_PARTITION_RE = re.compile(r"^llm_usage_(\d{4})_(\d{2})$")
+
+
+class RetentionPolicy:
+    """Qué filas de `table` sobran: `condition(now)` devuelve la cláusula WHERE (o None = conservar todo)."""
+    __slots__ = ("name", "table", "condition")
+
+    def __init__(self, name: str, table: sa.Table, condition: Callable[[datetime], Optional[sa.ColumnElement]]):
+        self.name = name
+        self.table = table
+        self.condition = condition
+
+
+def _cutoff(now: datetime, days: int) -> Optional[datetime]:
+    return now - timedelta(days=days) if days > 0 else None
+
+
+def _sessions(now: datetime):
+    cutoff = _cutoff(now, settings.SESSIONS_RETENTION_DAYS)
+    if cutoff is None:
+        return None
+    # expiradas hace más de N días, o revocadas (last_accessed ~ logout) hace más de N días
+    return sa.or_(Session.expires_at < cutoff, sa.and_(Session.is_revoked == True, Session.last_accessed < cutoff))
+
+
+def _email_confirmations(now: datetime):
+    cutoff = _cutoff(now, settings.EMAIL_CONFIRMATIONS_RETENTION_DAYS)
+    if cutoff is None:
+        return None
+    return sa.or_(EmailConfirmation.expires_at < cutoff,
+                  sa.and_(EmailConfirmation.consumed == True, EmailConfirmation.created_at < cutoff))
+
+
+def _llm_usage(now: datetime):
+    cutoff = _cutoff(now, settings.LLM_USAGE_RETENTION_DAYS)
+    return None if cutoff is None else LLMUsage.created_at < cutoff
+
+
+def _rate_limit_buckets(now: datetime):
+    if settings.RATE_LIMIT_BACKEND != "db":
+        return None  # la tabla solo existe/se usa con el backend compartido
+    return RateLimitBucket.updated_at < now.timestamp() - RATE_LIMIT_BUCKET_IDLE_S
+
+
+POLICIES = (
+    RetentionPolicy("sessions", Session.__table__, _sessions),
+    RetentionPolicy("email_confirmations", EmailConfirmation.__table__, _email_confirmations),
+    RetentionPolicy("llm_usage", LLMUsage.__table__, _llm_usage),
+    RetentionPolicy("rate_limit_buckets", RateLimitBucket.__table__, _rate_limit_buckets),
+)
+
+# Ficheros en STORAGE_DIR (directorio -> patrón) borrables por mtime: los de trabajos pasados
+# JOB_FILES_RETENTION_DAYS y los perfiles (utils/loop_monitor.py) pasados PROFILES_RETENTION_DAYS
+FILE_DIRS = {"tmp_jobs": "*.json", "cv_results": "*.json"}
+PROFILE_DIRS = {"profiles": "*.folded"}
+
+
+# ---------------------------------------------------------------------------
+# Borrado por lotes
+# ---------------------------------------------------------------------------
+
+async def _delete_batches(policy: RetentionPolicy, condition) -> int:
+    """Borra en lotes hasta agotar las filas o llegar a RETENTION_MAX_BATCHES. Devuelve cuántas."""
+    engine = get_engine()
+    pk = next(iter(policy.table.primary_key.columns))
+    batch = max(1, settings.RETENTION_BATCH_SIZE)
+    ids = sa.select(pk).where(condition).limit(batch).scalar_subquery()
+    stmt = sa.delete(policy.table).where(pk.in_(ids))
+    deleted = 0
+    for _ in range(max(1, settings.RETENTION_MAX_BATCHES)):
+        async with engine.begin() as conn:
+            rows = (await conn.execute(stmt)).rowcount or 0
+        deleted += rows
+        RETENTION_DELETED.labels(policy.name).inc(rows)
+        if rows < batch:
+            break
+        await asyncio.sleep(settings.RETENTION_BATCH_PAUSE_MS / 1000)
+    else:
+        logger.info("Retención %s: límite de %s lotes alcanzado; sigue en el próximo barrido",
+                    policy.name, settings.RETENTION_MAX_BATCHES)
+    return deleted
+
+
+def _delete_old_files(days: int, dirs: dict[str, str]) -> dict[str, int]:
+    cutoff = time.time() - days * 86400
+    deleted = {}
+    for name, pattern in dirs.items():
+        count = 0
+        for path in (Path(settings.STORAGE_DIR) / name).glob(pattern):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    count += 1
+            except FileNotFoundError:
+                pass
+        deleted[name] = count
+        RETENTION_DELETED.labels(f"files:{name}").inc(count)
+    return deleted
+
+
+# ---------------------------------------------------------------------------
+# Particiones mensuales de llm_usage (solo Postgres)
+# ---------------------------------------------------------------------------
+
+def _month_start(d: date, offset: int = 0) -> date:
+    month = d.year * 12 + d.month - 1 + offset
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"llm_usage_{month.year:04d}_{month.month:02d}"
+
+
+async def llm_usage_partitions(conn) -> list[tuple[str, date]]:
+    """Particiones mensuales existentes de llm_usage: [(nombre, primer día del mes)] en orden."""
+    rows = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "JOIN pg_namespace n ON n.oid = p.relnamespace "
+        "WHERE n.nspname = :schema AND p.relname = 'llm_usage'"
+    ), {"schema": SCHEMA})
+    found = []
+    for (name,) in rows:
+        m = _PARTITION_RE.match(name)
+        if m:
+            found.append((name, date(int(m.group(1)), int(m.group(2)), 1)))
+    return sorted(found, key=lambda p: p[1])
+
+
+async def ensure_llm_usage_partitions(conn, today: date, months_ahead: int) -> list[str]:
+    """Crea (si faltan) las particiones del mes actual y de los `months_ahead` siguientes."""
+    existing = {name for name, _ in await llm_usage_partitions(conn)}
+    created = []
+    for offset in range(months_ahead + 1):
+        start = _month_start(today, offset)
+        name = partition_name(start)
+        if name in existing:
+            continue
+        await conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{SCHEMA}"."{name}" PARTITION OF "{SCHEMA}".llm_usage '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{_month_start(start, 1).isoformat()}')"
+        ))
+        created.append(name)
+    return created
+
+
+async def drop_expired_llm_usage_partitions(conn, cutoff: datetime) -> list[str]:
+    """Elimina las particiones cuyo mes entero es anterior a `cutoff`."""
+    dropped = []
+    for name, start in await llm_usage_partitions(conn):
+        end = _month_start(start, 1)
+        if datetime(end.year, end.month, end.day, tzinfo=timezone.utc) <= cutoff:
+            await conn.execute(text(f'DROP TABLE IF EXISTS "{SCHEMA}"."{name}"'))
+            dropped.append(name)
+    return dropped
+
+
+async def _maintain_partitions(now: datetime) -> dict:
+    report = {"created": [], "dropped": []}
+    async with get_engine().begin() as conn:
+        report["created"] = await ensure_llm_usage_partitions(conn, now.date(), settings.LLM_USAGE_PARTITIONS_AHEAD)
+    cutoff = _cutoff(now, settings.LLM_USAGE_RETENTION_DAYS)
+    if cutoff is not None:
+        async with get_engine().begin() as conn:
+            report["dropped"] = await drop_expired_llm_usage_partitions(conn, cutoff)
+        RETENTION_DELETED.labels("llm_usage_partitions").inc(len(report["dropped"]))
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Barrido
+# ---------------------------------------------------------------------------
+
+def _is_postgres() -> bool:
+    return get_engine().dialect.name == "postgresql"
+
+
+async def _sweep(now: datetime) -> dict:
+    report: dict = {"tables": {}}
+    if settings.LLM_USAGE_PARTITIONED and _is_postgres():
+        try:
+            report["llm_usage_partitions"] = await _maintain_partitions(now)
+        except Exception as e:
+            report["llm_usage_partitions"] = {"error": str(e)}
+            logger.exception("Retención: mantenimiento de particiones de llm_usage falló")
+    # Aun particionada, se borra fila a fila lo que queda en el mes frontera (y en DEFAULT)
+    for policy in POLICIES:
+        condition = policy.condition(now)
+        if condition is None:
+            continue
+        try:
+            report["tables"][policy.name] = await _delete_batches(policy, condition)
+        except Exception as e:
+            report["tables"][policy.name] = f"error: {e}"
+            logger.exception("Retención de %s falló", policy.name)
+    if settings.JOB_FILES_RETENTION_DAYS > 0:
+        report["files"] = await asyncio.to_thread(_delete_old_files, settings.JOB_FILES_RETENTION_DAYS, FILE_DIRS)
+    if settings.PROFILES_RETENTION_DAYS > 0:
+        profiles = await asyncio.to_thread(_delete_old_files, settings.PROFILES_RETENTION_DAYS, PROFILE_DIRS)
+        report.setdefault("files", {}).update(profiles)
+    return report
+
+
+async def sweep_once() -> Optional[dict]:
+    """
+    Un barrido completo. Devuelve el informe (filas/ficheros borrados por destino) o None
+    si otro proceso tiene el advisory lock (Postgres).
+    """
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    if not _is_postgres():
+        report = await _sweep(now)
+    else:
+        async with get_engine().connect() as lock_conn:
+            got = (await lock_conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": ADVISORY_LOCK_KEY})).scalar()
+            await lock_conn.commit()
+            if not got:
+                return None
+            try:
+                report = await _sweep(now)
+            finally:
+                await lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": ADVISORY_LOCK_KEY})
+                await lock_conn.commit()
+    elapsed = time.perf_counter() - started
+    RETENTION_SWEEP_DURATION.observe(elapsed)
+    report["duration_ms"] = int(elapsed * 1000)
+    logger.info("Retención: %s", report)
+    return report
+
+
+class RetentionSweeper:
+    """Tarea periódica (start/stop desde el lifespan) que llama a sweep_once()."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.last_report: Optional[dict] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="retention")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        interval = max(60.0, settings.RETENTION_INTERVAL_S)
+        # primer barrido pasado el arranque, desfasado entre workers
+        await asyncio.sleep(random.uniform(60, 120))
+        while True:
+            try:
+                report = await sweep_once()
+                if report is not None:
+                    self.last_report = report
+            except Exception:
+                logger.exception("Barrido de retención falló")
+            await asyncio.sleep(interval * random.uniform(0.9, 1.1))
+
+
+retention_sweeper = RetentionSweeper()
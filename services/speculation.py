@@ -0,0 +1,229 @@
+# services/speculation.py
+# Generación especulativa: si analyze_job recibe también el CV, el Prompt B arranca en segundo
+# plano con el extractor_json sin editar mientras el usuario revisa las keywords. Como la
+# mayoría las confirma tal cual, generate_cv/strict suele encontrar la adaptación ya hecha (o
+# en curso) y se ahorra una latencia completa de LLM.
+#
+# generate_cv/strict reclama la especulación de su job_id: se usa solo si coinciden el CV
+# (digest del texto ofuscado), las keywords confirmadas, no hay options y el modo efectivo es
+# "single"; si no, se descarta. Como mucho una especulación viva por usuario (una nueva
+# reemplaza a la anterior) y caducan a los SPECULATION_TTL_S sin reclamar.
+#
+# Cada especulación es una llamada de pago, así que cuenta como una generación: ocupa una
+# plaza de MAX_CONCURRENT_GENERATIONS_PER_USER mientras corre su thread, reserva una unidad
+# de la cuota diaria (si se sirve, esa unidad se devuelve porque la paga la fila de
+# generate_cv/strict) y consume un token del bucket "generate" (si no, analyze_job, con su
+# bucket más holgado, permitiría lanzar adaptaciones más deprisa que generate). Solo se lanza
+# si deja libre otra plaza y otro token para ese generate (con MAX_CONCURRENT_GENERATIONS_PER_USER=1
+# o RATE_LIMIT_GENERATE_BURST=1 no hay especulación). No se lanza si el usuario ya tiene una llamada especulativa en curso
+# (aunque esté descartada: el thread del LLM no se puede interrumpir), ni sin plaza o cuota.
+# Las descartadas se registran en llm_usage con endpoint SPECULATIVE_ENDPOINT, con el
+# modelo y la latencia reales en cuanto termina la llamada; esa fila cuenta para la cuota.
+# Tasa de acierto: speculative_generations_total{outcome="hit"} frente al total.
+#
+# El registro vive en memoria de cada proceso: con varios workers, generate_cv/strict solo
+# encuentra la especulación si cae en el mismo worker que analyze_job (si no, acaba
+# "expired" tras pagar la llamada). Actívalo con un solo worker o con afinidad por usuario.
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from config.database import AsyncSessionLocal
+from config.settings import settings
+from services.ai_client import adapt_cv_strict
+from utils import background
+from utils.llm_tracker import LLMTracker
+from utils.metrics import SPECULATIVE_GENERATIONS
+from utils.rate_limit import (
+    release_generation_slot, release_reservation, reserve_quota, try_acquire_generation_slot, try_take_token,
+)
+
+logger = logging.getLogger("cv_booster.speculation")
+
+SPECULATIVE_ENDPOINT = "/cv-boost/generate_cv/speculative"
+
+
+def _keyword_set(extractor_json: Optional[dict]) -> frozenset:
+    return frozenset(k.strip().lower() for k in (extractor_json or {}).get("keywords_ats") or [] if k.strip())
+
+
+class Speculation:
+    __slots__ = ("user_id", "job_id", "digest", "keywords", "tracker", "task", "started_at", "expiry",
+                 "reservation")
+
+    def __init__(self, user_id, job_id: str, digest: str, extractor_json: dict, reservation: Optional[tuple]):
+        self.user_id = user_id
+        self.job_id = job_id
+        self.digest = digest
+        self.keywords = _keyword_set(extractor_json)
+        self.tracker = LLMTracker()  # modelo, tokens y tiempo de la llamada especulativa
+        self.tracker.start_tracking()
+        self.task: Optional[asyncio.Task] = None
+        self.started_at = time.perf_counter()
+        self.expiry: Optional[asyncio.TimerHandle] = None
+        self.reservation = reservation  # unidad de cuota diaria reservada al lanzarla
+
+
+class SpeculationRegistry:
+    """Especulaciones vivas por usuario. Sin locks: solo se usa desde el event loop."""
+
+    def __init__(self):
+        self._by_user: dict[str, Speculation] = {}
+        self._running: set[str] = set()  # usuarios con una llamada especulativa aún en su thread
+
+    async def start(self, db, user_id, job_id: str, digest: str, obf_text: str,
+                    extractor_json: dict) -> Optional[str]:
+        """
+        Lanza adapt_cv_strict en segundo plano (sin streaming ni options) para este job.
+        Devuelve None si se lanzó o el motivo por el que no.
+        """
+        key = str(user_id)
+        if key in self._running:
+            SPECULATIVE_GENERATIONS.labels("skipped").inc()
+            return "llamada especulativa anterior en curso"
+        # deja libre la plaza del generate_cv/strict que la reclamará
+        if not try_acquire_generation_slot(key, keep_free=1):
+            SPECULATIVE_GENERATIONS.labels("skipped").inc()
+            return "sin plazas de generación libres"
+        try:
+            ok, reservation = await reserve_quota(db, user_id)
+        except BaseException:
+            release_generation_slot(key)
+            raise
+        if not ok:
+            release_generation_slot(key)
+            SPECULATIVE_GENERATIONS.labels("skipped").inc()
+            return "cuota diaria agotada"
+        # y un token del bucket "generate", dejando otro para el generate_cv/strict
+        try:
+            ok = await try_take_token(db, key, "generate", keep=1)
+        except BaseException:
+            release_reservation(reservation)
+            release_generation_slot(key)
+            raise
+        if not ok:
+            release_reservation(reservation)
+            release_generation_slot(key)
+            SPECULATIVE_GENERATIONS.labels("skipped").inc()
+            return "límite de generaciones por minuto"
+
+        old = self._by_user.pop(key, None)
+        if old is not None:
+            self._discard(old, "replaced")
+
+        spec = Speculation(user_id, job_id, digest, extractor_json, reservation)
+        loop = asyncio.get_running_loop()
+        spec.task = loop.create_task(
+            asyncio.to_thread(adapt_cv_strict, obf_text, extractor_json, True, None, spec.tracker),
+            name=f"speculation-{job_id}",
+        )
+        self._running.add(key)
+        spec.task.add_done_callback(lambda task: self._finished(key, task))
+        spec.expiry = loop.call_later(settings.SPECULATION_TTL_S, self._expire, key, spec)
+        self._by_user[key] = spec
+        return None
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        self._running.discard(key)
+        release_generation_slot(key)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Generación especulativa falló: %s", task.exception())
+
+    def claim(self, user_id, job_id: str, digest: str, extractor_json: dict, options: Optional[str],
+              adapt_mode: str) -> tuple[Optional[Speculation], Optional[str]]:
+        """
+        Reclama la especulación de `job_id` para generate_cv/strict. Devuelve (especulación si
+        se puede usar, resultado) con resultado "hit", "miss_cv", "miss_keywords", "miss_options"
+        o "miss_mode"; (None, None) si no había especulación para ese job.
+        """
+        key = str(user_id)
+        spec = self._by_user.get(key)
+        if spec is None or spec.job_id != job_id:
+            return None, None
+        del self._by_user[key]
+        if spec.expiry is not None:
+            spec.expiry.cancel()
+
+        if spec.digest != digest:
+            outcome = "miss_cv"
+        elif spec.keywords != _keyword_set(extractor_json):
+            outcome = "miss_keywords"
+        elif options and options.strip():
+            outcome = "miss_options"
+        elif adapt_mode != "single":
+            outcome = "miss_mode"
+        else:
+            return spec, "hit"  # la métrica la cuenta take_result ("hit" o "failed")
+        self._discard(spec, outcome)
+        return None, outcome
+
+    def _expire(self, key: str, spec: Speculation) -> None:
+        if self._by_user.get(key) is spec:
+            del self._by_user[key]
+            self._discard(spec, "expired")
+
+    def _discard(self, spec: Speculation, outcome: str) -> None:
+        SPECULATIVE_GENERATIONS.labels(outcome).inc()
+        if spec.expiry is not None:
+            spec.expiry.cancel()
+        # el thread del LLM no se puede interrumpir: se deja terminar y se registra su coste real
+        background.spawn(_log_discarded(spec, outcome), name=f"speculation-discard-{spec.job_id}")
+
+    def cancel_all(self) -> None:
+        """Apagado: descarta las especulaciones vivas sin esperar a sus llamadas."""
+        for key in list(self._by_user):
+            spec = self._by_user.pop(key)
+            if spec.expiry is not None:
+                spec.expiry.cancel()
+            spec.task.cancel()
+
+    def __len__(self) -> int:
+        return len(self._by_user)
+
+
+async def take_result(spec: Speculation, tracker: LLMTracker) -> Optional[str]:
+    """
+    Espera (si aún no terminó) el markdown de una especulación reclamada con "hit" y pasa a
+    `tracker` el modelo y el informe del prompt. None si la llamada especulativa falló.
+    """
+    # la unidad de cuota de la especulación se devuelve: la llamada la paga generate_cv/strict
+    # (o, si falló, la nueva llamada que hace generate)
+    release_reservation(spec.reservation)
+    try:
+        md = await spec.task
+    except Exception:
+        SPECULATIVE_GENERATIONS.labels("failed").inc()
+        return None
+    SPECULATIVE_GENERATIONS.labels("hit").inc()
+    tracker.model = spec.tracker.model
+    tracker.llm_calls += spec.tracker.llm_calls
+    report = dict(spec.tracker.prompt_report or {})
+    report["speculative"] = True
+    report["speculation_age_ms"] = int((time.perf_counter() - spec.started_at) * 1000)
+    tracker.prompt_report = report
+    return md
+
+
+async def _log_discarded(spec: Speculation, outcome: str) -> None:
+    """Espera a que termine la llamada descartada y registra su modelo, latencia y etapas reales."""
+    try:
+        await spec.task
+        result = f"SPECULATIVE_DISCARDED: {outcome}"
+    except asyncio.CancelledError:
+        release_reservation(spec.reservation)  # apagado: no hay fila que cuente
+        return
+    except Exception as e:
+        release_reservation(spec.reservation)  # las filas ERROR no cuentan para la cuota
+        result = f"ERROR: {e}"
+    async with AsyncSessionLocal() as db:
+        await spec.tracker.log_usage(
+            db=db,
+            user_id=str(spec.user_id),
+            model=settings.OPENROUTER_MODEL,
+            endpoint=SPECULATIVE_ENDPOINT,
+            result=result,
+        )
+
+
+speculation_registry = SpeculationRegistry()
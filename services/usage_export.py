@@ -0,0 +1,108 @@
+# services/usage_export.py
+# Exportación completa de llm_usage en NDJSON o CSV sin cargarla en memoria: las filas salen
+# de un cursor del servidor (stream + yield_per) y se serializan y envían por lotes de
+# USAGE_EXPORT_BATCH_ROWS, así la memoria es la de un lote sea cual sea el historial.
+#
+# El stream abre su propia conexión: las dependencias con yield de FastAPI (get_db) se cierran
+# antes de que empiece a enviarse el cuerpo de un StreamingResponse.
+import csv
+import io
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+import orjson
+from sqlalchemy import and_, func, select
+
+from config.settings import settings
+from config.database import get_engine
+from models.llmUsage import LLMUsage
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+_BASE_COLUMNS = (
+    LLMUsage.id,
+    LLMUsage.request_id,
+    LLMUsage.model,
+    LLMUsage.endpoint,
+    LLMUsage.latency_ms,
+    LLMUsage.stage_timings,
+    LLMUsage.llm_calls,
+    func.coalesce(func.length(LLMUsage.result), 0).label("result_length"),
+    LLMUsage.created_at,
+)
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # fechas sin zona en los filtros se interpretan en UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def build_query(
+    user_id=None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    endpoint_filter: Optional[str] = None,
+    model_filter: Optional[str] = None,
+    include_result: bool = False,
+):
+    """SELECT de la exportación en orden cronológico. user_id None = todos los usuarios."""
+    columns = list(_BASE_COLUMNS)
+    if user_id is None:
+        columns.insert(1, LLMUsage.user_id)
+    if include_result:
+        columns.append(LLMUsage.result)
+
+    conditions = []
+    if user_id is not None:
+        conditions.append(LLMUsage.user_id == user_id)
+    if date_from is not None:
+        conditions.append(LLMUsage.created_at >= _utc(date_from))
+    if date_to is not None:
+        conditions.append(LLMUsage.created_at < _utc(date_to))
+    if endpoint_filter:
+        conditions.append(LLMUsage.endpoint.ilike(f"%{endpoint_filter}%"))
+    if model_filter:
+        conditions.append(LLMUsage.model.ilike(f"%{model_filter}%"))
+
+    stmt = select(*columns)
+    if conditions:
+        stmt = stmt.where(and_(*conditions))
+    return stmt.order_by(LLMUsage.created_at, LLMUsage.id)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value).decode()
+    return value
+
+
+def _ndjson_chunk(keys: list[str], rows) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(keys, row)), option=orjson.OPT_NAIVE_UTC) + b"\n" for row in rows)
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_csv_value(v) for v in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def stream_rows(stmt, fmt: str) -> AsyncIterator[bytes]:
+    """Cuerpo del StreamingResponse: cabecera (CSV) y un bloque de bytes por lote de filas."""
+    batch = max(1, settings.USAGE_EXPORT_BATCH_ROWS)
+    async with get_engine().connect() as conn:
+        result = await conn.stream(stmt.execution_options(yield_per=batch))
+        keys = list(result.keys())
+        if fmt == "csv":
+            yield _csv_chunk([keys])
+        async for rows in result.partitions():
+            yield _ndjson_chunk(keys, rows) if fmt == "ndjson" else _csv_chunk(rows)
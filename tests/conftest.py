@@ -0,0 +1,16 @@
+# Valores de prueba para la configuración obligatoria (un .env real tiene prioridad si existe)
+import os
+import tempfile
+
+for name, value in {
+    "OPENROUTER_API_KEY": "test",
+    "OPENROUTER_API_BASE": "http://127.0.0.1:9/v1",
+    "OPENROUTER_MODEL": "test/model",
+    "JWT_SECRET": "test-secret",
+    "JWT_ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "DATABASE_URL": "sqlite+aiosqlite:///:memory:",
+    "STORAGE_DIR": tempfile.mkdtemp(prefix="cvbooster-tests-"),
+    "MAX_UPLOAD_BYTES": "5242880",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,54 @@
+from utils.compactor import compact_cv_text
+
+PAGE_BREAK = "\f"
+
+
+def test_multipage_date_ranges_are_not_dropped_as_headers():
+    pages = [
+        "Ana Pérez - CV 1\nExperiencia\nAcme\n2021 - 2023\n- Python\nBeta\n2023 - 2024\n- Go\nConfidencial",
+        "Ana Pérez - CV 2\nGamma\n2019 - 2021\n- Java\nEducación\nUniversidad\n2012 - 2017\nConfidencial",
+        "Ana Pérez - CV 3\nDelta\n03/2017 – actualidad\n- Rust\nIdiomas\nInglés\n2010 - 2012\nConfidencial",
+    ]
+    text, report = compact_cv_text(PAGE_BREAK.join(pages))
+    lines = text.split("\n")
+    for date_range in ("2021 - 2023", "2023 - 2024", "2019 - 2021", "2012 - 2017", "03/2017 – actualidad", "2010 - 2012"):
+        assert date_range in lines
+    # la cabecera con número de página y el pie sí se quitan (se conserva la primera aparición)
+    assert lines.count("Confidencial") == 1
+    assert "Ana Pérez - CV 2" not in lines and "Ana Pérez - CV 3" not in lines
+    assert report["repeated_lines_removed"] == 4
+
+
+def test_single_page_repeated_date_lines_are_kept():
+    text, report = compact_cv_text("# CV\n\n2019 - 2020\n- a\n2020 - 2021\n- b\n2021 - 2022\n- c\n2022 - 2023\n- d")
+    assert report["repeated_lines_removed"] == 0
+    assert text.count(" - 20") == 4
+
+
+def test_single_page_repeated_job_lines_are_kept():
+    jobs = "\n".join(
+        f"## {company}\nBogotá, Colombia\n2020 - 2021\nResponsabilidades:\n- Tarea {company}"
+        for company in ("Acme", "Beta", "Gamma", "Delta")
+    )
+    text, report = compact_cv_text(f"# Ana Pérez\n\n{jobs}")
+    assert report["repeated_lines_removed"] == 0
+    assert text.count("Bogotá, Colombia") == 4
+    assert text.count("Responsabilidades:") == 4
+
+
+def test_multipage_body_lines_are_not_headers():
+    page = "Ana Pérez - CV {n}\nResumen\n## Puesto {n}\nBogotá, Colombia\nResponsabilidades:\n- Tarea {n}\n- Otra {n}\nMás {n}\nConfidencial"
+    text, report = compact_cv_text(PAGE_BREAK.join(page.format(n=n) for n in (1, 2, 3)))
+    assert text.count("Bogotá, Colombia") == 3
+    assert text.count("Responsabilidades:") == 3
+    assert text.count("Confidencial") == 1
+
+
+def test_markdown_structure_lines_are_kept():
+    md = "## Habilidades\n\n| Área | Nivel |\n|---|:---:|\n| Python | Alto |\n\n---\n\n```\ncódigo\n```\n\n....\n•"
+    text, report = compact_cv_text(md)
+    lines = text.split("\n")
+    for structure in ("|---|:---:|", "---", "```"):
+        assert structure in lines
+    assert "...." not in lines and "•" not in lines
+    assert report["junk_lines_removed"] == 2
@@ -0,0 +1,44 @@
+from services.job_analyzer import analyze_job_local, get_job_matcher
+from utils.aho_corasick import fold, leftmost_longest
+
+JOB = """Desarrollador Mobile Senior
+Buscamos desarrollador con experiencia en React Native y Node.js.
+
+Requisitos:
+- 5 años de experiencia
+- TypeScript
+- Inglés intermedio
+
+Deseable: Docker, Kubernetes, AWS
+"""
+
+
+def _names(result: dict) -> list[str]:
+    return [t["name"] for t in result["tecnologias"]]
+
+
+def test_contained_matches_are_not_counted():
+    folded = fold("React Native y Node.js")
+    values = [v for _, _, v in leftmost_longest(get_job_matcher().search(folded))]
+    assert ("tech", "React Native") in values and ("tech", "React") not in values
+    assert values.count(("tech", "Node.js")) == 1 and ("tech", "JavaScript") not in values
+
+    names = _names(analyze_job_local(JOB))
+    assert "React" not in names and "JavaScript" not in names
+    assert names.count("Node.js") == 1
+
+
+def test_header_context_applies_to_following_bullets():
+    result = analyze_job_local(JOB)
+    assert "Requisitos:" not in result["requisitos_imprescindibles"]
+    assert {"5 años de experiencia", "TypeScript", "Inglés intermedio"} <= set(result["requisitos_imprescindibles"])
+    assert result["requisitos_deseables"] == ["Deseable: Docker, Kubernetes, AWS"]
+    confidence = {t["name"]: t["confidence"] for t in result["tecnologias"]}
+    for tech in ("Docker", "Kubernetes", "AWS"):
+        assert confidence[tech] < confidence["TypeScript"]
+
+
+def test_header_context_ends_at_blank_line():
+    result = analyze_job_local("Se valorará:\n- Docker\n\nOfrecemos:\n- Teletrabajo")
+    assert result["requisitos_deseables"] == ["Docker"]
+    assert result["requisitos_imprescindibles"] == []
@@ -0,0 +1,59 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from config.settings import settings
+from utils import rate_limit
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/cv-boost/generate_cv", "headers": [], "state": {}})
+
+
+def test_concurrent_generations_cannot_bypass_the_slot(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "MAX_CONCURRENT_GENERATIONS_PER_USER", 1)
+    monkeypatch.setattr(settings, "LLM_DAILY_QUOTA", 10)
+    monkeypatch.setattr(settings, "RATE_LIMIT_GENERATE_BURST", 10)
+    monkeypatch.setattr(rate_limit, "_quota", rate_limit.DailyQuota())
+    monkeypatch.setattr(rate_limit, "_buckets", rate_limit.MemoryBuckets())
+
+    async def count_usage(db, user_id, day_start):
+        await asyncio.sleep(0)  # como la consulta real, cede el event loop
+        return 0
+
+    monkeypatch.setattr(rate_limit, "_count_usage_today", count_usage)
+    user = SimpleNamespace(id=uuid.uuid4())
+    rate_limited = rate_limit.rate_limited("generate")
+
+    async def scenario():
+        gens = [rate_limited(_request(), user, None) for _ in range(2)]
+        outcomes = await asyncio.gather(*(g.__anext__() for g in gens), return_exceptions=True)
+        rejected = [o for o in outcomes if isinstance(o, HTTPException)]
+        assert len(rejected) == 1 and rejected[0].status_code == 429
+        assert rate_limit._in_flight == {str(user.id): 1}
+        for gen, outcome in zip(gens, outcomes):
+            if not isinstance(outcome, HTTPException):
+                await gen.aclose()
+        assert str(user.id) not in rate_limit._in_flight
+
+    asyncio.run(scenario())
+
+
+def test_take_token_keeps_one_for_the_claiming_generate(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_GENERATE_BURST", 2)
+    monkeypatch.setattr(settings, "RATE_LIMIT_GENERATE_PER_MIN", 0)
+    monkeypatch.setattr(rate_limit, "_buckets", rate_limit.MemoryBuckets())
+    user_id = uuid.uuid4()
+
+    async def scenario():
+        assert await rate_limit.try_take_token(None, user_id, "generate", keep=1)
+        # queda un token: es del generate_cv/strict, la especulación no lo toma
+        assert not await rate_limit.try_take_token(None, user_id, "generate", keep=1)
+        assert await rate_limit.try_take_token(None, user_id, "generate")
+
+    asyncio.run(scenario())
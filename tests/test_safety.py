@@ -0,0 +1,55 @@
+import pytest
+
+from utils.safety import PIIScanner, obfuscate_personal_data
+
+
+@pytest.mark.parametrize("text", [
+    "Ventas anuales por 1.200.000 USD",
+    "Revenue of 25,000,000 in 2023",
+    "Presupuesto de $ 3 500 000 al año",
+    "Ahorro de 3500000 COP en licencias",
+    "Road to 2025: plan de migración",
+    "Periodo (2019 - 2021)",
+])
+def test_figures_and_titles_are_not_pii(text):
+    obfuscated, mapping = obfuscate_personal_data(text)
+    assert obfuscated == text
+    assert not mapping["placeholders"]
+
+
+@pytest.mark.parametrize("text, placeholder, value", [
+    ("Tel: (601) 555-1234", "[PHONE_1]", "(601) 555-1234"),
+    ("Móvil +57 300 123 4567", "[PHONE_1]", "+57 300 123 4567"),
+    ("Vivo en Calle 45 # 12-34, Bogotá", "[ADDRESS_1]", "Calle 45 # 12-34"),
+    ("221B Baker Street, London", "[ADDRESS_1]", "221B Baker Street"),
+])
+def test_pii_is_masked(text, placeholder, value):
+    obfuscated, mapping = obfuscate_personal_data(text)
+    assert obfuscated == text.replace(value, placeholder)
+    assert mapping["placeholders"][placeholder] == value
+
+
+def test_streaming_matches_full_scan():
+    text = ("Logré ventas por 1.200.000\n USD y llamé al (601) 555-1234. " * 40).strip()
+    scanner = PIIScanner()
+    streamed = "".join(scanner.feed(text[i:i + 37]) for i in range(0, len(text), 37)) + scanner.finish()
+    assert streamed == obfuscate_personal_data(text)[0]
+
+
+def _streamed(text: str, size: int) -> tuple[str, dict]:
+    scanner = PIIScanner()
+    out = [scanner.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    out.append(scanner.finish())
+    return "".join(out), scanner.mapping
+
+
+def test_streaming_matches_full_scan_across_chunk_sizes():
+    text = "\n".join(
+        f"Puesto {i}: presupuesto de $ 3 500 000 y ahorro de USD 1 250 000; "
+        f"contacto ana{i}@mail.com, tel +57 300 123 45{i:02d}, 2019 - 2021, "
+        f"Calle {i} # 12-34, https://github.com/ana{i}."
+        for i in range(12)
+    )
+    expected = obfuscate_personal_data(text)
+    for size in range(1, 260):
+        assert _streamed(text, size) == expected, size
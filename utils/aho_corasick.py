@@ -0,0 +1,116 @@
+# utils/aho_corasick.py
+import unicodedata
+from collections import deque
+from typing import Any, Iterator, Tuple
+
+
+def _fold_char(ch: str) -> str:
+    base = unicodedata.normalize("NFKD", ch)[0]
+    return base.lower()[0]
+
+
+# Tabla de plegado para el rango latino habitual; el resto se pliega carácter a carácter
+_FOLD_TABLE = {i: _fold_char(chr(i)) for i in range(0x250)}
+
+
+def fold(text: str) -> str:
+    """
+    Minúsculas y sin tildes, conservando la longitud (un carácter por carácter)
+    para que las posiciones de los matches sirvan sobre el texto original.
+    """
+    out = text.translate(_FOLD_TABLE)
+    if out.isascii():
+        return out
+    return "".join(c if ord(c) < 0x250 else _fold_char(c) for c in out)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def leftmost_longest(matches) -> list[Tuple[int, int, Any]]:
+    """
+    Filtra los (inicio, fin, valor) de `search` dejando, entre los que se solapan, el que
+    empieza antes y, a igual inicio, el más largo: "react native" no cuenta también como
+    "react", ni "node.js" como "node" y "js".
+    """
+    kept = []
+    last_end = -1
+    for start, end, value in sorted(matches, key=lambda m: (m[0], m[0] - m[1])):
+        if start >= last_end:
+            kept.append((start, end, value))
+            last_end = end
+    return kept
+
+
+class AhoCorasick:
+    """
+    Autómata de Aho-Corasick para buscar muchos patrones a la vez en una sola pasada.
+    Los patrones se pliegan con `fold`; `search` espera texto ya plegado.
+    Por defecto solo devuelve coincidencias de palabra completa.
+    """
+
+    def __init__(self):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[Tuple[int, Any]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, value: Any) -> None:
+        pattern = fold(pattern.strip())
+        if not pattern:
+            return
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(pattern), value))
+        self._built = False
+
+    def build(self) -> "AhoCorasick":
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+        return self
+
+    def search(self, folded: str, whole_words: bool = True) -> Iterator[Tuple[int, int, Any]]:
+        """Itera (inicio, fin, valor) de cada patrón encontrado en `folded`."""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        n = len(folded)
+        node = 0
+        for i, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            end = i + 1
+            for length, value in out[node]:
+                start = end - length
+                if whole_words:
+                    # los patrones que terminan en símbolo (c++, c#, .net) delimitan por sí mismos
+                    if start > 0 and _is_word_char(folded[start]) and _is_word_char(folded[start - 1]):
+                        continue
+                    if end < n and _is_word_char(folded[end - 1]) and _is_word_char(folded[end]):
+                        continue
+                yield start, end, value
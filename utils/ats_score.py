@@ -0,0 +1,135 @@
+# utils/ats_score.py
+import re
+from functools import lru_cache
+from typing import Optional
+
+from utils.aho_corasick import AhoCorasick, fold
+from services.job_vocabulary import TECHNOLOGIES, HARD_SKILLS, SOFT_SKILLS
+
+# Tokens: palabras con símbolos internos habituales en tecnologías (node.js, c++, c#, ci/cd)
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+(?:[./-][a-z0-9+#]+)*")
+# Sufijos (es/en) que se recortan para comparar por raíz; del más largo al más corto
+_SUFFIXES = (
+    "aciones", "iciones", "amente", "ciones", "mente", "acion", "icion", "cion",
+    "ings", "ing", "ers", "es", "ed", "er", "s",
+)
+_MIN_STEM = 4
+
+
+@lru_cache(maxsize=50000)
+def _stem(token: str) -> str:
+    if len(token) <= _MIN_STEM or not token.isalpha():
+        return token
+    for suf in _SUFFIXES:
+        if token.endswith(suf) and len(token) - len(suf) >= _MIN_STEM:
+            return token[: -len(suf)]
+    return token
+
+
+def normalize_for_ats(text: str) -> str:
+    """Texto plegado (minúsculas, sin tildes), tokenizado y con raíces, separado por espacios."""
+    return " ".join(_stem(t) for t in _TOKEN_RE.findall(fold(text or "")))
+
+
+@lru_cache(maxsize=1)
+def _alias_index() -> dict[str, tuple[str, ...]]:
+    """alias normalizado -> todos los alias de su entrada canónica (sinónimos)."""
+    index = {}
+    for vocab in (TECHNOLOGIES, HARD_SKILLS, SOFT_SKILLS):
+        for canonical, aliases in vocab.items():
+            group = tuple(dict.fromkeys(normalize_for_ats(a) for a in [canonical, *aliases]))
+            for a in group:
+                index.setdefault(a, group)
+    return index
+
+
+def _job_terms(extractor_json: dict) -> tuple[tuple[str, float], ...]:
+    """
+    Términos ponderados de la oferta: keywords_ats con peso decreciente por prioridad
+    (1.0 → 0.5) y tecnologías con su confidence. Si un término aparece en ambas listas
+    se queda el mayor peso.
+    """
+    weights: dict[str, float] = {}
+    keywords = [k for k in (extractor_json.get("keywords_ats") or []) if isinstance(k, str) and k.strip()]
+    n = len(keywords)
+    for i, kw in enumerate(keywords):
+        w = 1.0 - 0.5 * (i / (n - 1)) if n > 1 else 1.0
+        weights[kw.strip()] = max(weights.get(kw.strip(), 0.0), w)
+    for tech in extractor_json.get("tecnologias") or []:
+        if isinstance(tech, dict):
+            name, conf = tech.get("name"), tech.get("confidence", 0.5)
+        else:
+            name, conf = tech, 0.5
+        if isinstance(name, str) and name.strip():
+            try:
+                conf = float(conf)
+            except (TypeError, ValueError):
+                conf = 0.5
+            weights[name.strip()] = max(weights.get(name.strip(), 0.0), conf)
+    return tuple(weights.items())
+
+
+class ATSScorer:
+    """
+    Scorer compilado para una oferta: un único autómata con todos los términos y sus
+    sinónimos. Puntuar un CV es una sola pasada sobre el texto normalizado más un producto
+    escalar entre el vector de pesos y el vector de aciertos.
+    """
+
+    def __init__(self, terms: tuple[tuple[str, float], ...]):
+        self.terms = [t for t, _ in terms]
+        self.weights = [w for _, w in terms]
+        self.total_weight = sum(self.weights)
+        alias_index = _alias_index()
+        self._matcher = AhoCorasick()
+        for idx, term in enumerate(self.terms):
+            norm = normalize_for_ats(term)
+            if not norm:
+                continue
+            for variant in alias_index.get(norm, (norm,)):
+                self._matcher.add(variant, idx)
+        self._matcher.build()
+
+    def score(self, cv_text: str) -> dict:
+        hits = [0] * len(self.terms)
+        for _, _, idx in self._matcher.search(normalize_for_ats(cv_text)):
+            hits[idx] += 1
+        matched_weight = sum(w for w, h in zip(self.weights, hits) if h)
+        coverage = sum(1 for h in hits if h) / len(hits) if hits else 0.0
+        return {
+            "score": round(100 * matched_weight / self.total_weight, 1) if self.total_weight else 0.0,
+            "coverage": round(coverage, 3),
+            "matched": [
+                {"term": t, "weight": round(w, 2), "count": h}
+                for t, w, h in zip(self.terms, self.weights, hits) if h
+            ],
+            "missing": [
+                {"term": t, "weight": round(w, 2)}
+                for t, w, h in zip(self.terms, self.weights, hits) if not h
+            ],
+        }
+
+
+@lru_cache(maxsize=256)
+def _compiled_scorer(terms: tuple[tuple[str, float], ...]) -> ATSScorer:
+    return ATSScorer(terms)
+
+
+def get_scorer(extractor_json: dict) -> ATSScorer:
+    """Scorer cacheado por conjunto de términos (recompilar solo si cambian las keywords)."""
+    return _compiled_scorer(_job_terms(extractor_json or {}))
+
+
+def score_cv(extractor_json: dict, original_text: str, adapted_text: Optional[str] = None) -> dict:
+    """
+    Puntúa la cobertura de keywords/tecnologías de la oferta en el CV original y,
+    si se da, en el adaptado. Devuelve {"original", "adapted", "delta"}.
+    """
+    scorer = get_scorer(extractor_json)
+    original = scorer.score(original_text or "")
+    result = {"original": original, "adapted": None, "delta": None}
+    if adapted_text is not None:
+        adapted = scorer.score(adapted_text)
+        result["adapted"] = adapted
+        result["delta"] = round(adapted["score"] - original["score"], 1)
+    return result
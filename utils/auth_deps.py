@@ -4,35 +4,72 @@ from jose import JWTError, jwt
 from sqlalchemy import select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
+from typing import Optional
+import time
+import uuid
 
 from config.settings import settings
 from config.database import get_db
 from models.user import User
 from models.session import Session as SessionModel
+from utils.metrics import AUTH_DEPENDENCY_DURATION
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login-user")
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
-    # 1) decode JWT
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        return await _authenticate(token, db)
+    except HTTPException:
+        outcome = "rejected"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        AUTH_DEPENDENCY_DURATION.labels(outcome).observe(time.perf_counter() - started)
+
+def token_claims(token: str) -> tuple[uuid.UUID, Optional[uuid.UUID]]:
+    """(user_id, session_id) del JWT. session_id (claim `jti`) es None en tokens anteriores a incluirlo."""
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
         user_id = payload.get("sub")
-        if user_id is None:
+        jti = payload.get("jti")
+        if not isinstance(user_id, str) or (jti is not None and not isinstance(jti, str)):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    except JWTError:
+        return uuid.UUID(user_id), (uuid.UUID(jti) if jti else None)
+    except (JWTError, TypeError, ValueError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    # 2) buscar sesión activa para ese user_id
-    now = datetime.now(timezone.utc)
-    q = await db.execute(
+async def find_session(db: AsyncSession, user_id: uuid.UUID, session_id: Optional[uuid.UUID],
+                       active_at: Optional[datetime] = None) -> Optional[SessionModel]:
+    """
+    Sesión del token: búsqueda por PK con el `jti`. Los tokens sin `jti` (emitidos antes de
+    incluirlo) caen en la sesión no revocada más reciente del usuario hasta que caduquen.
+    Con `active_at`, además debe no haber expirado en ese instante.
+    """
+    q = (
         select(SessionModel).
         where(SessionModel.user_id == user_id).
-        where(SessionModel.is_revoked == False).
-        where(or_(SessionModel.expires_at == None, SessionModel.expires_at > now)).
-        order_by(SessionModel.created_at.desc()).
-        limit(1)
+        where(SessionModel.is_revoked == False)
     )
-    session = q.scalars().first()
+    if active_at is not None:
+        q = q.where(or_(SessionModel.expires_at == None, SessionModel.expires_at > active_at))
+    if session_id is not None:
+        q = q.where(SessionModel.id == session_id)
+    else:
+        q = q.order_by(SessionModel.created_at.desc()).limit(1)
+    result = await db.execute(q)
+    return result.scalars().first()
+
+async def _authenticate(token: str, db: AsyncSession) -> User:
+    # 1) decode JWT
+    user_id, session_id = token_claims(token)
+
+    # 2) sesión del token (PK = jti), activa
+    now = datetime.now(timezone.utc)
+    session = await find_session(db, user_id, session_id, active_at=now)
     if not session:
         # no hay sesión activa → token inválido por revocación / expiración
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session expired or revoked")
@@ -43,9 +80,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     await db.commit()
 
     # 4) devolver user
-    q2 = await db.execute(select(User).where(User.id == user_id))
-    user = q2.scalars().first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    return user
\ No newline at end of file
+    return user
@@ -0,0 +1,40 @@
+# utils/background.py
+# Registro de tareas en segundo plano (fire-and-forget) para poder esperarlas al apagar.
+import asyncio
+import logging
+from typing import Coroutine
+
+_tasks: set[asyncio.Task] = set()
+
+
+def spawn(coro: Coroutine, name: str = None) -> asyncio.Task:
+    """Lanza `coro` como tarea y la registra hasta que termine (drain() la espera)."""
+    task = asyncio.get_running_loop().create_task(coro, name=name)
+    _tasks.add(task)
+    task.add_done_callback(_done)
+    return task
+
+
+def _done(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.error("Tarea en segundo plano %s falló", task.get_name(), exc_info=task.exception())
+
+
+def pending() -> int:
+    return len(_tasks)
+
+
+async def drain(timeout_s: float) -> int:
+    """
+    Espera a las tareas pendientes hasta `timeout_s`; las que sigan vivas se cancelan.
+    Devuelve cuántas hubo que cancelar.
+    """
+    if not _tasks:
+        return 0
+    _, still_running = await asyncio.wait(set(_tasks), timeout=timeout_s)
+    for task in still_running:
+        task.cancel()
+    if still_running:
+        await asyncio.gather(*still_running, return_exceptions=True)
+    return len(still_running)
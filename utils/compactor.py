@@ -0,0 +1,175 @@
+# utils/compactor.py
+import math
+import re
+from typing import Tuple
+
+from utils.tokens import estimate_tokens
+
+# Separador de páginas que deja extract_text_from_upload en los PDFs
+PAGE_BREAK = "\f"
+
+_SPACES_RE = re.compile(r"[ \t\u00a0\u2000-\u200b\u3000]+")
+_CONTROL_RE = re.compile(r"[\x00-\x08\x0b\x0e-\x1f\x7f\u00ad\ufeff]")
+# Número de página al final de una cabecera/pie ("Ana Pérez - CV 2", "Página 2 de 3", "2/3")
+_PAGE_NUMBER_TAIL_RE = re.compile(
+    r"\s*(?:[-–|·]\s*)?(?:(?:p[aá]gina|page|p[aá]g\.?)\s*)?\d{1,3}(?:\s*(?:de|of|/)\s*\d{1,3})?$",
+    re.IGNORECASE,
+)
+# Rangos de fechas de un puesto ("2019 - 2021", "03/2018 – actualidad"): nunca son cabecera/pie
+_DATE_RANGE_RE = re.compile(
+    r"(?:19|20)\d{2}\s*[-–—a]+\s*(?:\w+\.?\s+)?(?:(?:19|20)\d{2}|actual(?:idad|mente)?|presente?|hoy|now|current)",
+    re.IGNORECASE,
+)
+# Líneas de cada página candidatas a cabecera/pie (las primeras y las últimas no vacías)
+HEADER_FOOTER_LINES = 3
+# Líneas sin información: numeración de página, filas de puntos/guiones, viñetas sueltas
+# (salvo las de estructura Markdown, ver _MARKDOWN_STRUCTURE_RE)
+_JUNK_LINE_RE = re.compile(
+    r"^(?:(?:p[aá]gina|page|p[aá]g\.?)\s*\d+(?:\s*(?:de|of|/)\s*\d+)?|\d+\s*(?:/|de|of)\s*\d+|\d{1,3}|[\W_]{1,})$",
+    re.IGNORECASE,
+)
+# Separadores de tabla ("|---|:--:|"), reglas horizontales ("---", "***") y bloques de código
+_MARKDOWN_STRUCTURE_RE = re.compile(
+    r"^(?:\|?\s*:?-{3,}:?\s*(?:\|\s*:?-{3,}:?\s*)*\|?|(?:[-*_]\s*){3,}|`{3,}|~{3,})$"
+)
+# Palabra cortada por guion al final de línea ("desarro-" + "llo")
+_HYPHEN_END_RE = re.compile(r"(\w)[-\u2010\u2011]$")
+
+
+def _normalize_line(line: str) -> str:
+    line = _CONTROL_RE.sub("", line)
+    return _SPACES_RE.sub(" ", line).strip()
+
+
+def _line_signature(line: str) -> str:
+    """Clave para detectar cabeceras/pies repetidos aunque cambie el número de página final."""
+    return _PAGE_NUMBER_TAIL_RE.sub(" #", line.lower())
+
+
+def _repeatable(line: str) -> bool:
+    return bool(line) and not _DATE_RANGE_RE.search(line)
+
+
+def _is_junk(line: str) -> bool:
+    return bool(_JUNK_LINE_RE.match(line)) and not _MARKDOWN_STRUCTURE_RE.match(line)
+
+
+def _edge_indexes(page: list[str]) -> list[int]:
+    """Posiciones de las primeras y últimas HEADER_FOOTER_LINES líneas no vacías de la página."""
+    idx = [i for i, l in enumerate(page) if l]
+    if len(idx) <= 2 * HEADER_FOOTER_LINES:
+        return idx
+    return idx[:HEADER_FOOTER_LINES] + idx[-HEADER_FOOTER_LINES:]
+
+
+def _drop_repeated(pages: list[list[str]]) -> Tuple[list[list[str]], int]:
+    """
+    Elimina las cabeceras y pies que se repiten entre páginas (separadas por PAGE_BREAK),
+    conservando la primera aparición. Solo se miran las primeras/últimas líneas de cada
+    página y nunca los rangos de fechas: una línea repetida en el cuerpo (la ciudad o
+    "Responsabilidades:" de cada puesto) es contenido. Sin saltos de página no hace nada.
+    """
+    if len(pages) < 2:
+        return pages, 0
+
+    seen_in = {}
+    for page in pages:
+        for sig in {_line_signature(page[i]) for i in _edge_indexes(page) if _repeatable(page[i])}:
+            seen_in[sig] = seen_in.get(sig, 0) + 1
+    threshold = max(2, math.ceil(len(pages) / 2))
+    repeated = {sig for sig, n in seen_in.items() if n >= threshold}
+    if not repeated:
+        return pages, 0
+
+    removed = 0
+    kept_once = set()
+    out = []
+    for page in pages:
+        edges = set(_edge_indexes(page))
+        new_page = []
+        for i, l in enumerate(page):
+            if i in edges and _repeatable(l):
+                sig = _line_signature(l)
+                if sig in repeated:
+                    if sig in kept_once:
+                        removed += 1
+                        continue
+                    kept_once.add(sig)
+            new_page.append(l)
+        out.append(new_page)
+    return out, removed
+
+
+def _dehyphenate(lines: list[str]) -> Tuple[list[str], int]:
+    """Une las palabras partidas con guion al final de línea."""
+    out = []
+    joined = 0
+    for l in lines:
+        if out and l and l[0].islower() and _HYPHEN_END_RE.search(out[-1]):
+            out[-1] = out[-1][:-1] + l
+            joined += 1
+            continue
+        out.append(l)
+    return out, joined
+
+
+def _enforce_budget(lines: list[str], max_tokens: int) -> Tuple[list[str], bool]:
+    """Recorta por líneas completas hasta que el texto quepa en `max_tokens`."""
+    out = []
+    used = 0
+    for l in lines:
+        cost = estimate_tokens(l) + 1  # +1 por el salto de línea
+        if used + cost > max_tokens:
+            return out, True
+        out.append(l)
+        used += cost
+    return out, False
+
+
+def compact_cv_text(text: str, max_tokens: int = 0) -> Tuple[str, dict]:
+    """
+    Limpia el texto extraído de un CV antes de mandarlo al LLM:
+    normaliza espacios, quita líneas basura y cabeceras/pies repetidos entre páginas,
+    une palabras partidas con guion y, si `max_tokens` > 0, recorta al presupuesto.
+    Devuelve (texto_compactado, informe).
+    """
+    tokens_before = estimate_tokens(text)
+    pages = [[_normalize_line(l) for l in page.split("\n")] for page in text.split(PAGE_BREAK)]
+
+    junk = 0
+    for page in pages:
+        for i, l in enumerate(page):
+            if l and _is_junk(l):
+                page[i] = ""
+                junk += 1
+
+    pages, repeated = _drop_repeated(pages)
+
+    # Aplanar páginas colapsando líneas vacías consecutivas
+    lines = []
+    for page in pages:
+        for l in page:
+            if l or (lines and lines[-1]):
+                lines.append(l)
+    while lines and not lines[-1]:
+        lines.pop()
+
+    lines, hyphens = _dehyphenate(lines)
+
+    truncated = False
+    if max_tokens and max_tokens > 0:
+        lines, truncated = _enforce_budget(lines, max_tokens)
+
+    compacted = "\n".join(lines)
+    tokens_after = estimate_tokens(compacted)
+    report = {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+        "junk_lines_removed": junk,
+        "repeated_lines_removed": repeated,
+        "hyphenations_joined": hyphens,
+        "truncated": truncated,
+        "token_budget": max_tokens or None,
+    }
+    return compacted, report
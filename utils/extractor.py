@@ -1,9 +1,100 @@
 # utils/extract.py
-import os
-import tempfile
+import asyncio
+import importlib
+import io
+import logging
+import time
 from fastapi import UploadFile, HTTPException
 from config.settings import settings
-import pdfplumber
+from utils.metrics import PDF_EXTRACTION_DURATION, PDF_PAGES
+
+# ---------------------------------------------------------------------------
+# Motores de extracción de texto de PDF. Cada motor recibe los bytes del PDF y devuelve
+# el texto de cada página. Se elige con settings.PDF_ENGINE; los imports son tardíos
+# (pdfplumber/pdfminer pesan en el arranque y solo hacen falta con PDFs).
+# Comparativa de velocidad y fidelidad: benchmarks/pdf/bench_extract.py
+# ---------------------------------------------------------------------------
+
+# LAParams de pdfminer ajustados para CVs: líneas más juntas que en un libro (line_margin),
+# columnas separadas por poco espacio (char_margin) y orden de lectura por bloques
+# (boxes_flow) para no mezclar las dos columnas de las plantillas modernas.
+PDFMINER_LAPARAMS = {
+    "line_margin": 0.3,
+    "char_margin": 1.5,
+    "word_margin": 0.1,
+    "boxes_flow": 0.5,
+    "detect_vertical": False,
+    "all_texts": False,
+}
+
+
+def _pdfplumber_pages(contents: bytes) -> list[str]:
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(contents)) as pdf:
+        return [p.extract_text() or "" for p in pdf.pages]
+
+
+def _pdfminer_pages(contents: bytes) -> list[str]:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LAParams, LTTextContainer
+    pages = []
+    for layout in extract_pages(io.BytesIO(contents), laparams=LAParams(**PDFMINER_LAPARAMS)):
+        pages.append("".join(el.get_text() for el in layout if isinstance(el, LTTextContainer)).rstrip("\n"))
+    return pages
+
+
+def _pypdfium2_pages(contents: bytes) -> list[str]:
+    # PDFium (C++): el más rápido; orden del content stream, suele respetar columnas
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(contents)
+    try:
+        pages = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            pages.append(textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n"))
+            textpage.close()
+            page.close()
+        return pages
+    finally:
+        pdf.close()
+
+
+PDF_ENGINES = {
+    "pdfplumber": _pdfplumber_pages,
+    "pdfminer": _pdfminer_pages,
+    "pypdfium2": _pypdfium2_pages,
+}
+_ENGINE_MODULES = {"pdfplumber": "pdfplumber", "pdfminer": "pdfminer.high_level", "pypdfium2": "pypdfium2"}
+
+
+def _engine_name(engine: str = None) -> str:
+    name = engine or settings.PDF_ENGINE
+    if name not in PDF_ENGINES:
+        raise ValueError(f"Motor de PDF no soportado: {name} (opciones: {', '.join(PDF_ENGINES)})")
+    return name
+
+
+def prime_pdf_engine() -> None:
+    """Importa el motor configurado (calentamiento: el primer PDF no paga el import)."""
+    importlib.import_module(_ENGINE_MODULES[_engine_name()])
+
+
+def _extract_pdf_text(contents: bytes, engine: str = None) -> str:
+    name = _engine_name(engine)
+    started = time.perf_counter()
+    try:
+        text_pages = PDF_ENGINES[name](contents)
+    except Exception:
+        if name == "pdfplumber":
+            raise
+        # PDF que el motor rápido no entiende: se reintenta con pdfplumber
+        logging.exception("Motor de PDF %s falló; reintentando con pdfplumber", name)
+        name = "pdfplumber"
+        text_pages = PDF_ENGINES[name](contents)
+    PDF_EXTRACTION_DURATION.labels(name).observe(time.perf_counter() - started)
+    PDF_PAGES.observe(len(text_pages))
+    # salto de página explícito para que la compactación detecte cabeceras/pies repetidos
+    return "\f".join(text_pages)
 
 async def extract_text_from_upload(upload_file: UploadFile) -> str:
     filename = (upload_file.filename or "").lower()
@@ -13,22 +104,9 @@ async def extract_text_from_upload(upload_file: UploadFile) -> str:
     if len(contents) > settings.MAX_UPLOAD_BYTES:
         raise HTTPException(status_code=413, detail="Archivo demasiado grande")
 
-    # PDF
+    # PDF (parseo en thread: los motores son síncronos y CPU-bound)
     if filename.endswith(".pdf") or upload_file.content_type == "application/pdf":
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tf:
-            tf.write(contents)
-            tmp_path = tf.name
-        try:
-            text_pages = []
-            with pdfplumber.open(tmp_path) as pdf:
-                for p in pdf.pages:
-                    text_pages.append(p.extract_text() or "")
-            return "\n".join(text_pages)
-        finally:
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                pass
+        return await asyncio.to_thread(_extract_pdf_text, contents)
 
     # Markdown / plain text
     if filename.endswith(".md") or filename.endswith(".markdown") or upload_file.content_type.startswith("text"):
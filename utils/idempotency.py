@@ -0,0 +1,288 @@
+# utils/idempotency.py
+# Claves de idempotencia (header `Idempotency-Key`) para los endpoints que llaman al LLM:
+# un reintento del cliente con la misma clave recibe la respuesta ya generada en vez de pagar
+# otra llamada. Por (usuario, clave) se guarda la huella de la petición y la respuesta final en
+# un almacén con TTL (IDEMPOTENCY_TTL_S, como mucho IDEMPOTENCY_MAX_ENTRIES, por proceso):
+#   - misma clave y misma petición, ya terminada  -> se repite la respuesta (Idempotent-Replayed: true)
+#   - misma clave y misma petición, aún en curso  -> espera a la original y comparte su respuesta
+#   - misma clave y otra petición                 -> 422
+# Solo se guardan las respuestas 2xx: tras un error el cliente puede reintentar con la misma clave.
+#
+# La huella es sha256(usuario, método, ruta, query, campos del formulario y sha256 de cada
+# fichero): no depende del boundary del multipart, que cambia en cada reintento.
+# Va como middleware ASGI (el más interno, por debajo de CORS y compresión): la respuesta se
+# guarda sin comprimir y un reintento no consume rate limit, cuota ni plaza de concurrencia.
+# Antes de repetir o esperar una respuesta se comprueba que la sesión del token sigue activa
+# (un token cerrado con logout no recupera la respuesta guardada, que lleva el
+# obfuscation_mapping con los datos personales).
+#
+# El almacén es por proceso: con varios workers, un reintento que llega a otro worker se
+# procesa (y se paga) de nuevo. La garantía completa requiere un único worker o afinidad
+# por usuario en el balanceador.
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers, UploadFile
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.settings import settings
+from config.database import AsyncSessionLocal
+from utils.auth_deps import find_session, token_claims
+from utils.metrics import IDEMPOTENCY_REQUESTS
+
+IDEMPOTENT_PATHS = ("/cv-boost/analyze_job", "/cv-boost/generate_cv/strict")
+MAX_KEY_LENGTH = 255
+# Margen sobre MAX_UPLOAD_BYTES para el resto del multipart; cuerpos mayores -> 413
+_BODY_OVERHEAD_BYTES = 1024 * 1024
+
+
+class StoredResponse:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: list, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "future", "response", "expires_at")
+
+    def __init__(self, fingerprint: str, future: asyncio.Future):
+        self.fingerprint = fingerprint
+        self.future = future  # se resuelve con la StoredResponse de la petición original
+        self.response: Optional[StoredResponse] = None
+        self.expires_at = 0.0
+
+
+class _OwnerFailed(Exception):
+    """La petición original no terminó (excepción o cancelación): quien esperaba la reintenta."""
+
+
+class IdempotencyStore:
+    """Entradas por "<user_id>:<clave>" en orden LRU. Sin locks: solo se usa desde el event loop."""
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.response is not None and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def begin(self, key: str, fingerprint: str) -> _Entry:
+        entry = _Entry(fingerprint, asyncio.get_running_loop().create_future())
+        self._entries[key] = entry
+        self._evict()
+        return entry
+
+    def complete(self, key: str, entry: _Entry, response: StoredResponse) -> None:
+        entry.future.set_result(response)
+        if 200 <= response.status < 300:
+            entry.response = response
+            entry.expires_at = time.monotonic() + settings.IDEMPOTENCY_TTL_S
+        elif self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def fail(self, key: str, entry: _Entry) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        entry.future.set_exception(_OwnerFailed())
+        entry.future.exception()  # recuperada aunque nadie esté esperando
+
+    def _evict(self) -> None:
+        # las más antiguas primero; las que siguen en curso no se expulsan
+        excess = len(self._entries) - max(1, settings.IDEMPOTENCY_MAX_ENTRIES)
+        for key in [k for k, e in self._entries.items() if e.response is not None][:max(0, excess)]:
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+idempotency_store = IdempotencyStore()
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+async def _read_body(receive: Receive, limit: int) -> Optional[bytes]:
+    """Lee el cuerpo completo; None si el cliente se desconecta, _BodyTooLarge si supera `limit`."""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            raise _BodyTooLarge()
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def _replay_receive(body: bytes, receive: Receive) -> Receive:
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()  # después: http.disconnect del cliente real
+
+    return replay
+
+
+async def fingerprint(scope: Scope, body: bytes, user_id: str) -> str:
+    h = hashlib.sha256()
+    h.update(f"{user_id}\0{scope['method']}\0{scope['path']}\0{scope.get('query_string', b'').decode()}\0".encode())
+    content_type = Headers(scope=scope).get("content-type", "")
+    if content_type.startswith(("multipart/form-data", "application/x-www-form-urlencoded")):
+        request = Request(scope, _replay_receive(body, _no_more_messages))
+        form = await request.form()
+        try:
+            fields = []
+            for name, value in form.multi_items():
+                if isinstance(value, UploadFile):
+                    digest = hashlib.sha256(await value.read()).hexdigest()
+                    fields.append([name, "file", value.filename or "", digest])
+                else:
+                    fields.append([name, "field", value])
+        finally:
+            await form.close()
+        h.update(json.dumps(sorted(fields), ensure_ascii=False).encode("utf-8"))
+    else:
+        h.update(hashlib.sha256(body).digest())
+    return h.hexdigest()
+
+
+async def _no_more_messages() -> Message:
+    return {"type": "http.disconnect"}
+
+
+async def _send_stored(send: Send, response: StoredResponse) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": response.status,
+        "headers": response.headers + [(b"idempotent-replayed", b"true")],
+    })
+    await send({"type": "http.response.body", "body": response.body, "more_body": False})
+
+
+async def _send_error(send: Send, status: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+async def _session_active(user_id, session_id) -> bool:
+    async with AsyncSessionLocal() as db:
+        return await find_session(db, user_id, session_id, active_at=datetime.now(timezone.utc)) is not None
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in IDEMPOTENT_PATHS
+            or not settings.IDEMPOTENCY_ENABLED
+        ):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_error(send, 400, f"Idempotency-Key debe tener entre 1 y {MAX_KEY_LENGTH} caracteres")
+            return
+
+        # Usuario del JWT (firma y expiración); sin token válido decide la autenticación normal
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        try:
+            user_id, session_id = token_claims(token) if scheme.lower() == "bearer" else (None, None)
+        except HTTPException:
+            user_id, session_id = None, None
+        try:
+            body = await _read_body(receive, settings.MAX_UPLOAD_BYTES + _BODY_OVERHEAD_BYTES)
+        except _BodyTooLarge:
+            await _send_error(send, 413, "Archivo demasiado grande")
+            return
+        if body is None:
+            return
+        if user_id is None:
+            await self.app(scope, _replay_receive(body, receive), send)
+            return
+
+        store_key = f"{user_id}:{key}"
+        fp = await fingerprint(scope, body, str(user_id))
+        session_checked = False
+        while True:
+            entry = idempotency_store.get(store_key)
+            if entry is None:
+                break
+            if not session_checked:
+                if not await _session_active(user_id, session_id):
+                    # sesión revocada o caducada: responde la autenticación normal (401)
+                    await self.app(scope, _replay_receive(body, receive), send)
+                    return
+                session_checked = True
+            if entry.fingerprint != fp:
+                IDEMPOTENCY_REQUESTS.labels("conflict").inc()
+                await _send_error(send, 422, "Idempotency-Key ya usada con una petición distinta")
+                return
+            if entry.response is not None:
+                IDEMPOTENCY_REQUESTS.labels("replayed").inc()
+                await _send_stored(send, entry.response)
+                return
+            try:
+                response = await asyncio.shield(entry.future)
+            except _OwnerFailed:
+                continue  # la original falló: esta pasa a ser la original
+            IDEMPOTENCY_REQUESTS.labels("waited").inc()
+            await _send_stored(send, response)
+            return
+
+        IDEMPOTENCY_REQUESTS.labels("new").inc()
+        entry = idempotency_store.begin(store_key, fp)
+        status, response_headers, chunks = 500, [], []
+
+        async def capture(message: Message) -> None:
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, _replay_receive(body, receive), capture)
+        except BaseException:
+            idempotency_store.fail(store_key, entry)
+            raise
+        idempotency_store.complete(store_key, entry, StoredResponse(status, response_headers, b"".join(chunks)))
@@ -1,16 +1,23 @@
 # utils/llm_tracker.py
+import logging
 import time
 import uuid
+from contextlib import contextmanager
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import insert
 from models.llmUsage import LLMUsage
 from config.settings import settings
+from utils.metrics import USAGE_LOG_PENDING
 
 class LLMTracker:
     def __init__(self):
         self.start_time = None
         self.request_id = None
+        self.model = None  # modelo que respondió realmente (lo fija ai_client)
+        self.prompt_report = None  # tokens por sección del prompt (lo fija ai_client)
+        self.stages: dict[str, float] = {}  # ms por etapa (span), se guarda en llm_usage.stage_timings
+        self.llm_calls = 0  # llamadas al LLM (las cuenta ai_client), se guarda en llm_usage.llm_calls
     
     def start_tracking(self) -> str:
         """Inicia el tracking de una petición a IA"""
@@ -18,6 +25,28 @@ class LLMTracker:
         self.request_id = str(uuid.uuid4())
         return self.request_id
     
+    @contextmanager
+    def span(self, name: str):
+        """
+        Mide una etapa del pipeline. Si la misma etapa se mide varias veces, se acumula.
+        Uso: `with tracker.span("extract"): text = await extract_text_from_upload(cv)`
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, (time.perf_counter() - started) * 1000)
+
+    def add_stage(self, name: str, ms: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+        logging.debug("[%s] etapa %s: %.1f ms", self.request_id, name, ms)
+
+    def stage_timings(self) -> Optional[dict[str, int]]:
+        """Desglose compacto (ms enteros por etapa) para persistir con el registro de uso."""
+        if not self.stages:
+            return None
+        return {name: int(round(ms)) for name, ms in self.stages.items()}
+
     def calculate_latency(self) -> Optional[int]:
         """Calcula la latencia en milisegundos"""
         if self.start_time is None:
@@ -34,18 +63,26 @@ class LLMTracker:
     ) -> None:
         """Registra el uso de IA en la base de datos"""
         latency_ms = self.calculate_latency()
+        # si hubo fallback de modelo, se registra el que respondió de verdad
+        model = self.model or model
         
         stmt = insert(LLMUsage).values(
-            user_id=user_id,
-            request_id=self.request_id,
+            user_id=uuid.UUID(str(user_id)),
+            request_id=uuid.UUID(self.request_id),
             model=model,
             endpoint=endpoint,
             latency_ms=latency_ms,
+            stage_timings=self.stage_timings(),
+            llm_calls=self.llm_calls,
             result=result
         )
         
-        await db.execute(stmt)
-        await db.commit()
+        USAGE_LOG_PENDING.inc()
+        try:
+            await db.execute(stmt)
+            await db.commit()
+        finally:
+            USAGE_LOG_PENDING.dec()
 
 # Función helper para crear un tracker
 def create_tracker() -> LLMTracker:
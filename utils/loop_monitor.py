@@ -0,0 +1,212 @@
+# utils/loop_monitor.py
+# Detección de bloqueos del event loop y profiler de muestreo por petición.
+#
+# - EventLoopMonitor: una tarea asyncio marca un "latido" cada `interval`; el retraso de
+#   cada latido respecto a lo esperado es el lag del loop (histograma en /metrics). Un hilo
+#   watchdog vigila el latido y, si el loop lleva más de `threshold` sin latir (una sección
+#   síncrona lo está bloqueando), registra en el log la pila del hilo del loop EN ESE MOMENTO,
+#   que apunta directamente a la llamada bloqueante.
+# - ProfilingMiddleware: si la petición trae `X-Profile: <PROFILING_TOKEN>`, muestrea las pilas
+#   de los hilos mientras dura y guarda el perfil en formato "collapsed stacks" (compatible con
+#   flamegraph.pl, speedscope o inferno) en STORAGE_DIR/profiles. La respuesta lleva el nombre
+#   del fichero en `X-Profile-Id`.
+import asyncio
+import hmac
+import logging
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter as StackCounter
+from pathlib import Path
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.settings import settings
+from utils.metrics import Counter, Histogram
+
+logger = logging.getLogger("cv_booster.loop_monitor")
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Retraso del event loop respecto al latido esperado.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+).labels()
+EVENT_LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total", "Secciones síncronas que bloquearon el loop más del umbral."
+).labels()
+
+PROFILES_DIR = Path(settings.STORAGE_DIR) / "profiles"
+PROFILE_HEADER = "x-profile"
+
+
+def _format_stack(frame, limit: int = 30) -> str:
+    return "".join(traceback.format_stack(frame, limit=limit))
+
+
+class EventLoopMonitor:
+    def __init__(self, interval_s: float, threshold_s: float):
+        self.interval_s = interval_s
+        self.threshold_s = threshold_s
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            now = time.monotonic()
+            EVENT_LOOP_LAG.observe(max(0.0, now - expected))
+            self._beat = now
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self.threshold_s / 2):
+            beat = self._beat
+            blocked_s = time.monotonic() - beat - self.interval_s
+            if blocked_s < self.threshold_s or beat == reported_beat:
+                continue
+            reported_beat = beat  # un aviso por bloqueo, aunque dure varios ciclos del watchdog
+            frame = sys._current_frames().get(self._loop_thread_id)
+            EVENT_LOOP_BLOCKED.inc()
+            logger.warning(
+                "Event loop bloqueado %.0f ms (umbral %.0f ms). Pila del hilo del loop:\n%s",
+                blocked_s * 1000, self.threshold_s * 1000,
+                _format_stack(frame) if frame is not None else "(no disponible)",
+            )
+
+
+loop_monitor = EventLoopMonitor(
+    interval_s=settings.LOOP_MONITOR_INTERVAL_MS / 1000,
+    threshold_s=settings.LOOP_BLOCK_THRESHOLD_MS / 1000,
+)
+
+
+class StackSampler:
+    """
+    Muestrea las pilas de todos los hilos (salvo el propio) cada `interval_s` y las acumula
+    en formato collapsed: "hilo;mod:func;mod:func N". El hilo del loop aparece mezclado con
+    otras peticiones concurrentes; las de `asyncio.to_thread` aparecen en sus hilos de trabajo.
+    """
+
+    def __init__(self, interval_s: float):
+        self.interval_s = interval_s
+        self.stacks: StackCounter = StackCounter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    async def __aenter__(self):
+        self._thread.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        self._stop.set()
+        # el hilo puede estar a mitad de una pasada por todas las pilas: no esperar en el loop
+        await asyncio.to_thread(self._thread.join)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval_s):
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                if tid not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                if names.get(tid) == "loop-watchdog":
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    module = frame.f_globals.get("__name__", "?")
+                    parts.append(f"{module}:{code.co_name}")
+                    frame = frame.f_back
+                parts.append(names.get(tid, str(tid)))
+                self.stacks[";".join(reversed(parts))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _profile_requested(scope: Scope) -> bool:
+    token = settings.PROFILING_TOKEN
+    if not token:
+        return False
+    for name, value in scope.get("headers") or ():
+        if name == PROFILE_HEADER.encode():
+            return hmac.compare_digest(value, token.encode())
+    return False
+
+
+class ProfilingMiddleware:
+    """Perfil bajo demanda de una petición (header `X-Profile` con el token de admin)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers") or [])
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        started = time.perf_counter()
+        sampler = StackSampler(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        try:
+            async with sampler:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            await asyncio.to_thread(self._save, profile_id, scope, sampler, elapsed_ms)
+
+    @staticmethod
+    def _save(profile_id: str, scope: Scope, sampler: StackSampler, elapsed_ms: float) -> None:
+        PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILES_DIR / f"{profile_id}.folded"
+        path.write_text(sampler.collapsed(), encoding="utf-8")
+        logger.info(
+            "Perfil de %s %s guardado en %s (%.0f ms, %s muestras)",
+            scope["method"], scope["path"], path, elapsed_ms, sampler.samples,
+        )
+
+
+def read_profile(profile_id: str) -> Optional[str]:
+    """Contenido de un perfil guardado (None si no existe o el id no es válido)."""
+    if not profile_id or "/" in profile_id or "\\" in profile_id or profile_id.startswith("."):
+        return None
+    path = PROFILES_DIR / f"{profile_id}.folded"
+    return path.read_text(encoding="utf-8") if path.exists() else None
@@ -0,0 +1,345 @@
+# utils/metrics.py
+# Métricas en memoria con formato de exposición de Prometheus (texto), sin dependencias.
+# Diseñado para el camino caliente: cada serie (combinación de labels) se crea una sola vez
+# con sus buckets preasignados; observar una muestra es un bisect sobre límites fijos y
+# un incremento bajo un lock, sin crear listas ni objetos nuevos por muestra.
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Buckets por defecto (segundos), pensados para rutas HTTP y llamadas a BD
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Las llamadas al LLM tardan segundos o decenas de segundos
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+PAGE_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self.labels()  # las métricas sin labels se exportan desde el arranque (valor 0)
+        REGISTRY.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        """
+        Serie para esos valores de labels (creada una sola vez). En el camino caliente
+        conviene guardar la serie devuelta si los labels son fijos.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: se esperaban labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+                self._children.setdefault(values, child)
+        return child
+
+    def _series(self):
+        seen = set()
+        for values, child in list(self._children.items()):
+            if id(child) in seen:
+                continue
+            seen.add(id(child))
+            yield tuple(str(v) for v in values), child
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._collect_samples())
+        return lines
+
+    def _collect_samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _collect_samples(self):
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+            for values, child in self._series()
+        ]
+
+
+class _GaugeChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+
+class Gauge(_Metric):
+    """Gauge con valor propio o calculado al exportar (`callback`, p.ej. estado del pool de BD)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 callback: Optional[Callable[[], Optional[float]]] = None):
+        super().__init__(name, help_text, labelnames)
+        self.callback = callback
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def _collect_samples(self):
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception:
+                value = None
+            return [] if value is None else [f"{self.name} {_format_value(float(value))}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+            for values, child in self._series()
+        ]
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: tuple):
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # último = +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _collect_samples(self):
+        lines = []
+        for values, child in self._series():
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+# ---------------------------------------------------------------------------
+# Métricas de la aplicación
+# ---------------------------------------------------------------------------
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Duración de las peticiones HTTP por ruta.",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "Peticiones HTTP en curso.")
+
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds", "Latencia de las llamadas al LLM que respondieron, por prompt y modelo.",
+    ("prompt", "model"), buckets=LLM_BUCKETS,
+)
+LLM_ERRORS = Counter(
+    "llm_errors_total", "Errores de llamadas al LLM por prompt, modelo y tipo.",
+    ("prompt", "model", "kind"),
+)
+
+PDF_EXTRACTION_DURATION = Histogram(
+    "pdf_extraction_duration_seconds", "Duración de la extracción de texto de PDFs por motor.",
+    ("engine",),
+)
+PDF_PAGES = Histogram("pdf_pages", "Páginas por PDF procesado.", buckets=PAGE_BUCKETS).labels()
+
+AUTH_DEPENDENCY_DURATION = Histogram(
+    "auth_dependency_duration_seconds", "Duración de la dependencia get_current_user (JWT + sesión + usuario).",
+    ("outcome",),
+)
+
+USAGE_LOG_PENDING = Gauge("llm_usage_log_pending", "Escrituras en llm_usage en curso.")
+
+RATE_LIMITED = Counter(
+    "rate_limited_total", "Peticiones rechazadas con 429 por acción y motivo (rate, quota, concurrency).",
+    ("action", "reason"),
+)
+
+IDEMPOTENCY_REQUESTS = Counter(
+    "idempotency_requests_total", "Peticiones con Idempotency-Key por resultado (new, replayed, waited, conflict).",
+    ("outcome",),
+)
+
+SPECULATIVE_GENERATIONS = Counter(
+    "speculative_generations_total",
+    "Generaciones especulativas por resultado (hit, failed, miss_*, replaced, expired).",
+    ("outcome",),
+)
+
+RETENTION_DELETED = Counter(
+    "retention_deleted_total", "Filas, ficheros o particiones borrados por el barrido de retención, por destino.",
+    ("target",),
+)
+RETENTION_SWEEP_DURATION = Histogram(
+    "retention_sweep_duration_seconds", "Duración de cada barrido de retención.", buckets=LLM_BUCKETS,
+).labels()
+
+
+def _pool_stat(attr: str) -> Callable[[], Optional[float]]:
+    def read():
+        from config.database import current_engine  # import tardío: evita ciclo config <-> utils
+        engine = current_engine()
+        if engine is None:  # aún sin conexiones: no se fuerza la creación del engine
+            return None
+        fn = getattr(engine.sync_engine.pool, attr, None)
+        return fn() if callable(fn) else None
+    return read
+
+
+DB_POOL_SIZE = Gauge("db_pool_size", "Tamaño configurado del pool de conexiones.", callback=_pool_stat("size"))
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Conexiones del pool en uso.", callback=_pool_stat("checkedout")
+)
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Conexiones en overflow del pool.", callback=_pool_stat("overflow"))
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro (sin BaseHTTPMiddleware) que mide cada petición HTTP.
+    La ruta se etiqueta con la plantilla (`/cv-boost/usage_record/{record_id}`) para no
+    disparar la cardinalidad; las peticiones sin ruta se agrupan como "unmatched".
+    """
+
+    def __init__(self, app: ASGIApp, exclude: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = frozenset(exclude)
+        self._in_progress = HTTP_REQUESTS_IN_PROGRESS.labels()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self._in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._in_progress.dec()
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(scope["method"], template, status_code).observe(
+                time.perf_counter() - started
+            )
@@ -0,0 +1,387 @@
+# utils/rate_limit.py
+# Límites por usuario antes de llamar al LLM:
+#   - token bucket por acción ("analyze", "generate"): ráfaga `burst` y recarga `per_min`/minuto.
+#     En memoria por proceso (RATE_LIMIT_BACKEND=memory) o compartido en la BD (=db) con un
+#     único UPSERT atómico (recarga + consumo) para que valga entre workers.
+#   - cuota diaria de llamadas al LLM (LLM_DAILY_QUOTA), sembrada desde llm_usage. Solo la
+#     reservan las peticiones que pueden llamar al LLM (no analyze con mode=local) y se
+#     devuelve si la petición falla (excepción o respuesta no 2xx) o al final no usó el LLM.
+#   - máximo de generaciones concurrentes por usuario (en proceso).
+# Las generaciones especulativas (services/speculation.py) ocupan plaza, cuota y un token del
+# bucket "generate" igual que generate, con try_acquire_generation_slot / reserve_quota /
+# try_take_token.
+# Al superar un límite se responde 429 con Retry-After; las respuestas aceptadas llevan
+# X-RateLimit-Remaining y X-Quota-Remaining (RateLimitHeadersMiddleware).
+import math
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+import sqlalchemy as sa
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.settings import settings
+from config.database import get_db
+from models.llmUsage import LLMUsage
+from models.rateLimitBucket import RateLimitBucket
+from models.user import User
+from services.job_analyzer import LOCAL_ANALYZER_MODEL
+from utils.auth_deps import get_current_user
+from utils.metrics import RATE_LIMITED
+
+# Endpoints cuyas filas en llm_usage cuentan para la cuota diaria (la última: generaciones
+# especulativas descartadas, ver services/speculation.py)
+QUOTA_ENDPOINTS = ("/cv-boost/analyze_job", "/cv-boost/generate_cv/strict", "/cv-boost/generate_cv/speculative")
+
+
+class Limit:
+    __slots__ = ("per_min", "burst")
+
+    def __init__(self, per_min: float, burst: int):
+        self.per_min = per_min
+        self.burst = burst
+
+    @property
+    def rate_per_s(self) -> float:
+        return self.per_min / 60.0
+
+
+def _limits() -> dict[str, Limit]:
+    return {
+        "analyze": Limit(settings.RATE_LIMIT_ANALYZE_PER_MIN, settings.RATE_LIMIT_ANALYZE_BURST),
+        "generate": Limit(settings.RATE_LIMIT_GENERATE_PER_MIN, settings.RATE_LIMIT_GENERATE_BURST),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Token bucket
+# ---------------------------------------------------------------------------
+
+class MemoryBuckets:
+    """
+    Buckets en memoria del proceso. Sin locks: solo se usa desde el event loop.
+    Cada minuto se expulsan los que ya se habrían rellenado: equivalen a no tenerlos.
+    """
+
+    EVICT_INTERVAL_S = 60.0
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float, Limit]] = {}  # key -> (tokens, updated_at, limit)
+        self._last_evict = time.monotonic()
+
+    async def take(self, db, key: str, limit: Limit, keep: int = 0) -> tuple[bool, float, float]:
+        now = time.monotonic()
+        if now - self._last_evict >= self.EVICT_INTERVAL_S:
+            self._evict_idle(now)
+        tokens, updated, _ = self._buckets.get(key, (float(limit.burst), now, limit))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate_per_s)
+        allowed = tokens >= 1 + keep
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now, limit)
+        return allowed, tokens, _retry_after(tokens, limit)
+
+    def _evict_idle(self, now: float) -> None:
+        self._last_evict = now
+        self._buckets = {
+            key: (tokens, updated, limit) for key, (tokens, updated, limit) in self._buckets.items()
+            if tokens + (now - updated) * limit.rate_per_s < limit.burst
+        }
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class DatabaseBuckets:
+    """
+    Buckets en la tabla rate_limit_buckets. Recarga y consumo en un solo
+    INSERT ... ON CONFLICT DO UPDATE ... WHERE tokens_recargados >= 1 RETURNING tokens,
+    atómico en Postgres y SQLite; si no devuelve fila, no había token.
+    Con `keep` > 0 solo se consume si quedan además `keep` tokens.
+    """
+
+    async def take(self, db: AsyncSession, key: str, limit: Limit, keep: int = 0) -> tuple[bool, float, float]:
+        now = time.time()
+        table = RateLimitBucket.__table__
+        dialect = db.bind.dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+            least = sa.func.least
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+            least = sa.func.min  # min() escalar de SQLite con 2 argumentos
+        refilled = least(limit.burst, table.c.tokens + (now - table.c.updated_at) * limit.rate_per_s)
+        if keep and limit.burst < 1 + keep:
+            return False, float(limit.burst), 0.0
+        stmt = (
+            insert(table)
+            .values(key=key, tokens=limit.burst - 1, updated_at=now)
+            .on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={"tokens": refilled - 1, "updated_at": now},
+                where=refilled >= 1 + keep,
+            )
+            .returning(table.c.tokens)
+        )
+        remaining = (await db.execute(stmt)).scalar_one_or_none()
+        if remaining is not None:
+            await db.commit()
+            return True, remaining, 0.0
+
+        row = (await db.execute(
+            sa.select(table.c.tokens, table.c.updated_at).where(table.c.key == key)
+        )).first()
+        await db.commit()
+        tokens = min(limit.burst, row.tokens + (now - row.updated_at) * limit.rate_per_s) if row else 0.0
+        return False, tokens, _retry_after(tokens, limit)
+
+
+def _retry_after(tokens: float, limit: Limit) -> float:
+    if tokens >= 1 or limit.rate_per_s <= 0:
+        return 0.0
+    return (1 - tokens) / limit.rate_per_s
+
+
+# ---------------------------------------------------------------------------
+# Cuota diaria
+# ---------------------------------------------------------------------------
+
+def _day_start(now: datetime) -> datetime:
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def _count_usage_today(db: AsyncSession, user_id, day_start: datetime) -> int:
+    stmt = (
+        sa.select(sa.func.count(LLMUsage.id))
+        .where(
+            LLMUsage.user_id == user_id,
+            LLMUsage.created_at >= day_start,
+            LLMUsage.endpoint.in_(QUOTA_ENDPOINTS),
+            LLMUsage.model != LOCAL_ANALYZER_MODEL,  # el analizador local no consume LLM
+            # las peticiones fallidas devuelven su reserva (RateLimitHeadersMiddleware)
+            sa.or_(LLMUsage.result.is_(None), ~LLMUsage.result.startswith("ERROR:")),
+        )
+    )
+    return (await db.execute(stmt)).scalar() or 0
+
+
+class DailyQuota:
+    """
+    Contador por usuario y día UTC. En memoria se siembra una vez al día desde llm_usage y
+    luego se incrementa al aceptar cada llamada (incluye las que aún están en curso). Con el
+    backend de BD se recuenta desde llm_usage en cada comprobación, para que valga entre
+    workers (las llamadas en curso aún no cuentan).
+    """
+
+    def __init__(self):
+        self._used: dict[tuple[str, str], int] = {}
+
+    async def reserve(self, db: AsyncSession, user_id, quota: int) -> tuple[bool, int, float, Optional[tuple]]:
+        """Devuelve (permitido, restantes, segundos hasta el reinicio, reserva para `release`)."""
+        now = datetime.now(timezone.utc)
+        day_start = _day_start(now)
+        key = (str(user_id), day_start.date().isoformat())
+        if settings.RATE_LIMIT_BACKEND == "db" or key not in self._used:
+            if len(self._used) > 10000:  # días anteriores
+                self._used = {k: v for k, v in self._used.items() if k[1] == key[1]}
+            self._used[key] = await _count_usage_today(db, user_id, day_start)
+        used = self._used[key]
+        if used >= quota:
+            reset_s = (day_start + timedelta(days=1) - now).total_seconds()
+            return False, 0, reset_s, None
+        self._used[key] = used + 1
+        return True, quota - used - 1, 0.0, key
+
+    def release(self, reservation: tuple) -> None:
+        """Devuelve una unidad reservada (la petición falló o no llegó a usar el LLM)."""
+        used = self._used.get(reservation, 0)
+        if used > 0:
+            self._used[reservation] = used - 1
+
+
+_buckets = DatabaseBuckets() if settings.RATE_LIMIT_BACKEND == "db" else MemoryBuckets()
+_quota = DailyQuota()
+_in_flight: dict[str, int] = {}
+
+
+def _too_many(action: str, reason: str, detail: str, retry_after: float, headers: dict) -> HTTPException:
+    RATE_LIMITED.labels(action, reason).inc()
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={**headers, "Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def _slot_available(user_key: str, keep_free: int = 0) -> bool:
+    max_concurrent = settings.MAX_CONCURRENT_GENERATIONS_PER_USER
+    return not max_concurrent or _in_flight.get(user_key, 0) + keep_free < max_concurrent
+
+
+def try_acquire_generation_slot(user_id, keep_free: int = 0) -> bool:
+    """
+    Ocupa una plaza de generación concurrente del usuario; False si no quedan al menos
+    `keep_free` libres además de la que ocupa.
+    """
+    user_key = str(user_id)
+    if not settings.RATE_LIMIT_ENABLED or not settings.MAX_CONCURRENT_GENERATIONS_PER_USER:
+        return True
+    if not _slot_available(user_key, keep_free):
+        return False
+    _in_flight[user_key] = _in_flight.get(user_key, 0) + 1
+    return True
+
+
+def release_generation_slot(user_id) -> None:
+    user_key = str(user_id)
+    left = _in_flight.get(user_key, 0) - 1
+    if left > 0:
+        _in_flight[user_key] = left
+    else:
+        _in_flight.pop(user_key, None)
+
+
+async def reserve_quota(db: AsyncSession, user_id) -> tuple[bool, Optional[tuple]]:
+    """Reserva una unidad de la cuota diaria fuera de `rate_limited`. Devuelve (permitido, reserva)."""
+    if not settings.RATE_LIMIT_ENABLED or settings.LLM_DAILY_QUOTA <= 0:
+        return True, None
+    ok, _, _, reservation = await _quota.reserve(db, user_id, settings.LLM_DAILY_QUOTA)
+    return ok, reservation
+
+
+async def try_take_token(db: AsyncSession, user_id, action: str, keep: int = 0) -> bool:
+    """Consume un token del bucket de `action` fuera de `rate_limited` si quedan además `keep`."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return True
+    allowed, _, _ = await _buckets.take(db, f"{action}:{user_id}", _limits()[action], keep)
+    return allowed
+
+
+def release_reservation(reservation: Optional[tuple]) -> None:
+    if reservation is not None:
+        _quota.release(reservation)
+
+
+def release_quota(request: Request) -> None:
+    """
+    Devuelve la unidad de cuota reservada por `rate_limited` para esta petición (una sola vez).
+    Los endpoints la llaman si al final no usaron el LLM (p.ej. analyze local_first sin refinar).
+    """
+    reservation = getattr(request.state, "quota_reservation", None)
+    if reservation is not None:
+        request.state.quota_reservation = None
+        _quota.release(reservation)
+        headers = getattr(request.state, "rate_limit_headers", None) or {}
+        if "X-Quota-Remaining" in headers:
+            headers["X-Quota-Remaining"] = str(int(headers["X-Quota-Remaining"]) + 1)
+
+
+async def _uses_llm(request: Request, action: str) -> bool:
+    """analyze con mode=local no llama al LLM: no consume cuota (como en _count_usage_today)."""
+    if action != "analyze":
+        return True
+    form = await request.form()  # ya parseado por FastAPI: Starlette lo cachea en el Request
+    return (form.get("mode") or settings.ANALYZE_JOB_MODE) != "local"
+
+
+def rate_limited(action: str):
+    """
+    Dependencia que aplica, en orden, el límite de concurrencia, la cuota diaria de LLM del
+    usuario y el token bucket de `action`. Uso: `Depends(rate_limited("generate"))`.
+    """
+
+    async def dependency(
+        request: Request,
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db),
+    ):
+        if not settings.RATE_LIMIT_ENABLED:
+            yield
+            return
+
+        user_key = str(current_user.id)
+        headers: dict[str, str] = {}
+
+        # 1) concurrencia (solo generate: es la llamada larga). La plaza se ocupa aquí, antes de
+        #    cualquier await, para que dos peticiones simultáneas no pasen ambas la comprobación
+        slot = action == "generate"
+        if slot and not try_acquire_generation_slot(user_key):
+            raise _too_many(action, "concurrency",
+                            f"Ya tienes {settings.MAX_CONCURRENT_GENERATIONS_PER_USER} generaciones en curso; "
+                            "espera a que terminen.", 5, headers)
+        try:
+            # 2) cuota diaria (antes del bucket: un 429 por cuota no gasta token)
+            quota = settings.LLM_DAILY_QUOTA
+            reservation = None
+            if quota > 0 and await _uses_llm(request, action):
+                ok, remaining, reset_s, reservation = await _quota.reserve(db, current_user.id, quota)
+                headers["X-Quota-Limit"] = str(quota)
+                headers["X-Quota-Remaining"] = str(remaining)
+                if not ok:
+                    raise _too_many(action, "quota", "Has alcanzado tu cuota diaria de generaciones con IA.", reset_s, headers)
+
+            # 3) token bucket
+            limit = _limits()[action]
+            allowed, tokens, retry_after = await _buckets.take(db, f"{action}:{user_key}", limit)
+            headers["X-RateLimit-Limit"] = f"{limit.burst};w=60;r={limit.per_min:g}"
+            headers["X-RateLimit-Remaining"] = str(int(tokens))
+            if not allowed:
+                if reservation is not None:
+                    _quota.release(reservation)
+                raise _too_many(action, "rate", "Demasiadas peticiones; vuelve a intentarlo más tarde.", retry_after, headers)
+
+            # cabeceras para la respuesta correcta (las añade RateLimitHeadersMiddleware, que
+            # también devuelve la reserva de cuota si la respuesta no es 2xx)
+            request.state.rate_limit_headers = headers
+            request.state.quota_reservation = reservation
+            yield
+        finally:
+            if slot:
+                release_generation_slot(user_key)
+
+    return dependency
+
+
+def _release_state_quota(scope: Scope) -> None:
+    state = scope.get("state") or {}
+    reservation = state.get("quota_reservation")
+    if reservation is not None:
+        state["quota_reservation"] = None
+        _quota.release(reservation)
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Copia a la respuesta las cabeceras de límite que dejó `rate_limited` en request.state
+    (los endpoints devuelven Response propias, así que no sirve el Response inyectado) y
+    devuelve la reserva de cuota si la petición falla o responde con un estado no 2xx.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                if not 200 <= message["status"] < 300:
+                    _release_state_quota(scope)
+                extra: Optional[dict] = (scope.get("state") or {}).get("rate_limit_headers")
+                if extra:
+                    headers = MutableHeaders(scope=message)
+                    for name, value in extra.items():
+                        if name not in headers:
+                            headers[name] = value
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            _release_state_quota(scope)
+            raise
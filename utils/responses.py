@@ -0,0 +1,23 @@
+# utils/responses.py
+# Respuestas JSON serializadas con orjson (varias veces más rápido que json de la stdlib).
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse as _FastAPIORJSONResponse
+
+
+def _default(obj: Any):
+    # func.avg() en Postgres devuelve Decimal; orjson (igual que json) no lo serializa
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Tipo no serializable a JSON: {type(obj).__name__}")
+
+
+class ORJSONResponse(_FastAPIORJSONResponse):
+    """ORJSONResponse que además acepta Decimal/set y claves no-string (p.ej. ids numéricos)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -2,51 +2,273 @@
 import re
 from typing import Tuple, List
 
+from utils.aho_corasick import fold
+
 EMAIL_RE = re.compile(r"([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)")
 PHONE_RE = re.compile(r"(\+?\d{7,15})")
 # Para detectar porcentajes / números con % o "x%" o "xx %"
 PERCENT_RE = re.compile(r"\b\d{1,3}\s?%")
 NUMBER_RE = re.compile(r"\b\d{2,4}\b")  # años, cifras (simple heur)
 
+# Escáner de PII en una sola pasada: una alternancia compilada con un grupo por tipo.
+# El orden importa: email antes que URL y URL antes que teléfono. El lookbehind común
+# hace que solo se prueben las alternativas al inicio de un token, no en cada carácter.
+PII_RE = re.compile(
+    r"(?<![\w.+-])(?:"
+    r"(?P<email>[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]*[a-zA-Z0-9])"
+    r"|(?P<url>(?i:https?://|www\.)[^\s<>()\[\]]+[^\s<>()\[\].,;:]"
+    r"|(?i:(?:[a-z0-9-]+\.)?(?:linkedin\.com|github\.com|gitlab\.com))/[^\s<>()\[\]]*[^\s<>()\[\].,;:])"
+    r"|(?P<address>(?i:Calle|Cll?\.?|C/|Carrera|Cra\.?|Kr\.?|Avenida|Av\.?|Avda\.?|Diagonal|Dg\.?"
+    r"|Transversal|Tv\.?|Paseo|Plaza)"
+    r" +[\wÁÉÍÓÚÑáéíóúñ. ]{0,40}?\d+[A-Za-z]?(?: *(?:#|No\.?|N[°º]) *\d+[A-Za-z]?(?: *- *\d+)?)?"
+    # en inglés el número va delante y el tipo de vía es case-sensitive: "221B Baker Street"
+    r"|\d+[A-Za-z]? +(?:[A-Z][\w'.-]* +){1,3}(?:Street|St\.|Avenue|Ave\.?|Road|Rd\.|Boulevard|Blvd\.?)(?!\w))"
+    r"|(?P<phone>\(?\+?\d[\d ().-]{5,18}\d(?!\w))"
+    r")"
+)
+_PHONE_DIGITS = (7, 15)
+# "2019 - 2021", "2019-2021": rangos de años, no teléfonos
+_YEAR_RANGE_RE = re.compile(r"^\(?(?:(?:19|20)\d{2}[\s./–-]*)+$")
+# "1.200.000", "25,000": cifras con separador de miles, no teléfonos
+_THOUSANDS_RE = re.compile(r"^\d{1,3}(?:[.,]\d{3})+(?:[.,]\d{1,2})?$")
+# Moneda junto a la cifra ("$ 1 200 000", "3500000 COP"): es un importe
+_CURRENCY_BEFORE_RE = re.compile(r"(?:[$€£]|\b(?:USD|EUR|COP|MXN|ARS|CLP|PEN|GBP))\s*$", re.IGNORECASE)
+_CURRENCY_AFTER_RE = re.compile(
+    r"^\s*(?:[$€£]|(?:USD|EUR|COP|MXN|ARS|CLP|PEN|GBP|millones|mill[oó]n|euros|d[oó]lares|pesos)\b)", re.IGNORECASE
+)
+PLACEHOLDER_RE = re.compile(r"\[(EMAIL|PHONE|URL|ADDRESS)_(\d+)\]")
+_MAPPING_KEYS = {"email": "emails", "phone": "phones", "url": "urls", "address": "addresses"}
+# Longitud máxima de un match: al escanear por trozos se retiene esta cola sin emitir
+_PII_HOLDBACK = 128
+
+
+class PIIScanner:
+    """
+    Ofusca emails, teléfonos, URLs/LinkedIn y direcciones con placeholders numerados
+    ([EMAIL_1], [PHONE_2]...). El mismo valor recibe siempre el mismo placeholder.
+    Sirve para un texto completo (`scan`) o por trozos en streaming (`feed`/`finish`).
+    """
+
+    def __init__(self):
+        self.mapping = {"emails": [], "phones": [], "urls": [], "addresses": [], "placeholders": {}}
+        self._by_value: dict[tuple, str] = {}
+        self._buffer = ""
+        # contexto del trozo escaneado en streaming: cola del texto anterior (ya emitido) y
+        # comienzo del siguiente (retenido), para que la moneda junto a una cifra se vea igual
+        # que escaneando el texto completo aunque el corte caiga justo después de "$ "
+        self._preceding = ""
+        self._following = ""
+
+    def _is_phone(self, m) -> bool:
+        value = m.group(0)
+        digits = sum(c.isdigit() for c in value)
+        if not (_PHONE_DIGITS[0] <= digits <= _PHONE_DIGITS[1]) or _YEAR_RANGE_RE.match(value):
+            return False
+        if _THOUSANDS_RE.match(value.lstrip("(+")):
+            return False
+        before = m.string[max(0, m.start() - 6):m.start()]
+        if m.start() < 6:
+            before = (self._preceding + before)[-6:]
+        after = m.string[m.end():m.end() + 12]
+        if m.end() == len(m.string):
+            after += self._following
+        return not (_CURRENCY_BEFORE_RE.search(before) or _CURRENCY_AFTER_RE.match(after))
+
+    def _sub(self, m) -> str:
+        kind = m.lastgroup
+        value = m.group(0)
+        if kind == "phone" and not self._is_phone(m):
+            return value
+        key = (kind, value)
+        placeholder = self._by_value.get(key)
+        if placeholder is None:
+            bucket = self.mapping[_MAPPING_KEYS[kind]]
+            bucket.append(value)
+            placeholder = f"[{kind.upper()}_{len(bucket)}]"
+            self._by_value[key] = placeholder
+            self.mapping["placeholders"][placeholder] = value
+        return placeholder
+
+    def scan(self, text: str) -> str:
+        return PII_RE.sub(self._sub, text)
+
+    def feed(self, chunk: str) -> str:
+        """Procesa un trozo y devuelve la parte ya segura; retiene la cola que podría continuar un match."""
+        self._buffer += chunk
+        # esperar a acumular varias colas para amortizar el re-escaneo de la zona retenida
+        if len(self._buffer) < 4 * _PII_HOLDBACK:
+            return ""
+        cut = len(self._buffer) - _PII_HOLDBACK
+        # no cortar por la mitad de una palabra...
+        while cut > 0 and not self._buffer[cut - 1].isspace():
+            cut -= 1
+        # ...ni de un match (teléfonos y direcciones contienen espacios)
+        for m in PII_RE.finditer(self._buffer, max(0, cut - _PII_HOLDBACK)):
+            if m.start() < cut < m.end():
+                cut = m.start()
+                break
+            if m.start() >= cut:
+                break
+        if cut <= 0:
+            return ""
+        ready, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        self._following = self._buffer[:12]
+        try:
+            return self.scan(ready)
+        finally:
+            self._following = ""
+            self._preceding = ready[-12:]
+
+    def finish(self) -> str:
+        rest, self._buffer = self._buffer, ""
+        try:
+            return self.scan(rest)
+        finally:
+            self._preceding = ""
+
+
 def obfuscate_personal_data(text: str) -> Tuple[str, dict]:
     """
-    Reemplaza emails y teléfonos por placeholders antes de enviar al LLM.
-    Devuelve (text_ofuscado, mapping_originales)
+    Reemplaza emails, teléfonos, URLs y direcciones por placeholders numerados antes de enviar al LLM.
+    Devuelve (text_ofuscado, mapping_originales); mapping["placeholders"] permite rehidratar.
+    """
+    scanner = PIIScanner()
+    return scanner.scan(text), scanner.mapping
+
+
+def rehydrate_personal_data(text: str, mapping: dict) -> str:
+    """Sustituye los placeholders numerados por los datos originales."""
+    placeholders = (mapping or {}).get("placeholders") or {}
+    if not placeholders or not text:
+        return text
+    return PLACEHOLDER_RE.sub(lambda m: placeholders.get(m.group(0), m.group(0)), text)
+
+
+class PIIRehydrator:
+    """Rehidratación por trozos: retiene un posible placeholder incompleto al final del trozo."""
+
+    def __init__(self, mapping: dict):
+        self.mapping = mapping
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        open_idx = self._buffer.rfind("[")
+        if open_idx != -1 and "]" not in self._buffer[open_idx:] and len(self._buffer) - open_idx < 20:
+            ready, self._buffer = self._buffer[:open_idx], self._buffer[open_idx:]
+        else:
+            ready, self._buffer = self._buffer, ""
+        return rehydrate_personal_data(ready, self.mapping)
+
+    def finish(self) -> str:
+        rest, self._buffer = self._buffer, ""
+        return rehydrate_personal_data(rest, self.mapping)
+
+_WORD_RE = re.compile(r"\w+")
+# Shingles que aparecen en más líneas del original que esto no discriminan (p.ej. "de la")
+_MAX_POSTING = 50
+
+
+def _shingles(line: str) -> set:
+    """Bigramas de palabras normalizadas (unigramas si la línea tiene una sola palabra)."""
+    words = _WORD_RE.findall(fold(line))
+    if len(words) < 2:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+class OriginalCVIndex:
+    """
+    Índice invertido shingle -> líneas del CV original. Se construye una vez por petición
+    y permite saber, para una línea generada, cuánto de ella está cubierto por la línea
+    original más parecida (contención de shingles).
     """
-    mapping = {"emails": [], "phones": []}
 
-    def _email_sub(m):
-        mapping["emails"].append(m.group(0))
-        return "[EMAIL_REDACTED]"
+    def __init__(self, original_text: str):
+        self.postings: dict[str, list[int]] = {}
+        n_lines = 0
+        for line in original_text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            for sh in _shingles(line):
+                self.postings.setdefault(sh, []).append(n_lines)
+            n_lines += 1
+        self.n_lines = n_lines
+        self.metrics = set(PERCENT_RE.findall(original_text) + NUMBER_RE.findall(original_text))
 
-    def _phone_sub(m):
-        mapping["phones"].append(m.group(0))
-        return "[PHONE_REDACTED]"
+    def similarity(self, line: str) -> float:
+        """Fracción (0-1) de los shingles de `line` presentes en una misma línea original."""
+        shingles = _shingles(line)
+        if not shingles:
+            return 1.0
+        counts: dict[int, int] = {}
+        for sh in shingles:
+            posting = self.postings.get(sh)
+            if not posting or len(posting) > _MAX_POSTING:
+                continue
+            for line_id in posting:
+                counts[line_id] = counts.get(line_id, 0) + 1
+        if not counts:
+            return 0.0
+        return max(counts.values()) / len(shingles)
+
+
+class IncrementalPostprocessChecker:
+    """
+    Versión incremental de postprocess_check: consume el markdown generado por trozos
+    (p.ej. mientras el LLM hace streaming) y procesa cada línea en cuanto se completa,
+    así el resultado está listo al terminar la generación.
+    Una línea cuenta como nueva si su similitud con el original es menor que `threshold`.
+    """
+
+    def __init__(self, original_text: str, threshold: float = 0.5):
+        self.index = OriginalCVIndex(original_text)
+        self.threshold = threshold
+        self._buffer = ""
+        self._new_lines: list[str] = []
+        self._suspicious: dict[str, None] = {}
+
+    def feed(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self._buffer += chunk
+        if "\n" not in self._buffer:
+            return
+        *complete, self._buffer = self._buffer.split("\n")
+        for line in complete:
+            self._process_line(line)
+
+    def _process_line(self, line: str) -> None:
+        line = line.strip()
+        if not line:
+            return
+        for m in PERCENT_RE.findall(line) + NUMBER_RE.findall(line):
+            if m not in self.index.metrics:
+                self._suspicious[m] = None
+        # Solo las líneas que parecen "afirmaciones" (no headers)
+        if line.startswith("#") or len(line) <= 10:
+            return
+        if self.index.similarity(line) < self.threshold:
+            self._new_lines.append(line)
+
+    def finish(self) -> dict:
+        if self._buffer:
+            self._process_line(self._buffer)
+            self._buffer = ""
+        return {
+            "new_lines": self._new_lines,
+            "suspicious_metrics": list(self._suspicious)
+        }
 
-    t = EMAIL_RE.sub(_email_sub, text)
-    t = PHONE_RE.sub(_phone_sub, t)
-    return t, mapping
 
 def postprocess_check(original_text: str, generated_md: str) -> dict:
     """
     Heurística simple para detectar líneas nuevas y presencia de métricas / porcentajes que no existían.
     Devuelve dict con:
-      - new_lines: lista de líneas en generated_md que no aparecen en original_text
+      - new_lines: lista de líneas en generated_md sin una línea parecida en original_text
       - suspicious_metrics: lista de fragmentos con % o números nuevos
     """
-    orig_lines = {l.strip() for l in original_text.splitlines() if l.strip()}
-    gen_lines = [l.strip() for l in generated_md.splitlines() if l.strip()]
-
-    new_lines = [l for l in gen_lines if l not in orig_lines]
-    # Filtrar las new_lines para mostrar solo las que parecen "afirmaciones" (no headers)
-    new_lines_filtered = [l for l in new_lines if not l.startswith("#") and len(l) > 10]
-
-    # Detect metrics in generated that are not in original
-    orig_metrics = set(PERCENT_RE.findall(original_text) + NUMBER_RE.findall(original_text))
-    gen_metrics = set(PERCENT_RE.findall(generated_md) + NUMBER_RE.findall(generated_md))
-    suspicious_metrics = [m for m in gen_metrics if m not in orig_metrics]
-
-    return {
-        "new_lines": new_lines_filtered,
-        "suspicious_metrics": suspicious_metrics
-    }
+    checker = IncrementalPostprocessChecker(original_text)
+    checker.feed(generated_md)
+    return checker.finish()
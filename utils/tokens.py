@@ -0,0 +1,37 @@
+# utils/tokens.py
+import re
+
+# Aproximación local del tokenizador BPE: palabras (~4 caracteres por token) y signos sueltos.
+# No es exacta para ningún modelo concreto, pero es estable y suficiente para comparar tamaños.
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida del número de tokens de `text` sin llamar al proveedor."""
+    if not text:
+        return 0
+    total = 0
+    for m in _WORD_RE.finditer(text):
+        n = m.end() - m.start()
+        total += 1 if n <= 4 else (n + 3) // 4
+    return total
+
+
+def prompt_token_report(static_tokens: dict[str, int], dynamic_sections: dict[str, str]) -> dict:
+    """
+    Informe de tokens por sección de un prompt.
+    Las secciones estáticas forman el prefijo cacheable por el proveedor: se reciben ya
+    estimadas (no cambian entre peticiones); las dinámicas cambian en cada petición.
+    """
+    static = dict(static_tokens)
+    dynamic = {name: estimate_tokens(text) for name, text in dynamic_sections.items()}
+    static_total = sum(static.values())
+    dynamic_total = sum(dynamic.values())
+    total = static_total + dynamic_total
+    return {
+        "sections": {**static, **dynamic},
+        "static_prefix_tokens": static_total,
+        "dynamic_tokens": dynamic_total,
+        "total_tokens": total,
+        "cacheable_ratio": round(static_total / total, 3) if total else 0.0,
+    }